@@ -0,0 +1,393 @@
+"""
+=========================================
+Benchmarks for the exercise statistics code
+=========================================
+Synthetic workout csv files are generated with a configurable number of days
+and sets, and for each of them the following phases are timed separately
+(with the peak memory allocated, as traced by tracemalloc):
+
+    1. load: loadStatisticsFromCsv;
+    2. statistics: building the StatisticsIndex (with the trend models);
+    3. render, draw, save: for plot3dBarChart, plotTrend (with and without
+       predictions, and with the lines reduced to a bounded number of points,
+       see libs/seriesReduction.py) and plotDailyTimeSpent (also reduced),
+       creating the figure, drawing the canvas and saving the .png file, with
+       the cost of the other output tiers and formats (savePreview: a .png
+       file at the preview resolution; savePdf: a PDF page);
+    4. pipeline: the frame jobs of plotPullUpStatistics.py rendered by
+       renderFrameJobs (optional, limited to a number of frames per sequence),
+       with the time spent in each phase of the plotting functions, at the
+       resolution of an output tier;
+    5. coldStart: importing the library and the driver scripts in a new
+       Python process, checking that the ones which do not plot anything at
+       start-up do not import matplotlib (the run fails otherwise).
+
+The results are written to a JSON file, so that they can be compared across
+commits. Usage (under the repository root):
+
+    python benchmarks/benchmarkExerciseStatistics.py --days 30 365 1000 \\
+        --sets 10 --output bench_results.json
+
+or, for only the cold start check:
+
+    python benchmarks/benchmarkExerciseStatistics.py --cold-start-only
+
+Developed and tested with Python 3.8.
+"""
+import argparse
+import csv
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Make the repository root importable.
+pathToRepo = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if pathToRepo not in sys.path:
+    sys.path.insert(0, pathToRepo)
+
+import matplotlib
+# Render off screen.
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+import libs.exerciseStatistics as es
+from libs.frameSinks import OUTPUT_TIER_DPIS
+from libs.phaseProfiler import PhaseProfile
+from libs.seriesReduction import SeriesReduction
+from libs.statisticsIndex import StatisticsIndex
+
+# Modules imported for the cold start benchmark, with whether they may import
+# matplotlib.
+COLD_START_MODULES = (
+    ('libs.exerciseStatistics', False),
+    ('libs.renderScheduler', False),
+    ('plotPullUpStatistics', False),
+    ('plotBatchStatistics', False),
+    ('serveStatistics', False),
+    ('matplotlib.pyplot', True)
+)
+
+# Run in a new Python process (under the repository root) to time an import.
+COLD_START_CODE = """
+import json, sys, time
+startTime = time.perf_counter()
+import {moduleName}
+print(json.dumps({{'timeInS': time.perf_counter()-startTime,
+    'flagMatplotlibImported': 'matplotlib' in sys.modules}}))
+"""
+
+def generateSyntheticCsv(pathToCsvFile, numOfDays, numOfSets, seed=0):
+    """
+    Generate a workout csv file with the same structure as
+    20200401_PullUps.csv, with slowly improving random repetition values.
+    """
+    rng = random.Random(seed)
+    header = ['Date']+['Set '+str(idxSet+1) for idxSet in range(numOfSets)] \
+        + ['Sum', 'RawVideoTime', 'WorkoutTime']
+    startDate = datetime.date(2020, 4, 1)
+    with open(pathToCsvFile, mode='w', newline='') as csvFile:
+        csvWriter = csv.writer(csvFile, quoting=csv.QUOTE_NONNUMERIC)
+        csvWriter.writerow(header)
+        for idxDay in range(numOfDays):
+            date = startDate+datetime.timedelta(days=idxDay)
+            firstSet = 10+idxDay//10+rng.randint(-1, 1)
+            setValues = [max(1, firstSet//(idxSet+1)+rng.randint(-1, 1))
+                for idxSet in range(numOfSets)]
+            workoutTimeInS = 20*sum(setValues)+rng.randint(0, 60)
+            rawVideoTimeInS = workoutTimeInS+rng.randint(0, 30)
+            csvWriter.writerow(
+                ['{}/{}/{}'.format(date.month, date.day, date.year)]
+                + setValues + [sum(setValues),
+                str(datetime.timedelta(seconds=rawVideoTimeInS)),
+                str(datetime.timedelta(seconds=workoutTimeInS))])
+
+def measure(function, *args, **kwargs):
+    """
+    Run the function once. Returns (result, wall time in seconds, peak memory
+    allocated in bytes).
+    """
+    gc.collect()
+    tracemalloc.start()
+    startTime = time.perf_counter()
+    try:
+        result = function(*args, **kwargs)
+        elapsedTime = time.perf_counter()-startTime
+        (_, peakMemory) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (result, elapsedTime, peakMemory)
+
+def summarize(times, peakMemories):
+    return {
+        'timeInSMin': min(times),
+        'timeInSMedian': float(np.median(times)),
+        'timeInSMax': max(times),
+        'peakMemoryInBytes': max(peakMemories)
+    }
+
+def benchmarkPhase(function, numOfRepeats, *args, **kwargs):
+    times = []
+    peakMemories = []
+    for _ in range(numOfRepeats):
+        (result, elapsedTime, peakMemory) = measure(function, *args, **kwargs)
+        times.append(elapsedTime)
+        peakMemories.append(peakMemory)
+    return (result, summarize(times, peakMemories))
+
+def getPlotCases(numOfDays, numOfSets):
+    """
+    The plots to benchmark for a dataset, as (caseName, plotFunction,
+    kwargs).
+    """
+    fontSizes = dict(labelSize=30, titleSize=40, tickSize=30)
+    # Bounded lines: daily points for about a quarter, weekly before that.
+    seriesReduction = SeriesReduction(maxNumOfPoints=500,
+        historyWindowSize=90)
+    return [
+        ('plot3dBarChart', es.plot3dBarChart,
+            dict(numOfRowsToShow=numOfDays, numOfSetsToShowForLastRow=numOfSets,
+                figureSize=(9,16), labelPad3D=30, extraLabelPadZ=10,
+                titleY=0.9, titleLoc='right', titleEndPad=5, zTickPad=3,
+                camView=(10, -60), **fontSizes)),
+        ('plotTrend', es.plotTrend,
+            dict(numOfRowsToShow=numOfDays, figureSize=(9,16), **fontSizes)),
+        ('plotTrendPrediction', es.plotTrend,
+            dict(numOfRowsToShow=numOfDays+365, figureSize=(16,9),
+                lineWidth=3, inFigTextSize=100, **fontSizes)),
+        ('plotTrendReduced', es.plotTrend,
+            dict(numOfRowsToShow=numOfDays, figureSize=(9,16),
+                seriesReduction=seriesReduction, **fontSizes)),
+        ('plotDailyTimeSpent', es.plotDailyTimeSpent,
+            dict(numOfRowsToShow=numOfDays, figureSize=(9,8),
+                flagEndDateDataInTitle=True, **fontSizes)),
+        ('plotDailyTimeSpentReduced', es.plotDailyTimeSpent,
+            dict(numOfRowsToShow=numOfDays, figureSize=(9,8),
+                flagEndDateDataInTitle=True, seriesReduction=seriesReduction,
+                **fontSizes))
+    ]
+
+def benchmarkPlot(header, data, plotFunction, kwargs, numOfRepeats,
+    outputDir):
+    """
+    Benchmark the render, draw and save phases of one plot.
+    """
+    phases = {'render': ([], []), 'draw': ([], []), 'save': ([], []),
+        'savePreview': ([], []), 'savePdf': ([], [])}
+    pathToOutput = os.path.join(outputDir, 'frame.png')
+    pathToPreview = os.path.join(outputDir, 'frame_preview.png')
+    pathToPdf = os.path.join(outputDir, 'frame.pdf')
+    for _ in range(numOfRepeats):
+        with plt.rc_context():
+            ((fig, _), elapsedTime, peakMemory) = measure(plotFunction,
+                header, data, **kwargs)
+            phases['render'][0].append(elapsedTime)
+            phases['render'][1].append(peakMemory)
+            (_, elapsedTime, peakMemory) = measure(fig.canvas.draw)
+            phases['draw'][0].append(elapsedTime)
+            phases['draw'][1].append(peakMemory)
+            (_, elapsedTime, peakMemory) = measure(fig.savefig, pathToOutput)
+            phases['save'][0].append(elapsedTime)
+            phases['save'][1].append(peakMemory)
+            (_, elapsedTime, peakMemory) = measure(fig.savefig,
+                pathToPreview, dpi=OUTPUT_TIER_DPIS['preview'])
+            phases['savePreview'][0].append(elapsedTime)
+            phases['savePreview'][1].append(peakMemory)
+            (_, elapsedTime, peakMemory) = measure(fig.savefig, pathToPdf)
+            phases['savePdf'][0].append(elapsedTime)
+            phases['savePdf'][1].append(peakMemory)
+            plt.close(fig)
+    return {phase: summarize(times, peakMemories)
+        for (phase, (times, peakMemories)) in phases.items()}
+
+def benchmarkPipeline(pathToCsvFile, outputDir, numOfWorkers,
+    maxNumOfFramesPerSequence, flagReuseFigures, flagLayeredBars=False,
+    tier='final'):
+    """
+    Benchmark rendering the frame jobs of plotPullUpStatistics.py.
+    """
+    import plotPullUpStatistics as driver
+    from libs.renderScheduler import renderFrameJobs
+
+    (header, data) = es.loadStatisticsFromCsv(pathToCsvFile)
+    (totalNumOfRows, totalNumOfSets) = es.getNumsOfRowsAndSets(header, data)
+    frameJobs = []
+    for (_, sequenceFrameJobs) in driver.groupFrameJobsBySequence(
+        driver.constructFrameJobs(totalNumOfRows, totalNumOfSets,
+            flagLayeredBars=flagLayeredBars)):
+        frameJobs += sequenceFrameJobs[-maxNumOfFramesPerSequence:]
+
+    phaseProfile = PhaseProfile()
+    startTime = time.perf_counter()
+    renderFrameJobs(pathToCsvFile, frameJobs, outputDir,
+        numOfWorkers=numOfWorkers, flagReuseFigures=flagReuseFigures,
+        phaseProfile=phaseProfile, dpi=OUTPUT_TIER_DPIS[tier])
+    elapsedTime = time.perf_counter()-startTime
+    return {
+        'numOfFrames': len(frameJobs),
+        'numOfWorkers': numOfWorkers,
+        'flagReuseFigures': flagReuseFigures,
+        'flagLayeredBars': flagLayeredBars,
+        'tier': tier,
+        'timeInS': elapsedTime,
+        'framesPerS': len(frameJobs)/elapsedTime,
+        'phases': phaseProfile.getSummary()
+    }
+
+def measureColdStart(moduleName):
+    """
+    Import a module in a new Python process (under the repository root).
+    Returns a dict with the time of the import ('timeInS') and of the whole
+    process ('processTimeInS'), and whether matplotlib was imported
+    ('flagMatplotlibImported').
+    """
+    startTime = time.perf_counter()
+    output = subprocess.check_output([sys.executable, '-c',
+        COLD_START_CODE.format(moduleName=moduleName)],
+        cwd=pathToRepo, stderr=subprocess.DEVNULL)
+    processTimeInS = time.perf_counter()-startTime
+    result = json.loads(output.decode().strip().splitlines()[-1])
+    result['processTimeInS'] = processTimeInS
+    return result
+
+def benchmarkColdStart(numOfRepeats):
+    """
+    Time importing each of COLD_START_MODULES in a new Python process (the
+    import itself and the whole process), and check whether matplotlib is
+    imported. Returns a dict of the results by module name, each with
+    flagPassed false if matplotlib is imported although it should not be.
+    """
+    results = {}
+    for (moduleName, flagMatplotlibAllowed) in COLD_START_MODULES:
+        importTimes = []
+        processTimes = []
+        for _ in range(numOfRepeats):
+            result = measureColdStart(moduleName)
+            processTimes.append(result['processTimeInS'])
+            importTimes.append(result['timeInS'])
+        results[moduleName] = {
+            'importTimeInSMin': min(importTimes),
+            'importTimeInSMedian': float(np.median(importTimes)),
+            'processTimeInSMin': min(processTimes),
+            'flagMatplotlibImported': result['flagMatplotlibImported'],
+            'flagPassed': flagMatplotlibAllowed
+                or not result['flagMatplotlibImported']
+        }
+    return results
+
+def formatColdStartResults(coldStartResults):
+    lines = ['{:<28}{:>12}{:>14}{:>12}{:>8}'.format('Module', 'Import (ms)',
+        'Process (ms)', 'matplotlib', 'Check')]
+    for (moduleName, result) in coldStartResults.items():
+        lines.append('{:<28}{:>12.1f}{:>14.1f}{:>12}{:>8}'.format(moduleName,
+            1000*result['importTimeInSMin'], 1000*result['processTimeInSMin'],
+            'yes' if result['flagMatplotlibImported'] else 'no',
+            'ok' if result['flagPassed'] else 'FAILED'))
+    return '\n'.join(lines)
+
+def getGitCommit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+            cwd=pathToRepo, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def runBenchmarks(daysList, setsList, numOfRepeats=3, flagPipeline=False,
+    numOfWorkers=1, maxNumOfFramesPerSequence=10, flagReuseFigures=False,
+    flagLayeredBars=False, tier='final', flagColdStartOnly=False):
+    """
+    Run all the benchmarks (only the cold start one with flagColdStartOnly).
+    Returns the results as a dict.
+    """
+    results = {
+        'gitCommit': getGitCommit(),
+        'timestamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'matplotlib': matplotlib.__version__,
+        'numpy': np.__version__,
+        'numOfRepeats': numOfRepeats,
+        'coldStart': benchmarkColdStart(numOfRepeats),
+        'cases': []
+    }
+    print(formatColdStartResults(results['coldStart']))
+    if flagColdStartOnly:
+        return results
+    with tempfile.TemporaryDirectory() as tempDir:
+        for numOfDays in daysList:
+            for numOfSets in setsList:
+                pathToCsvFile = os.path.join(tempDir,
+                    'days_{}_sets_{}.csv'.format(numOfDays, numOfSets))
+                generateSyntheticCsv(pathToCsvFile, numOfDays, numOfSets)
+                case = {'numOfDays': numOfDays, 'numOfSets': numOfSets,
+                    'phases': {}, 'plots': {}}
+
+                ((header, data), case['phases']['load']) = benchmarkPhase(
+                    es.loadStatisticsFromCsv, numOfRepeats, pathToCsvFile)
+                (_, case['phases']['statistics']) = benchmarkPhase(
+                    StatisticsIndex, numOfRepeats, data)
+
+                for (caseName, plotFunction, kwargs) in getPlotCases(
+                    numOfDays, numOfSets):
+                    case['plots'][caseName] = benchmarkPlot(header, data,
+                        plotFunction, kwargs, numOfRepeats, tempDir)
+
+                if flagPipeline:
+                    case['pipeline'] = benchmarkPipeline(pathToCsvFile,
+                        os.path.join(tempDir, 'Output'), numOfWorkers,
+                        maxNumOfFramesPerSequence, flagReuseFigures,
+                        flagLayeredBars, tier)
+
+                results['cases'].append(case)
+                print('Done: {} days x {} sets'.format(numOfDays, numOfSets))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the exercise statistics code.')
+    parser.add_argument('--days', type=int, nargs='+', default=[30, 365],
+        help='Numbers of days for the synthetic datasets.')
+    parser.add_argument('--sets', type=int, nargs='+', default=[10],
+        help='Numbers of sets for the synthetic datasets.')
+    parser.add_argument('--repeats', type=int, default=3,
+        help='Number of repeats for each measurement.')
+    parser.add_argument('--pipeline', action='store_true',
+        help='Also benchmark the driver frame jobs with renderFrameJobs.')
+    parser.add_argument('--workers', type=int, default=1,
+        help='Number of worker processes for --pipeline.')
+    parser.add_argument('--frames-per-sequence', type=int, default=10,
+        help='Number of frames per sequence for --pipeline.')
+    parser.add_argument('--reuse-figures', action='store_true',
+        help='Use the figure reuse mode for --pipeline.')
+    parser.add_argument('--layered-bars', action='store_true',
+        help='Use the layered bar charts for --pipeline (with '
+            '--reuse-figures).')
+    parser.add_argument('--tier', choices=sorted(OUTPUT_TIER_DPIS),
+        default='final', help='Output tier for --pipeline.')
+    parser.add_argument('--cold-start-only', action='store_true',
+        help='Only run the cold start benchmark.')
+    parser.add_argument('--output', default='bench_results.json',
+        help='Path to the output JSON file.')
+    args = parser.parse_args()
+
+    results = runBenchmarks(args.days, args.sets, args.repeats,
+        args.pipeline, args.workers, args.frames_per_sequence,
+        args.reuse_figures or args.layered_bars, args.layered_bars,
+        args.tier, args.cold_start_only)
+    with open(args.output, mode='w') as outputFile:
+        json.dump(results, outputFile, indent=2)
+    print('Results saved to {}'.format(args.output))
+    if not all(result['flagPassed']
+        for result in results['coldStart'].values()):
+        sys.exit('Cold start check failed: matplotlib imported at start-up.')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Batch rendering for many workout datasets (e.g. one csv file per athlete and
+exercise) with one shared process pool.
+
+The frames of all the datasets are split into blocks of consecutive frames,
+and the blocks are interleaved round-robin over the datasets, so that all the
+datasets progress together and a long log does not hold back the others until
+the end of the run. Each block is rendered by one worker, which keeps a few
+datasets loaded (see renderScheduler.activateRenderDataset), so a dataset is
+only loaded once per worker in most cases, and consecutive frames of a
+sequence can still reuse the persistent figures with flagReuseFigures.
+
+Developed and tested with Python 3.8.
+"""
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .renderCache import RenderCache
+from .renderScheduler import activateRenderDataset, getDefaultNumOfWorkers, \
+    getFrameJobsToRender, preloadPlottingModules, renderFrameJob
+from .tableSnapshot import loadWorkoutTableIncrementally
+from .workoutTable import loadWorkoutTable
+
+# One dataset to render.
+#   pathToCsvFile: Path to the workout csv file.
+#   outputDir: Output folder for the frames of this dataset.
+#   frameJobs: A list of renderScheduler.FrameJob.
+#   table: The WorkoutTable of the csv file if it is already loaded (used for
+#       the render cache), or None.
+BatchDataset = namedtuple('BatchDataset',
+    ['pathToCsvFile', 'outputDir', 'frameJobs', 'table'], defaults=(None,))
+
+# A block of consecutive frames of one dataset, rendered by one worker.
+#   idxDataset: Index of the dataset in the batch.
+#   frameJobs: The frames to render.
+FrameJobBlock = namedtuple('FrameJobBlock', ['idxDataset', 'frameJobs'])
+
+# Options for the (worker) process, set up by initBatchRenderWorker.
+_batchOptions = {}
+
+def initBatchRenderWorker(datasetPaths, flagReuseFigures=False,
+    flagUseSnapshot=False):
+    """
+    Set up the current (worker) process. The datasets, as a list of
+    (pathToCsvFile, outputDir), are only loaded when needed.
+    """
+    _batchOptions.update({
+        'datasetPaths': datasetPaths,
+        'flagReuseFigures': flagReuseFigures,
+        'flagUseSnapshot': flagUseSnapshot
+    })
+
+def renderFrameJobBlock(frameJobBlock):
+    """
+    Render a block of frames of one dataset in the current (worker) process.
+    Returns (idxDataset, number of frames rendered).
+    """
+    (pathToCsvFile, outputDir) = _batchOptions['datasetPaths'][
+        frameJobBlock.idxDataset]
+    activateRenderDataset(pathToCsvFile, outputDir,
+        _batchOptions['flagReuseFigures'], _batchOptions['flagUseSnapshot'])
+    for frameJob in frameJobBlock.frameJobs:
+        renderFrameJob(frameJob)
+    return (frameJobBlock.idxDataset, len(frameJobBlock.frameJobs))
+
+def interleaveFrameJobBlocks(frameJobsPerDataset, blockSize):
+    """
+    Split the frames of each dataset into blocks of (at most) blockSize
+    consecutive frames, and interleave the blocks round-robin over the
+    datasets. Returns a list of FrameJobBlock.
+    """
+    blocksPerDataset = [
+        [FrameJobBlock(idxDataset, frameJobs[idxStart:idxStart+blockSize])
+            for idxStart in range(0, len(frameJobs), blockSize)]
+        for (idxDataset, frameJobs) in enumerate(frameJobsPerDataset)]
+    frameJobBlocks = []
+    for idxBlock in range(max([len(b) for b in blocksPerDataset]+[0])):
+        for blocks in blocksPerDataset:
+            if idxBlock<len(blocks):
+                frameJobBlocks.append(blocks[idxBlock])
+    return frameJobBlocks
+
+class BatchProgress(object):
+    """
+    Progress and throughput of a batch run.
+    """
+    def __init__(self, numsOfFrames):
+        self.numsOfFrames = list(numsOfFrames)
+        self.numsOfFramesDone = [0]*len(self.numsOfFrames)
+        self.startTime = time.perf_counter()
+
+    def update(self, idxDataset, numOfFramesDone):
+        self.numsOfFramesDone[idxDataset] += numOfFramesDone
+
+    @property
+    def numOfFrames(self):
+        return sum(self.numsOfFrames)
+
+    @property
+    def numOfFramesDone(self):
+        return sum(self.numsOfFramesDone)
+
+    @property
+    def numOfDatasetsDone(self):
+        return sum(done==total for (done, total)
+            in zip(self.numsOfFramesDone, self.numsOfFrames))
+
+    def getElapsedTimeInS(self):
+        return time.perf_counter()-self.startTime
+
+    def getFramesPerS(self):
+        elapsedTimeInS = self.getElapsedTimeInS()
+        return self.numOfFramesDone/elapsedTimeInS if elapsedTimeInS>0 else 0
+
+    def formatStatus(self):
+        framesPerS = self.getFramesPerS()
+        numOfFramesLeft = self.numOfFrames-self.numOfFramesDone
+        etaStr = '{:.0f} s'.format(numOfFramesLeft/framesPerS) \
+            if framesPerS>0 else '-'
+        return ('{}/{} frames ({:.1f}%), {}/{} datasets done, '
+            '{:.2f} frames/s, {:.0f} s elapsed, ETA {}').format(
+            self.numOfFramesDone, self.numOfFrames,
+            100*self.numOfFramesDone/max(self.numOfFrames, 1),
+            self.numOfDatasetsDone, len(self.numsOfFrames), framesPerS,
+            self.getElapsedTimeInS(), etaStr)
+
+def renderBatch(datasets, numOfWorkers=None, blockSize=16,
+    flagReuseFigures=False, flagUseCache=False, flagUseSnapshot=False,
+    progressCallback=None):
+    """
+    Render the frames of a list of BatchDataset on one process pool with
+    numOfWorkers processes (one per CPU core by default). With flagUseCache,
+    only the frames whose inputs changed since the last run are rendered (with
+    one cache manifest per output folder, saved at checkpoints during the
+    run). progressCallback, if given, is
+    called with the BatchProgress each time a block of frames is done. Returns
+    the BatchProgress.
+    """
+    if numOfWorkers is None:
+        numOfWorkers = getDefaultNumOfWorkers()
+
+    frameJobsPerDataset = []
+    renderCaches = []
+    # The cache keys of the frames to render for each dataset, by file name.
+    frameKeysPerDataset = []
+    for dataset in datasets:
+        if not os.path.exists(dataset.outputDir):
+            os.makedirs(dataset.outputDir)
+        if flagUseCache:
+            table = dataset.table
+            if table is None and flagUseSnapshot:
+                table = loadWorkoutTableIncrementally(dataset.pathToCsvFile)
+            elif table is None:
+                table = loadWorkoutTable(dataset.pathToCsvFile)
+            renderCache = RenderCache(dataset.outputDir)
+            (frameJobs, frameKeys) = getFrameJobsToRender(table,
+                dataset.frameJobs, renderCache, flagReuseFigures)
+            frameKeys = dict(zip((f.fileName for f in frameJobs), frameKeys))
+        else:
+            (frameJobs, frameKeys, renderCache) = (dataset.frameJobs, None,
+                None)
+        frameJobsPerDataset.append(frameJobs)
+        frameKeysPerDataset.append(frameKeys)
+        renderCaches.append(renderCache)
+
+    frameJobBlocks = interleaveFrameJobBlocks(frameJobsPerDataset, blockSize)
+    initArgs = ([(dataset.pathToCsvFile, dataset.outputDir)
+        for dataset in datasets], flagReuseFigures, flagUseSnapshot)
+    progress = BatchProgress([len(f) for f in frameJobsPerDataset])
+
+    def recordBlock(frameJobBlock):
+        idxDataset = frameJobBlock.idxDataset
+        renderCache = renderCaches[idxDataset]
+        if renderCache is not None:
+            for frameJob in frameJobBlock.frameJobs:
+                renderCache.update(frameJob.fileName,
+                    frameKeysPerDataset[idxDataset][frameJob.fileName])
+            renderCache.checkpoint()
+        progress.update(idxDataset, len(frameJobBlock.frameJobs))
+        if progressCallback is not None:
+            progressCallback(progress)
+
+    # Record the frames done even if the run is interrupted.
+    try:
+        if numOfWorkers<=1:
+            initBatchRenderWorker(*initArgs)
+            for frameJobBlock in frameJobBlocks:
+                renderFrameJobBlock(frameJobBlock)
+                recordBlock(frameJobBlock)
+        else:
+            preloadPlottingModules()
+            with ProcessPoolExecutor(max_workers=numOfWorkers,
+                initializer=initBatchRenderWorker,
+                initargs=initArgs) as executor:
+                futures = {executor.submit(renderFrameJobBlock, block): block
+                    for block in frameJobBlocks}
+                for future in as_completed(futures):
+                    future.result()
+                    recordBlock(futures[future])
+    finally:
+        for renderCache in renderCaches:
+            if renderCache is not None:
+                renderCache.save()
+    return progress
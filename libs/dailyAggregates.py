@@ -0,0 +1,95 @@
+"""
+Per-day aggregate columns of a workout table.
+
+The aggregates are derived from the set values (and the WorkoutTime) for all
+the rows at once when a WorkoutTable is constructed, so that the plotting
+functions and any further analysis only slice the arrays:
+
+    1. dailyTotals: The total repetition value of each day;
+    2. firstSetReps: The first-set repetition value of each day;
+    3. maxSetReps: The largest set of each day;
+    4. numsOfSets: The number of sets done (i.e. not 0) each day;
+    5. repsPerWorkoutMinute: The total repetition value per minute of the
+       WorkoutTime, with NaN for the days without a valid WorkoutTime.
+
+The daily totals are validated against the Sum field of the csv file (if
+available), and the rows where they differ are listed as SumMismatch. Example:
+
+    table = loadWorkoutTable('20200401_PullUps.csv')
+    for line in formatSumMismatches(table.dailyAggregates.sumMismatches):
+        print(line)
+    maxSetReps = table.dailyAggregates.maxSetReps[:numOfRowsToShow]
+
+Developed and tested with Python 3.8.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+# Placeholder for Sum cells that are missing.
+MISSING_SUM = -1
+
+# A row whose Sum field differs from the total of its sets.
+SumMismatch = namedtuple('SumMismatch', ['idxRow', 'recordedSum',
+    'dailyTotal'])
+
+def getRepsPerWorkoutMinute(dailyTotals, workoutTimesInS):
+    """
+    Get the repetition values per minute of the WorkoutTime, with NaN for the
+    days whose WorkoutTime is missing (negative) or 0.
+    """
+    workoutTimesInS = np.asarray(workoutTimesInS)
+    flagsValid = workoutTimesInS>0
+    repsPerWorkoutMinute = np.full(len(workoutTimesInS), np.nan)
+    repsPerWorkoutMinute[flagsValid] = dailyTotals[flagsValid] \
+        /(workoutTimesInS[flagsValid]/60.0)
+    return repsPerWorkoutMinute
+
+def getSumMismatches(dailyTotals, recordedSums):
+    """
+    Compare the daily totals with the Sum fields recorded (MISSING_SUM for
+    the cells to skip). Returns a list of SumMismatch, ordered by row.
+    """
+    recordedSums = np.asarray(recordedSums)
+    idxsMismatch = np.flatnonzero((recordedSums!=MISSING_SUM)
+        & (recordedSums!=dailyTotals))
+    return [SumMismatch(int(idxRow), int(recordedSums[idxRow]),
+            int(dailyTotals[idxRow]))
+        for idxRow in idxsMismatch]
+
+class DailyAggregates(object):
+    """
+    The per-day aggregates of a table (see the module docstring).
+
+    Attributes:
+        dailyTotals, firstSetReps, maxSetReps, numsOfSets: int64 arrays with
+            one value for each row.
+        repsPerWorkoutMinute: A float64 array with one value for each row, or
+            None if the WorkoutTime is not available.
+        sumMismatches: A list of SumMismatch for the rows whose Sum field
+            differs from the daily total (empty if the field is not
+            available).
+    """
+    def __init__(self, setValues, workoutTimesInS=None, recordedSums=None):
+        setValues = np.asarray(setValues)
+        self.dailyTotals = setValues.sum(axis=1, dtype=np.int64)
+        if setValues.shape[1]>0:
+            self.firstSetReps = setValues[:, 0].astype(np.int64)
+            self.maxSetReps = setValues.max(axis=1).astype(np.int64)
+        else:
+            self.firstSetReps = np.zeros(setValues.shape[0], dtype=np.int64)
+            self.maxSetReps = np.zeros(setValues.shape[0], dtype=np.int64)
+        self.numsOfSets = np.count_nonzero(setValues, axis=1).astype(np.int64)
+        self.repsPerWorkoutMinute = None if workoutTimesInS is None \
+            else getRepsPerWorkoutMinute(self.dailyTotals, workoutTimesInS)
+        self.sumMismatches = [] if recordedSums is None \
+            else getSumMismatches(self.dailyTotals, recordedSums)
+
+def formatSumMismatches(sumMismatches):
+    """
+    Format the Sum mismatches of a table as lines of a report, with the rows
+    numbered from 1 (as the data rows of the csv file).
+    """
+    return ['Row {}: Sum {} != {} (total of the sets)'.format(
+            mismatch.idxRow+1, mismatch.recordedSum, mismatch.dailyTotal)
+        for mismatch in sumMismatches]
@@ -0,0 +1,203 @@
+"""
+Vectorized aggregates of the duration fields (WorkoutTime and RawVideoTime).
+
+The durations are stored as int seconds, with MISSING_DURATION for the cells
+which are missing or can not be parsed (see workoutTable). The aggregates are
+computed with NumPy for all the rows at once, skipping the missing durations:
+
+    1. Rolling means and medians over the latest windowSize rows up to each
+       row (fewer for the first rows of the table);
+    2. Weekly (starting on Mondays) and monthly totals;
+    3. The efficiency ratio of WorkoutTime to RawVideoTime, i.e. the share of
+       the recorded video actually spent on the workout, per row and over the
+       rolling windows.
+
+A rolling window only covers the rows up to its last one, so the values for a
+frame showing the first numOfRowsToShow rows are just the first
+numOfRowsToShow values of the arrays. Example:
+
+    durationStatistics = getDurationStatistics(table, windowSize=7)
+    rollingMeansInS = durationStatistics.getRollingMeansInS(
+        'WorkoutTime')[:numOfRowsToShow]
+    (weekStarts, weeklyTotalsInS, _) = durationStatistics.getPeriodTotals(
+        'WorkoutTime', 'week', numOfRowsToShow)
+
+Developed and tested with Python 3.8.
+"""
+import warnings
+
+import numpy as np
+# Support running the files directly under ./libs for testing.
+try:
+    from .workoutTable import DURATION_FIELDS, MISSING_DURATION
+except ImportError:
+    from workoutTable import DURATION_FIELDS, MISSING_DURATION
+
+# Default number of rows of the rolling windows.
+DEFAULT_WINDOW_SIZE = 7
+
+# A Monday, for aligning the weeks.
+_MONDAY = np.datetime64('1970-01-05', 'D')
+
+def getValidDurationFlags(durationsInS):
+    return np.asarray(durationsInS)!=MISSING_DURATION
+
+def getRollingSums(values, windowSize):
+    """
+    Get the sums of values over the latest windowSize elements up to each
+    element (fewer for the first ones), via prefix sums.
+    """
+    if windowSize<1:
+        raise ValueError("windowSize should be at least 1!")
+    prefixSums = np.zeros(len(values)+1, dtype=np.float64)
+    np.cumsum(values, out=prefixSums[1:])
+    idxsEnd = np.arange(1, len(values)+1)
+    return prefixSums[idxsEnd]-prefixSums[np.maximum(idxsEnd-windowSize, 0)]
+
+def getRollingMeans(durationsInS, windowSize=DEFAULT_WINDOW_SIZE):
+    """
+    Get the means of the valid durations over the rolling windows, with NaN
+    for the windows without any.
+    """
+    flagsValid = getValidDurationFlags(durationsInS)
+    sums = getRollingSums(np.where(flagsValid, durationsInS, 0), windowSize)
+    counts = getRollingSums(flagsValid, windowSize)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts>0, sums/counts, np.nan)
+
+def getRollingMedians(durationsInS, windowSize=DEFAULT_WINDOW_SIZE):
+    """
+    Get the medians of the valid durations over the rolling windows, with NaN
+    for the windows without any.
+    """
+    if windowSize<1:
+        raise ValueError("windowSize should be at least 1!")
+    durationsInS = np.asarray(durationsInS)
+    # Pad the front so that there is one window ending at each row.
+    paddedValues = np.full(len(durationsInS)+windowSize-1, np.nan)
+    paddedValues[windowSize-1:] = np.where(
+        getValidDurationFlags(durationsInS), durationsInS, np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(paddedValues,
+        windowSize)
+    with warnings.catch_warnings():
+        # Windows without valid durations are expected.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return np.nanmedian(windows, axis=1)
+
+def getPeriodStarts(dates, period):
+    """
+    Get the first day of the period ('week', starting on Monday, or 'month')
+    of each date.
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if period=='week':
+        return dates-((dates-_MONDAY).astype(np.int64)%7).astype(
+            'timedelta64[D]')
+    if period=='month':
+        return dates.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError("Unknown period {}!".format(period))
+
+def getPeriodTotals(dates, durationsInS, period):
+    """
+    Get the totals of the valid durations per period ('week' or 'month').
+    Returns (periodStarts, totalsInS, numsOfDays): the first days of the
+    periods with any rows (sorted), the int64 totals and the numbers of rows
+    with valid durations in each period.
+    """
+    (periodStarts, idxsPeriod) = np.unique(getPeriodStarts(dates, period),
+        return_inverse=True)
+    flagsValid = getValidDurationFlags(durationsInS)
+    totalsInS = np.bincount(idxsPeriod,
+        weights=np.where(flagsValid, durationsInS, 0),
+        minlength=len(periodStarts)).astype(np.int64)
+    numsOfDays = np.bincount(idxsPeriod, weights=flagsValid,
+        minlength=len(periodStarts)).astype(np.int64)
+    return (periodStarts, totalsInS, numsOfDays)
+
+def getEfficiencyRatios(workoutTimesInS, rawVideoTimesInS, windowSize=1):
+    """
+    Get the ratios of the WorkoutTime to the RawVideoTime over the rolling
+    windows (of each row for windowSize 1), only counting the rows with both
+    durations valid and with NaN for the windows without any.
+    """
+    flagsValid = getValidDurationFlags(workoutTimesInS) \
+        & getValidDurationFlags(rawVideoTimesInS)
+    workoutSums = getRollingSums(np.where(flagsValid, workoutTimesInS, 0),
+        windowSize)
+    rawVideoSums = getRollingSums(np.where(flagsValid, rawVideoTimesInS, 0),
+        windowSize)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(rawVideoSums>0, workoutSums/rawVideoSums, np.nan)
+
+class DurationStatistics(object):
+    """
+    Rolling aggregates of the duration fields of a WorkoutTable, computed on
+    first use for all the rows.
+
+    Attributes:
+        windowSize: The number of rows of the rolling windows.
+        durations: A dict of the int second arrays of the duration fields
+            available, by field name ('WorkoutTime' or 'RawVideoTime').
+    """
+    def __init__(self, table, windowSize=DEFAULT_WINDOW_SIZE):
+        if windowSize<1:
+            raise ValueError("windowSize should be at least 1!")
+        self.windowSize = windowSize
+        self.dates = table.dates
+        self.durations = {field: getattr(table, attributeName)
+            for (field, attributeName) in DURATION_FIELDS
+            if getattr(table, attributeName) is not None}
+        self._cache = {}
+
+    def getDurations(self, field):
+        if field not in self.durations:
+            raise ValueError("Field {} is not available!".format(field))
+        return self.durations[field]
+
+    def _getCached(self, key, function, *args):
+        if key not in self._cache:
+            self._cache[key] = function(*args)
+        return self._cache[key]
+
+    def getRollingMeansInS(self, field):
+        """
+        Get the rolling means of a duration field, one for each row.
+        """
+        return self._getCached(('mean', field), getRollingMeans,
+            self.getDurations(field), self.windowSize)
+
+    def getRollingMediansInS(self, field):
+        """
+        Get the rolling medians of a duration field, one for each row.
+        """
+        return self._getCached(('median', field), getRollingMedians,
+            self.getDurations(field), self.windowSize)
+
+    def getEfficiencyRatios(self, flagRolling=False):
+        """
+        Get the WorkoutTime to RawVideoTime ratio of each row, or over the
+        rolling windows with flagRolling.
+        """
+        return self._getCached(('efficiency', flagRolling),
+            getEfficiencyRatios, self.getDurations('WorkoutTime'),
+            self.getDurations('RawVideoTime'),
+            self.windowSize if flagRolling else 1)
+
+    def getPeriodTotals(self, field, period, numOfRowsToShow=None):
+        """
+        Get the totals of a duration field per period ('week' or 'month') over
+        the first numOfRowsToShow rows (all by default), as for
+        getPeriodTotals.
+        """
+        return getPeriodTotals(self.dates[:numOfRowsToShow],
+            self.getDurations(field)[:numOfRowsToShow], period)
+
+def getDurationStatistics(table, windowSize=DEFAULT_WINDOW_SIZE):
+    """
+    Get the DurationStatistics of a WorkoutTable for a window size. They are
+    built on first use and cached in the table.
+    """
+    if windowSize not in table.durationStatistics:
+        table.durationStatistics[windowSize] = DurationStatistics(table,
+            windowSize)
+    return table.durationStatistics[windowSize]
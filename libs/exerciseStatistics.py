@@ -11,32 +11,95 @@ Developed and tested with Python 3.8.
 
 Yaguang Zhang, 2020/05/01
 """
-# For loading data from a csv file.
-import csv
-# For date formatting.
-import datetime
-# For plotting.
-from mpl_toolkits.mplot3d import Axes3D
-import matplotlib.pyplot as plt
 import numpy as np
-# For setting font in the plot.
-from pylab import mpl
-from matplotlib.ticker import MaxNLocator
-
-def loadStatisticsFromCsv(pathToCsvFile):
+# For the columnar data storage. Support running this file directly under
+# ./libs for testing.
+try:
+    from .workoutTable import WorkoutTable, loadWorkoutTable, toWorkoutTable
+    from .statisticsIndex import getStatisticsIndex
+    from .durationStatistics import getDurationStatistics, \
+        getValidDurationFlags
+    from .seriesReduction import reduceSeries
+    from .phaseProfiler import getPhaseTimer
+    from .tableSnapshot import loadWorkoutTableIncrementally
+except ImportError:
+    from workoutTable import WorkoutTable, loadWorkoutTable, toWorkoutTable
+    from statisticsIndex import getStatisticsIndex
+    from durationStatistics import getDurationStatistics, \
+        getValidDurationFlags
+    from seriesReduction import reduceSeries
+    from phaseProfiler import getPhaseTimer
+    from tableSnapshot import loadWorkoutTableIncrementally
+
+# For plotting. Matplotlib (with its 3D toolkit) and plotStyle are only
+# imported by the first plot (see loadPlottingModules), so that the data
+# loading and statistics functions can be used without importing them. The
+# names are still available as attributes of this module (e.g. es.plt).
+PLOTTING_NAMES = ('Axes3D', 'Poly3DCollection', 'plt', 'FigureCanvasAgg',
+    'Figure', 'MaxNLocator', 'getPlotStyle')
+_flagPlottingModulesLoaded = False
+
+def loadPlottingModules():
+    """
+    Import the plotting modules into the namespace of this module, if not
+    done yet.
+    """
+    global _flagPlottingModulesLoaded, Axes3D, Poly3DCollection, plt, \
+        FigureCanvasAgg, Figure, MaxNLocator, getPlotStyle
+    if _flagPlottingModulesLoaded:
+        return
+    from mpl_toolkits.mplot3d import Axes3D
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.ticker import MaxNLocator
+    try:
+        from .plotStyle import getPlotStyle
+    except ImportError:
+        from plotStyle import getPlotStyle
+    _flagPlottingModulesLoaded = True
+
+def __getattr__(name):
+    # Only called for the names not found, i.e. the plotting ones before the
+    # first plot.
+    if name in PLOTTING_NAMES:
+        loadPlottingModules()
+        return globals()[name]
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
+def loadStatisticsFromCsv(pathToCsvFile, flagUseSnapshot=False,
+    flagSaveSnapshot=True):
     """
     Load data from the input csv file.
 
-    The data will be output in a list of dict, with each list element containing
-    data from one row of the csv file.
+    The data will be output as a WorkoutTable, with all the set values, dates
+    and durations parsed once here, so that the plotting functions do not need
+    to parse strings again for each plot.
+
+    With flagUseSnapshot, the parsed data is kept in a binary snapshot file
+    next to the csv file, and only the rows appended since the last load are
+    parsed (see tableSnapshot). The snapshot is only updated with
+    flagSaveSnapshot.
     """
-    with open(pathToCsvFile, mode='r') as csvFile:
-        csvDictReader = csv.DictReader(csvFile)
-        header = csvDictReader.fieldnames
-        data = [row for row in csvDictReader]
-        return (header, data)
+    if flagUseSnapshot:
+        table = loadWorkoutTableIncrementally(pathToCsvFile,
+            flagSaveSnapshot=flagSaveSnapshot)
+    else:
+        table = loadWorkoutTable(pathToCsvFile)
+    return (table.header, table)
 
-def autoLabelBarChart(rects, ax, fontsize='large'):
+def getFontKwargs(fontsize, fontProperties=None):
+    """
+    Get the keyword arguments for the font of a text: fontProperties (with
+    the size set) if it is given, otherwise just fontsize.
+    """
+    if fontProperties is None:
+        return dict(fontsize=fontsize)
+    return dict(fontproperties=fontProperties)
+
+def autoLabelBarChart(rects, ax, fontsize='large', fontProperties=None):
     """
     Attach a text label above each bar displaying its height
     """
@@ -45,7 +108,8 @@ def autoLabelBarChart(rects, ax, fontsize='large'):
         if height!=0:
             ax.text(rect.get_x() + rect.get_width()/2., 1.005*height,
                 '%d' % int(height), weight='bold',
-                ha='center', va='bottom', fontsize=fontsize)
+                ha='center', va='bottom',
+                **getFontKwargs(fontsize, fontProperties))
 
 # Color map to use (based on Matlab).
 colorMap = (
@@ -59,37 +123,253 @@ colorMap = (
 )
 
 def getNumsOfRowsAndSets(header, data):
-    totalNumOfRows = len(data)
-    fieldsForSets  = [field for field in header
-        if field.lower().startswith('set')]
-    totalNumOfSets = len(fieldsForSets)
-    return (totalNumOfRows, totalNumOfSets)
+    table = toWorkoutTable(header, data)
+    return (table.numOfRows, table.numOfSets)
+
+def getDayNumber(table, idxRow):
+    """
+    Get the day number (starting from 1) of a row, counting the days before
+    the first row of the table (see WorkoutTable.idxFirstRow).
+    """
+    return table.idxFirstRow+idxRow+1
 
 def constructTitleFromDate(data, idxRow):
     """
-    Construct title string from date string (e.g. "4/1/2020").
+    Construct title string from the date of a row (e.g. "4/1/2020").
     """
-    dateStr = data[idxRow]['Date']
-    (monthStr, dateStr, yearStr) = dateStr.split('/')
+    date = data.getDate(idxRow)
     return "第{}天（{}年{}月{}日）".format(
-        idxRow+1, yearStr, monthStr, dateStr)
+        getDayNumber(data, idxRow), date.year, date.month, date.day)
+
+def getIdxFirstRowToShow(numOfRowsToShow, maxNumOfHistoryRows=None):
+    """
+    Get the index of the first row to show in the 3D bar chart, with at most
+    maxNumOfHistoryRows rows (all rows if it is None) up to the latest one.
+    """
+    if maxNumOfHistoryRows is None:
+        return 0
+    if maxNumOfHistoryRows<1:
+        raise ValueError("maxNumOfHistoryRows should be at least 1!")
+    return max(numOfRowsToShow-maxNumOfHistoryRows, 0)
+
+def getHistSetValues(table, numOfRowsToShow, numOfSetsToShowForLastRow,
+    idxFirstRow=0):
+    """
+    Get the set values for the days to show (from row idxFirstRow), with the
+    sets not done yet for the last row zeroed out.
+    """
+    histSetValues = table.setValues[idxFirstRow:numOfRowsToShow].copy()
+    histSetValues[-1, numOfSetsToShowForLastRow:] = 0
+    return histSetValues
+
+def plotBarChart2d(ax, setValues, numOfSetsToShowForLastRow, tickSize,
+    fontProperties=None):
+    """
+    Plot the set values of one day as a 2D bar chart. Returns the artists
+    created. The value labels use fontProperties if it is given.
+    """
+    color = colorMap[0]
+    alpha = 0.8
+
+    # Show at least 5 sets along the x axis.
+    minNumSetsToShow = 5
+    numOfSetsToShow = max(minNumSetsToShow, numOfSetsToShowForLastRow)
+
+    xs = [v+1 for v in range(numOfSetsToShow)]
+    # Records with fewer sets are padded with sets not done.
+    ys = np.zeros(numOfSetsToShow, dtype=setValues.dtype)
+    ys[:min(len(setValues), numOfSetsToShow)] = setValues[:numOfSetsToShow]
+    barchart = ax.bar(xs, ys, color=color, alpha=alpha)
+    numOfTexts = len(ax.texts)
+    autoLabelBarChart(barchart, ax, tickSize, fontProperties)
+    return list(barchart)+list(ax.texts[numOfTexts:])
+
+def getBarAlphas(numOfRowsToShow):
+    """
+    Get the alpha value for each row in the 3D bar chart. We will gradually
+    decrease alpha for history results, and the latest row is opaque.
+    """
+    barAlphaMax = 1
+    barAlphaMin = 0.3
+    barAlphaStep = 0.1
+    ages = np.arange(numOfRowsToShow-1, -1, -1)
+    return np.maximum(barAlphaMax-ages*barAlphaStep, barAlphaMin)
+
+def getBarChart3dPolygons(histSetValues, idxFirstRow=0, barWidth=0.8):
+    """
+    Get the polygons for the 3D bars of all days to show at once: each bar is
+    a rectangle in the x-z plane at y = (days before the latest day). Bars of
+    zero height are left out. Returns (verts, faceColors, limits), with verts
+    of size numOfBars x 4 x 3, faceColors the RGBA colors of the bars (with
+    the row colors from colorMap by the row index in the whole table, so that
+    a day keeps its color when older days are not shown), and limits the
+    (xs, ys, zs) extents of all the bars for autoscaling.
+    """
+    (numOfRowsToShow, totalNumOfSets) = histSetValues.shape
+    (idxsRow, idxsSet) = np.meshgrid(np.arange(numOfRowsToShow),
+        np.arange(totalNumOfSets), indexing='ij')
+    xsLeft = (idxsSet+1-barWidth/2).ravel()
+    xsRight = xsLeft+barWidth
+    ys = (numOfRowsToShow-1-idxsRow).ravel().astype(float)
+    heights = histSetValues.ravel().astype(float)
+    zeros = np.zeros_like(heights)
+
+    verts = np.stack([
+        np.stack([xsLeft, ys, zeros], axis=-1),
+        np.stack([xsRight, ys, zeros], axis=-1),
+        np.stack([xsRight, ys, heights], axis=-1),
+        np.stack([xsLeft, ys, heights], axis=-1)], axis=1)
+
+    rowColors = np.array(colorMap)[
+        (idxFirstRow+np.arange(numOfRowsToShow))%len(colorMap)]
+    faceColors = np.concatenate([rowColors,
+        getBarAlphas(numOfRowsToShow)[:, np.newaxis]], axis=1)
+    faceColors = np.repeat(faceColors, totalNumOfSets, axis=0)
+
+    limits = (verts[:, :, 0].ravel(), verts[:, :, 1].ravel(),
+        verts[:, :, 2].ravel())
+    flagsNonzero = heights!=0
+    return (verts[flagsNonzero], faceColors[flagsNonzero], limits)
+
+def plotBarChart3d(ax, histSetValues, numOfSetsToShowForLastRow, tickSize,
+    idxFirstRow=0, flagBatchBars=True, fontProperties=None,
+    flagSeparateLastRow=False):
+    """
+    Plot the set values of all days to show as 3D bars, with the plot for the
+    latest date shown at front. With flagBatchBars, all the bars are drawn as
+    one Poly3DCollection, instead of one bar patch per set and day; with
+    flagSeparateLastRow as well, the bars of the latest date are drawn as a
+    second Poly3DCollection, right after the first one in the artists
+    returned. The bar colors are picked by the row index in the whole history,
+    starting from idxFirstRow for the first row of histSetValues. Returns the
+    artists created. The value labels use fontProperties
+    if it is given.
+    """
+    loadPlottingModules()
+    (numOfRowsToShow, totalNumOfSets) = histSetValues.shape
+    xs = [v+1 for v in range(totalNumOfSets)]
+    ys = histSetValues[-1]
+    z = 0
+    artists = []
+    if flagBatchBars:
+        (verts, faceColors, limits) = getBarChart3dPolygons(histSetValues,
+            idxFirstRow)
+        hadData = ax.has_data()
+        if flagSeparateLastRow:
+            # The latest date is at y = 0.
+            flagsLastRow = verts[:, 0, 1]==0
+            vertsPerCollection = [verts[~flagsLastRow], verts[flagsLastRow]]
+            faceColorsPerCollection = [faceColors[~flagsLastRow],
+                faceColors[flagsLastRow]]
+        else:
+            vertsPerCollection = [verts]
+            faceColorsPerCollection = [faceColors]
+        for (collectionVerts, collectionFaceColors) in zip(vertsPerCollection,
+            faceColorsPerCollection):
+            bars = Poly3DCollection(collectionVerts,
+                facecolors=collectionFaceColors, edgecolors='none')
+            ax.add_collection3d(bars)
+            artists.append(bars)
+        ax.auto_scale_xyz(*limits, hadData)
+    else:
+        barAlphas = getBarAlphas(numOfRowsToShow)
+        for ir in range(numOfRowsToShow):
+            color = colorMap[(idxFirstRow+ir)%len(colorMap)]
+            artists += list(ax.bar(xs, histSetValues[ir],
+                zs=numOfRowsToShow-ir-1, zdir='y', color=color,
+                alpha=barAlphas[ir]))
+    """
+    # MatPlotLib has issues with 3D object visualization. Obstruction
+    # may be rendered incorrectly (bar3d does not help).
+    ```
+    x = xs
+    y = np.ones_like(ys)
+    bottom = np.zeros_like(ys)
+    width = depth = 1
+    dz = ys
+    ax.bar3d(x, y, bottom, width, depth, dz)
+    ```
+    """
+
+    # Add values to the latest row.
+    for x,y in zip(
+        xs[:numOfSetsToShowForLastRow],
+        ys[:numOfSetsToShowForLastRow]):
+        artists.append(ax.text(x, z, y, int(y), weight='bold',
+            horizontalalignment='center', verticalalignment='bottom',
+            **getFontKwargs(tickSize, fontProperties)))
+    return artists
+
+def createFigure(style, flagUsePyplot=True):
+    """
+    Create a new figure with the figure size of style. With flagUsePyplot,
+    the figure is created via pyplot (and has to be closed with plt.close);
+    otherwise, it is a standalone Figure with an Agg canvas, which is not
+    tracked by pyplot, so that figures can be created and drawn concurrently
+    in threads.
+    """
+    loadPlottingModules()
+    if flagUsePyplot:
+        return plt.figure(figsize=style.figureSize)
+    fig = Figure(figsize=style.figureSize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def applyTightLayout(fig):
+    """
+    Adjust the layout of a figure via tight_layout. Since matplotlib 3.6,
+    tight_layout leaves a placeholder layout engine on the figure, for which
+    each savefig draws the whole figure once more (without rendering) before
+    drawing it, so the engine is removed again.
+    """
+    fig.tight_layout()
+    if hasattr(fig, 'set_layout_engine'):
+        fig.set_layout_engine(None)
+
+def setTickLabelFonts(ax, fontProperties):
+    """
+    Set the font of the major tick labels of all the axes of ax explicitly,
+    instead of via the rcParams at drawing time. Ticks created later copy
+    the font of the first tick.
+    """
+    axes = [ax.xaxis, ax.yaxis]
+    if hasattr(ax, 'zaxis'):
+        axes.append(ax.zaxis)
+    for axis in axes:
+        for tick in axis.get_major_ticks():
+            tick.label1.set_fontproperties(fontProperties)
+            tick.label2.set_fontproperties(fontProperties)
 
 def plot3dBarChart(header, data,
     numOfRowsToShow=None, numOfSetsToShowForLastRow=None,
     fontInPlot='Microsoft YaHei', flagShowPlot=False, titleEndPad=0, zTickPad=0,
     figureSize=None, labelSize='large', titleSize='large', tickSize='large',
     labelPad3D = None, extraLabelPadZ=0,
-    camView=(None, None), titleY=1, titleLoc='center'):
+    camView=(None, None), titleY=1, titleLoc='center',
+    maxNumOfHistoryRows=None, flagBatchBars=True, style=None,
+    flagUsePyplot=True):
     """
     Plot the repetition number of each set of interest in a 3-dimensional bar
     chart plot. The plot will degenerate to a 2-dimensional one if there is only
     one day of data to show.
-    """
-    (totalNumOfRows, totalNumOfSets) = getNumsOfRowsAndSets(header, data)
 
-    fieldsForSets  = [field for field in header
-        if field.lower().startswith('set')]
-    totalNumOfSets = len(fieldsForSets)
+    At most maxNumOfHistoryRows days up to the latest one are shown (all days
+    by default), so that the cost of a frame does not grow with the history.
+    With flagBatchBars, all the bars are drawn as one collection (see
+    plotBarChart3d).
+
+    The font, font sizes and figure size are taken from style (a
+    plotStyle.PlotStyle) if it is given, instead of fontInPlot, labelSize,
+    titleSize, tickSize and figureSize. The fonts are set explicitly for all
+    the texts. Without flagUsePyplot, neither pyplot nor the global rcParams
+    are used (see createFigure), so that frames can be rendered concurrently
+    in threads; flagShowPlot is then not available.
+    """
+    # Opt-in timing of the phases (see phaseProfiler).
+    phaseTimer = getPhaseTimer('plot3dBarChart')
+    phaseTimer.start('dataExtraction')
+    table = toWorkoutTable(header, data)
+    (totalNumOfRows, totalNumOfSets) = (table.numOfRows, table.numOfSets)
 
     # By default, plot all the data.
     if numOfRowsToShow is None:
@@ -97,156 +377,160 @@ def plot3dBarChart(header, data,
     if numOfSetsToShowForLastRow is None:
         numOfSetsToShowForLastRow = totalNumOfSets
 
-    # Set font to use in the plot.
-    mpl.rcParams['font.sans-serif'] = [fontInPlot]
-    # Just in case that the minus sign is not displayed correctly.
-    mpl.rcParams['axes.unicode_minus'] = False
-
-    # Set font size.
-    mpl.rcParams.update({
-        'axes.labelsize':  labelSize,
-        'axes.titlesize':  titleSize,
-        'xtick.labelsize': tickSize,
-        'ytick.labelsize': tickSize
-    })
-
-    if figureSize is not None:
-        mpl.rcParams.update({'figure.figsize': figureSize})
+    # Set font and font sizes (only if another style is in effect).
+    phaseTimer.start('rcParamsSetup')
+    loadPlottingModules()
+    if style is None:
+        style = getPlotStyle(fontInPlot, labelSize, titleSize, tickSize,
+            figureSize)
+    if flagUsePyplot:
+        style.apply()
+    elif flagShowPlot:
+        raise ValueError("flagShowPlot needs flagUsePyplot!")
+    tickSize = style.tickSize
 
     # Parse date for file title construction.
+    phaseTimer.start('dataExtraction')
     dateStrFormatted = constructTitleFromDate(
-        data, numOfRowsToShow-1)
-
-    # Store set values in a list, with each element being a list of all set
-    # values for a day.
-    histSetValues = [[0 for i in range(totalNumOfSets)]
-        for i in range(numOfRowsToShow)]
-    # Loop through all days/rows to show.
-    for idxRow in range(numOfRowsToShow):
-        if idxRow == numOfRowsToShow-1:
-            curNumOfSetsToShowForLastRow = numOfSetsToShowForLastRow
-        else:
-            curNumOfSetsToShowForLastRow = totalNumOfSets
+        table, numOfRowsToShow-1)
 
-        # Obtain all data needed.
-        for idxSet in range(curNumOfSetsToShowForLastRow):
-            curSetValueStr = data[idxRow]['Set '+str(idxSet+1)]
-            histSetValues[idxRow][idxSet] = int(curSetValueStr)
+    idxFirstRow = getIdxFirstRowToShow(numOfRowsToShow, maxNumOfHistoryRows)
+    histSetValues = getHistSetValues(table,
+        numOfRowsToShow, numOfSetsToShowForLastRow, idxFirstRow)
+    numOfHistoryRows = numOfRowsToShow-idxFirstRow
 
     # One plot per function call.
-    fig = plt.figure()
-    alpha = 0.8
+    phaseTimer.start('artistCreation')
+    fig = createFigure(style, flagUsePyplot)
     if numOfRowsToShow<1:
         raise ValueError("numOfRowsToShow should be at least 1!")
     elif numOfRowsToShow==1:
         # 2D plot.
-        ax = fig.gca()
-        color = colorMap[0]
-
-        # Show at least 5 sets along the x axis.
-        minNumSetsToShow = 5
-        numOfSetsToShow = max(minNumSetsToShow, numOfSetsToShowForLastRow)
-
-        xs = [v+1 for v in range(numOfSetsToShow)]
-        ys = histSetValues[0][:numOfSetsToShow]
-        barchart = ax.bar(xs, ys, color=color, alpha=alpha)
-        autoLabelBarChart(barchart, ax, tickSize)
+        ax = fig.add_subplot()
+        plotBarChart2d(ax, histSetValues[0], numOfSetsToShowForLastRow,
+            tickSize, style.getFontProperties(tickSize))
 
         # Better grid.
         ax.grid(True, which='major', color='b', linestyle='-' , alpha=0.5)
         ax.grid(True, which='minor', color='y', linestyle='--', alpha=0.5)
         ax.minorticks_on()
         # Labels.
-        ax.set_xlabel('组数（组）')
-        ax.set_ylabel('完成动作数（个）')
+        ax.set_xlabel('组数（组）',
+            fontproperties=style.getFontProperties(style.labelSize))
+        ax.set_ylabel('完成动作数（个）',
+            fontproperties=style.getFontProperties(style.labelSize))
     else:
         # 3D plot.
-        ax = fig.gca(projection='3d')
+        ax = fig.add_subplot(projection='3d')
         # Labels.
-        ax.set_xlabel('组数（组）', labelpad=labelPad3D)
-        ax.set_ylabel('历史记录（天前）', labelpad=labelPad3D)
+        ax.set_xlabel('组数（组）', labelpad=labelPad3D,
+            fontproperties=style.getFontProperties(style.labelSize))
+        ax.set_ylabel('历史记录（天前）', labelpad=labelPad3D,
+            fontproperties=style.getFontProperties(style.labelSize))
         if labelPad3D is not None:
             labelPadZ = labelPad3D + extraLabelPadZ
         else:
             labelPadZ = None
-        ax.set_zlabel('完成动作数（个）', labelpad=labelPadZ)
+        ax.set_zlabel('完成动作数（个）', labelpad=labelPadZ,
+            fontproperties=style.getFontProperties(style.labelSize))
         # Camera view angles.
         ax.view_init(elev=camView[0], azim=camView[1])
 
-        # Plot data till the date and set of interest, with the plot for the
-        # latest date show at front.
-        for ir in range(numOfRowsToShow):
-            color = colorMap[ir%len(colorMap)]
-            xs = [v+1 for v in range(totalNumOfSets)]
-            ys = histSetValues[ir]
-            z = numOfRowsToShow-ir-1
-            # We will gradually decrease alpha for history results.
-            barAlphaMax = 1
-            barAlphaMin = 0.3
-            barAlphaStep = 0.1
-            # The latest row is opaque.
-            barAlpha = max(
-                barAlphaMax-(numOfRowsToShow-1-ir)*barAlphaStep,
-                barAlphaMin)
-            ax.bar(xs, ys, zs=z, zdir='y',
-                color=color, alpha=barAlpha)
-            """
-            # MatPlotLib has issues with 3D object visualization. Obstruction
-            # may be rendered incorrectly (bar3d does not help).
-            ```
-            x = xs
-            y = np.ones_like(ys)
-            bottom = np.zeros_like(ys)
-            width = depth = 1
-            dz = ys
-            ax.bar3d(x, y, bottom, width, depth, dz)
-            ```
-            """
+        # Plot data till the date and set of interest (with the bar colors by
+        # the row index in the whole history).
+        plotBarChart3d(ax, histSetValues, numOfSetsToShowForLastRow, tickSize,
+            table.idxFirstRow+idxFirstRow, flagBatchBars,
+            style.getFontProperties(tickSize))
 
         # Change Y range.
-        plt.ylim(0, numOfRowsToShow-1)
+        ax.set_ylim(0, max(numOfHistoryRows-1, 1))
         # We expect integer values.
         ax.xaxis.set_major_locator(MaxNLocator(integer=True))
         ax.yaxis.set_major_locator(MaxNLocator(integer=True))
         ax.zaxis.set_major_locator(MaxNLocator(integer=True))
         # Limit the number of y tick labels.
         maxNumOfYTickLs = 5
-        curNumOfYTickLs = min(numOfRowsToShow, maxNumOfYTickLs)
-        plt.locator_params(axis='y', nbins=curNumOfYTickLs)
-        # Add values to the latest row.
-        if ir==numOfRowsToShow-1:
-            for x,y in zip(
-                xs[:numOfSetsToShowForLastRow],
-                ys[:numOfSetsToShowForLastRow]):
-                ax.text(x, z, y, int(y), fontsize=tickSize, weight='bold',
-                    horizontalalignment='center', verticalalignment='bottom')
-
-    ax.set_title(dateStrFormatted+' '*titleEndPad, y=titleY, loc=titleLoc)
-    plt.tight_layout()
+        curNumOfYTickLs = min(numOfHistoryRows, maxNumOfYTickLs)
+        ax.locator_params(axis='y', nbins=curNumOfYTickLs)
+
+    ax.set_title(dateStrFormatted+' '*titleEndPad, y=titleY, loc=titleLoc,
+        fontproperties=style.getFontProperties(style.titleSize))
+    setTickLabelFonts(ax, style.getFontProperties(tickSize))
+    phaseTimer.start('layout')
+    applyTightLayout(fig)
 
     if numOfRowsToShow>1:
         # Move Z ticks away from the axis.
+        phaseTimer.start('draw')
         fig.canvas.draw()
         labels = [item.get_text() for item in ax.get_zticklabels()]
         for idxL in range(len(labels)):
             labels[idxL] = ' '*zTickPad+labels[idxL]
         ax.set_zticklabels(labels)
+    phaseTimer.stop()
 
     if flagShowPlot:
         plt.show()
 
     return (fig, ax)
 
+def getTrendPredictions(statisticsIndex, numOfRowsToShow, extraRowsToPredict,
+    trendFitType='linear'):
+    """
+    Predict the first-set and total repetition values for the days from the
+    first row to numOfRowsToShow+extraRowsToPredict, according to the trends
+    of the first numOfRowsToShow rows (and the days before the table, if any).
+    Returns (xsPre, firstSetRepsPre, totalRepsPre).
+    """
+    # The fits are cached in the trend models, so they are only computed once
+    # per dataset.
+    xFirst = statisticsIndex.idxFirstRow+1
+    xLast = statisticsIndex.idxFirstRow+numOfRowsToShow+extraRowsToPredict
+    if trendFitType=='linear':
+        xsPre = [xFirst, xLast]
+    else:
+        numOfPointsPre = 100
+        xsPre = np.linspace(xFirst, xLast, numOfPointsPre)
+    firstSetRepsPre = statisticsIndex.getTrendModel('firstSet').predict(
+        xsPre, trendFitType, numOfRowsToShow)
+    totalRepsPre = statisticsIndex.getTrendModel('total').predict(
+        xsPre, trendFitType, numOfRowsToShow)
+    return (xsPre, firstSetRepsPre, totalRepsPre)
+
+def constructTrendTitle(table, numOfRowsToShow, extraRowsToPredict=0,
+    flagEndDateDataInTitle=False):
+    """
+    Construct the title for the trend plot.
+    """
+    if extraRowsToPredict>0:
+        return "第{}天".format(getDayNumber(table,
+            numOfRowsToShow+extraRowsToPredict-1))
+    if flagEndDateDataInTitle:
+        return "第{}天".format(getDayNumber(table, numOfRowsToShow-1)) + \
+            " 总计{}个".format(
+            table.dailyAggregates.dailyTotals[numOfRowsToShow-1])
+    return constructTitleFromDate(table, numOfRowsToShow-1)
+
 def plotTrend(header, data, numOfRowsToShow=None,
     fontInPlot='Microsoft YaHei', flagShowPlot=False, lineWidth=5,
     figureSize=None, labelSize='large', titleSize='large', tickSize='large',
-    flagEndDateDataInTitle=False, inFigTextSize='large'):
+    flagEndDateDataInTitle=False, inFigTextSize='large',
+    trendFitType='linear', style=None, flagUsePyplot=True,
+    seriesReduction=None):
     """
     Plot the trends over days of (1) the first-set repetition value and (2) the
     total repetition value of each day. If numOfRowsToShow is larger than
-    available data, we will predict the values according to the history trends.
+    available data, we will predict the values according to the history trends,
+    fitted as trendFitType ('linear', 'quadratic' or 'exponential'). The style
+    and flagUsePyplot are used as for plot3dBarChart. With a
+    seriesReduction.SeriesReduction, the daily values are plotted with fewer
+    points for long histories.
     """
-    (totalNumOfRows, totalNumOfSets) = getNumsOfRowsAndSets(header, data)
+    # Opt-in timing of the phases (see phaseProfiler).
+    phaseTimer = getPhaseTimer('plotTrend')
+    phaseTimer.start('dataExtraction')
+    table = toWorkoutTable(header, data)
+    totalNumOfRows = table.numOfRows
 
     # By default, plot all the data.
     extraRowsToPredict = 0
@@ -256,46 +540,38 @@ def plotTrend(header, data, numOfRowsToShow=None,
         extraRowsToPredict = numOfRowsToShow-totalNumOfRows
         numOfRowsToShow = totalNumOfRows
 
-    # Set font to use in the plot.
-    mpl.rcParams['font.sans-serif'] = [fontInPlot]
-    # Just in case that the minus sign is not displayed correctly.
-    mpl.rcParams['axes.unicode_minus'] = False
-
-    # Set font size.
-    mpl.rcParams.update({
-        'axes.labelsize':  labelSize,
-        'axes.titlesize':  titleSize,
-        'xtick.labelsize': tickSize,
-        'ytick.labelsize': tickSize
-    })
-
-    if figureSize is not None:
-        mpl.rcParams.update({'figure.figsize': figureSize})
-
-    # Parse date for file title construction.
-    dateStrFormatted = constructTitleFromDate(
-        data, numOfRowsToShow-1)
-
-    # Store history data in lists.
-    firstSetReps = [0 for idx in range(numOfRowsToShow)]
-    totalReps = [0 for idx in range(numOfRowsToShow)]
-    # Loop through all days/rows to show.
-    for idxRow in range(numOfRowsToShow):
-        # Obtain all data needed.
-        for idxSet in range(totalNumOfSets):
-            curSetValue = int(data[idxRow]['Set '+str(idxSet+1)])
-            totalReps[idxRow] += curSetValue
-            if idxSet==0:
-                firstSetReps[idxRow] = curSetValue
-
-    xs = [r+1 for r in range(numOfRowsToShow)]
+    # Set font and font sizes (only if another style is in effect).
+    phaseTimer.start('rcParamsSetup')
+    loadPlottingModules()
+    if style is None:
+        style = getPlotStyle(fontInPlot, labelSize, titleSize, tickSize,
+            figureSize)
+    if flagUsePyplot:
+        style.apply()
+    elif flagShowPlot:
+        raise ValueError("flagShowPlot needs flagUsePyplot!")
+    tickSize = style.tickSize
+
+    # History data.
+    phaseTimer.start('dataExtraction')
+    firstSetReps = table.dailyAggregates.firstSetReps[:numOfRowsToShow]
+    totalReps = table.dailyAggregates.dailyTotals[:numOfRowsToShow]
+
+    xs = np.arange(getDayNumber(table, 0),
+        getDayNumber(table, numOfRowsToShow))
+    dates = table.dates[:numOfRowsToShow]
+    (xsTotal, totalReps) = reduceSeries(xs, totalReps, dates,
+        seriesReduction)
+    (xsFirstSet, firstSetReps) = reduceSeries(xs, firstSetReps, dates,
+        seriesReduction)
     # Plot the data we have.
-    fig = plt.figure()
-    ax = fig.gca()
-    ax.plot(xs, totalReps, color=colorMap[0],
-        linestyle='-', lineWidth=lineWidth)
-    ax.plot(xs, firstSetReps, color=colorMap[1],
-        linestyle='--', lineWidth=lineWidth)
+    phaseTimer.start('artistCreation')
+    fig = createFigure(style, flagUsePyplot)
+    ax = fig.add_subplot()
+    ax.plot(xsTotal, totalReps, color=colorMap[0],
+        linestyle='-', linewidth=lineWidth)
+    ax.plot(xsFirstSet, firstSetReps, color=colorMap[1],
+        linestyle='--', linewidth=lineWidth)
 
     # We expect integer values.
     ax.xaxis.set_major_locator(MaxNLocator(integer=True))
@@ -303,53 +579,55 @@ def plotTrend(header, data, numOfRowsToShow=None,
     # Limit the number of y tick labels.
     maxNumOfYTickLs = 5
     curNumOfYTickLs = min(numOfRowsToShow, maxNumOfYTickLs)
-    plt.locator_params(axis='y', nbins=curNumOfYTickLs)
+    ax.locator_params(axis='y', nbins=curNumOfYTickLs)
 
     # Plot the predictions.
     if extraRowsToPredict>0:
-        (aFirstSet, bFirstSet) = np.polyfit(xs, firstSetReps, 1)
-        (aTotal, bTotal) = np.polyfit(xs, totalReps, 1)
-
-        xsPre = [1, numOfRowsToShow+extraRowsToPredict]
-        firstSetRepsPre = [aFirstSet*x+bFirstSet for x in xsPre]
-        totalRepsPre = [aTotal*x+bTotal for x in xsPre]
+        phaseTimer.start('dataExtraction')
+        (xsPre, firstSetRepsPre, totalRepsPre) = getTrendPredictions(
+            getStatisticsIndex(table), numOfRowsToShow, extraRowsToPredict,
+            trendFitType)
+        phaseTimer.start('artistCreation')
 
         ax.plot(xsPre, firstSetRepsPre, color=colorMap[1],
-            linestyle=':', alpha=0.5, lineWidth=lineWidth)
+            linestyle=':', alpha=0.5, linewidth=lineWidth)
         ax.plot(xsPre, totalRepsPre, color=colorMap[0],
-            linestyle='-.', alpha=0.5, lineWidth=lineWidth)
+            linestyle='-.', alpha=0.5, linewidth=lineWidth)
         # Highlight the end predictions.
-        ax.plot(xsPre[1], firstSetRepsPre[1], color=colorMap[1],
-            Marker='o', alpha=0.5)
-        ax.plot(xsPre[1], totalRepsPre[1], color=colorMap[1],
-            Marker='s', alpha=0.5)
-        ax.text(xsPre[1], firstSetRepsPre[1], str(int(firstSetRepsPre[1])),
-            weight='bold', ha='right', va='center', fontsize=inFigTextSize)
-        ax.text(xsPre[1], totalRepsPre[1], str(int(totalRepsPre[1])),
-            weight='bold', ha='right', va='center', fontsize=inFigTextSize)
-
-    ax.legend(["总计", "首组"], prop={'size': tickSize})
-    if extraRowsToPredict>0:
-        ax.set_title("第{}天".format(numOfRowsToShow+extraRowsToPredict))
-    else:
-        if flagEndDateDataInTitle:
-            ax.set_title("第{}天".format(numOfRowsToShow) +
-                " 总计{}个".format(totalReps[-1]))
-        else:
-            ax.set_title(dateStrFormatted)
+        ax.plot(xsPre[-1], firstSetRepsPre[-1], color=colorMap[1],
+            marker='o', alpha=0.5)
+        ax.plot(xsPre[-1], totalRepsPre[-1], color=colorMap[1],
+            marker='s', alpha=0.5)
+        ax.text(xsPre[-1], firstSetRepsPre[-1], str(int(firstSetRepsPre[-1])),
+            weight='bold', ha='right', va='center',
+            fontproperties=style.getFontProperties(inFigTextSize))
+        ax.text(xsPre[-1], totalRepsPre[-1], str(int(totalRepsPre[-1])),
+            weight='bold', ha='right', va='center',
+            fontproperties=style.getFontProperties(inFigTextSize))
+
+    ax.legend(["总计", "首组"], prop=style.getFontProperties(tickSize))
+    ax.set_title(constructTrendTitle(table, numOfRowsToShow,
+        extraRowsToPredict, flagEndDateDataInTitle),
+        fontproperties=style.getFontProperties(style.titleSize))
 
     # Change X and Y ranges.
-    plt.xlim(1, numOfRowsToShow+extraRowsToPredict)
+    ax.set_xlim(xs[0],
+        getDayNumber(table, numOfRowsToShow+extraRowsToPredict-1))
     ax.set_ylim(bottom=0)
     # Better grid.
     ax.grid(True, which='major', color='b', linestyle='-' , alpha=0.5)
     ax.grid(True, which='minor', color='y', linestyle='--', alpha=0.5)
     ax.minorticks_on()
     # Labels.
-    ax.set_xlabel('天数（天）')
-    ax.set_ylabel('完成动作数（个）')
+    ax.set_xlabel('天数（天）',
+        fontproperties=style.getFontProperties(style.labelSize))
+    ax.set_ylabel('完成动作数（个）',
+        fontproperties=style.getFontProperties(style.labelSize))
+    setTickLabelFonts(ax, style.getFontProperties(tickSize))
 
-    plt.tight_layout()
+    phaseTimer.start('layout')
+    applyTightLayout(fig)
+    phaseTimer.stop()
 
     if flagShowPlot:
         plt.show()
@@ -369,64 +647,111 @@ def getHumanReadableTimeStr(hStr, mStr, sStr):
         timeStr += (replaceLeadingZero(sStr)+"秒")
     return timeStr
 
-def plotDailyTimeSpent(header, data, numOfRowsToShow=None,
-    fontInPlot='Microsoft YaHei', flagShowPlot=False, lineWidth=5,
-    figureSize=None, labelSize='large', titleSize='large', tickSize='large',
-    flagEndDateDataInTitle=False):
+def getHumanReadableTimeStrFromSeconds(timeInS):
     """
-    Plot the trends over days of (1) the first-set repetition value and (2) the
-    total repetition value of each day. If numOfRowsToShow is larger than
-    available data, we will predict the values according to the history trends.
+    Get the human readable time string for a duration in seconds.
     """
-    (totalNumOfRows, totalNumOfSets) = getNumsOfRowsAndSets(header, data)
-
-    # Set font to use in the plot.
-    mpl.rcParams['font.sans-serif'] = [fontInPlot]
-    # Just in case that the minus sign is not displayed correctly.
-    mpl.rcParams['axes.unicode_minus'] = False
+    (h, remainderInS) = divmod(int(timeInS), 3600)
+    (m, s) = divmod(remainderInS, 60)
+    return getHumanReadableTimeStr(str(h), '{:02d}'.format(m),
+        '{:02d}'.format(s))
 
-    # Set font size.
-    mpl.rcParams.update({
-        'axes.labelsize':  labelSize,
-        'axes.titlesize':  titleSize,
-        'xtick.labelsize': tickSize,
-        'ytick.labelsize': tickSize
-    })
+def getDurationStr(timeInS):
+    """
+    Get the human readable time string for a duration in seconds, or "无记录"
+    for a missing one (MISSING_DURATION or NaN).
+    """
+    if np.isnan(timeInS) or not getValidDurationFlags(timeInS):
+        return "无记录"
+    return getHumanReadableTimeStrFromSeconds(timeInS)
 
-    if figureSize is not None:
-        mpl.rcParams.update({'figure.figsize': figureSize})
+def constructDailyTimeSpentTitle(table, numOfRowsToShow,
+    flagEndDateDataInTitle=False):
+    """
+    Construct the title for the daily time spent plot.
+    """
+    if flagEndDateDataInTitle:
+        return "第{}天 耗时".format(
+            getDayNumber(table, numOfRowsToShow-1)) + \
+            getDurationStr(table.workoutTimesInS[numOfRowsToShow-1])
+    return constructTitleFromDate(table, numOfRowsToShow-1)
 
-    # Parse date for file title construction.
-    dateStrFormatted = constructTitleFromDate(
-        data, numOfRowsToShow-1)
-
-    # Loop through rows of interest to get daily work out time records.
-    workoutTimesInS = [0 for n in range(numOfRowsToShow)]
-    for idxRow in range(numOfRowsToShow):
-        workoutTimeStr = data[idxRow]['WorkoutTime']
-        # Example time string: "0:04:10" for 0 hour 4 minutes 10 seconds.
-        (hStr, mStr, sStr) = workoutTimeStr.split(':')
-        workoutTimesInS[idxRow] = (int(hStr)*60+int(mStr))*60+int(sStr)
-
-    # Average work out time.
-    workoutTimeInSMean = sum(workoutTimesInS)/float(numOfRowsToShow)
+def plotDailyTimeSpent(header, data, numOfRowsToShow=None,
+    fontInPlot='Microsoft YaHei', flagShowPlot=False, lineWidth=5,
+    figureSize=None, labelSize='large', titleSize='large', tickSize='large',
+    flagEndDateDataInTitle=False, style=None, flagUsePyplot=True,
+    rollingWindowSize=None, seriesReduction=None):
+    """
+    Plot the workout time of each day, with the average over all the days
+    shown. With rollingWindowSize, the average over the latest
+    rollingWindowSize days up to each day is plotted as well (see
+    durationStatistics). The missing durations are left out (and shown as
+    "无记录" in the title). The style, flagUsePyplot and seriesReduction are
+    used as for plotTrend.
+    """
+    # Opt-in timing of the phases (see phaseProfiler).
+    phaseTimer = getPhaseTimer('plotDailyTimeSpent')
+    phaseTimer.start('dataExtraction')
+    table = toWorkoutTable(header, data)
+
+    # Set font and font sizes (only if another style is in effect).
+    phaseTimer.start('rcParamsSetup')
+    loadPlottingModules()
+    if style is None:
+        style = getPlotStyle(fontInPlot, labelSize, titleSize, tickSize,
+            figureSize)
+    if flagUsePyplot:
+        style.apply()
+    elif flagShowPlot:
+        raise ValueError("flagShowPlot needs flagUsePyplot!")
+    tickSize = style.tickSize
+
+    # Daily work out time records.
+    phaseTimer.start('dataExtraction')
+    if table.workoutTimesInS is None:
+        raise ValueError("Field WorkoutTime is needed for plotDailyTimeSpent!")
+    workoutTimesInS = table.workoutTimesInS[:numOfRowsToShow]
+
+    # Average work out time (NaN without any valid one).
+    workoutTimeInSMean = getStatisticsIndex(table).getMeanWorkoutTimeInS(
+        numOfRowsToShow)
     workoutTimeInMMean = workoutTimeInSMean/float(60)
-
-    workoutTimeMeanStr = str(datetime.timedelta(seconds=int(workoutTimeInSMean)))
-    (hStr, mStr, sStr) = workoutTimeMeanStr.split(':')
-    workoutTimeMeanStr = "日均 "
-    workoutTimeMeanStr += getHumanReadableTimeStr(hStr, mStr, sStr)
-
-    xs = [r+1 for r in range(numOfRowsToShow)]
+    workoutTimeMeanStr = "日均 "+getDurationStr(workoutTimeInSMean)
+    if rollingWindowSize is not None:
+        rollingMeansInS = getDurationStatistics(table,
+            rollingWindowSize).getRollingMeansInS(
+                'WorkoutTime')[:numOfRowsToShow]
+
+    xs = np.arange(getDayNumber(table, 0),
+        getDayNumber(table, numOfRowsToShow))
+    # The missing durations are left out of the plot.
+    workoutTimesInM = np.where(getValidDurationFlags(workoutTimesInS),
+        workoutTimesInS/float(60), np.nan)
+    (xsTime, xsRollingMean) = (xs, xs)
+    if seriesReduction is not None:
+        dates = table.dates[:numOfRowsToShow]
+        (xsTime, workoutTimesInM) = reduceSeries(xs, workoutTimesInM, dates,
+            seriesReduction)
+        if rollingWindowSize is not None:
+            (xsRollingMean, rollingMeansInS) = reduceSeries(xs,
+                rollingMeansInS, dates, seriesReduction)
     # Plot.
-    fig = plt.figure()
-    ax = fig.gca()
-    ax.plot(xs, [t/float(60) for t in workoutTimesInS], color=colorMap[0],
-        linestyle='-', lineWidth=lineWidth)
+    phaseTimer.start('artistCreation')
+    fig = createFigure(style, flagUsePyplot)
+    ax = fig.add_subplot()
+    ax.plot(xsTime, workoutTimesInM, color=colorMap[0],
+        linestyle='-', linewidth=lineWidth)
     ax.plot([xs[0], xs[-1]], [workoutTimeInMMean]*2, color=colorMap[1],
-        linestyle=':', lineWidth=lineWidth, alpha=0.75)
-    ax.text(xs[-1], workoutTimeInMMean, workoutTimeMeanStr,
-        weight='bold', ha='right', va='top', fontsize=tickSize)
+        linestyle=':', linewidth=lineWidth, alpha=0.75)
+    legendStrs = ["每日时长", "平均时长"]
+    if rollingWindowSize is not None:
+        ax.plot(xsRollingMean, rollingMeansInS/float(60), color=colorMap[2],
+            linestyle='--', linewidth=lineWidth)
+        legendStrs.append("{}日均值".format(rollingWindowSize))
+    # The text stays at 0 without any valid WorkoutTime.
+    ax.text(xs[-1], np.nan_to_num(workoutTimeInMMean), workoutTimeMeanStr,
+        weight='bold', ha='right', va='top',
+        fontproperties=style.getFontProperties(tickSize))
 
     # We expect integer tick values.
     ax.xaxis.set_major_locator(MaxNLocator(integer=True))
@@ -434,30 +759,31 @@ def plotDailyTimeSpent(header, data, numOfRowsToShow=None,
     # Limit the number of y tick labels.
     maxNumOfYTickLs = 5
     curNumOfYTickLs = min(numOfRowsToShow, maxNumOfYTickLs)
-    plt.locator_params(axis='y', nbins=curNumOfYTickLs)
+    ax.locator_params(axis='y', nbins=curNumOfYTickLs)
 
-    ax.legend(["每日时长", "平均时长"], loc="lower right",
-        prop={'size': tickSize})
-    if flagEndDateDataInTitle:
-        latestWorkoutTimeStr = str(datetime.timedelta(seconds=int(workoutTimesInS[-1])))
-        (hStr, mStr, sStr) = latestWorkoutTimeStr.split(':')
-        ax.set_title("第{}天 耗时".format(numOfRowsToShow) +
-            getHumanReadableTimeStr(hStr, mStr, sStr))
-    else:
-        ax.set_title(dateStrFormatted)
+    ax.legend(legendStrs, loc="lower right",
+        prop=style.getFontProperties(tickSize))
+    ax.set_title(constructDailyTimeSpentTitle(table, numOfRowsToShow,
+        flagEndDateDataInTitle),
+        fontproperties=style.getFontProperties(style.titleSize))
 
     # Change X and Y ranges.
-    plt.xlim(1, numOfRowsToShow)
+    ax.set_xlim(xs[0], xs[-1])
     ax.set_ylim(bottom=0)
     # Better grid.
     ax.grid(True, which='major', color='b', linestyle='-' , alpha=0.5)
     ax.grid(True, which='minor', color='y', linestyle='--', alpha=0.5)
     ax.minorticks_on()
     # Labels.
-    ax.set_xlabel('天数（天）')
-    ax.set_ylabel('用时（分钟）')
-
-    plt.tight_layout()
+    ax.set_xlabel('天数（天）',
+        fontproperties=style.getFontProperties(style.labelSize))
+    ax.set_ylabel('用时（分钟）',
+        fontproperties=style.getFontProperties(style.labelSize))
+    setTickLabelFonts(ax, style.getFontProperties(tickSize))
+
+    phaseTimer.start('layout')
+    applyTightLayout(fig)
+    phaseTimer.stop()
 
     if flagShowPlot:
         plt.show()
@@ -0,0 +1,231 @@
+"""
+Declarative configuration of the frames to render.
+
+A frame job configuration (e.g. frameJobs.json next to plotPullUpStatistics.py)
+lists the frame sequences to render as JSON. Each sequence is expanded into
+one renderScheduler.FrameJob per day (and per set of the day, for the bar
+charts) of its day range:
+
+    {
+        "styles": {
+            "large": {"labelSize": 30, "titleSize": 40, "tickSize": 30}
+        },
+        "sequences": [
+            {"name": "trend", "plotType": "trend",
+                "firstDay": 2, "lastDay": 365, "figureSize": [9, 16],
+                "style": "large", "kwargs": {"lineWidth": 5},
+                "overrides": [
+                    {"firstDay": "latest+1", "kwargs": {"lineWidth": 3}}
+                ]}
+        ]
+    }
+
+The fields of a sequence are:
+
+    name: The prefix of the output file names, e.g. trend_day_12.png (or
+        bar_day_12_set_3.png with perSet);
+    plotType: A key of renderScheduler.PLOT_FUNCTION_NAMES;
+    firstDay, lastDay: The days to plot (1 and 'latest' by default). A day is
+        either a number (1 for the first row of the data) or relative to the
+        latest day of the data, as 'latest', 'latest+K' or 'latest-K'. The
+        days after the latest one are prediction frames;
+    perSet: Whether to plot one frame per set of the day (false by default);
+    figureSize: The figure size in inches (optional);
+    style: The name of an entry in "styles", whose keyword arguments (e.g. the
+        font and font sizes) are shared by the sequences (optional);
+    kwargs: Other keyword arguments for the plotting function (optional);
+    overrides: Keyword arguments replacing the ones above for the days from
+        firstDay (1 by default) to lastDay (no limit by default) (optional).
+
+The JSON lists are converted to tuples, so that the keyword arguments can be
+used for the persistent-figure renderers and have the same render cache keys
+as in Python. A subset of the days can be expanded via a day range, e.g.
+('latest', 'latest') for only the frames of the latest day (see
+parseDayRange). Example:
+
+    frameSequences = loadFrameSequences('frameJobs.json')
+    frameJobs = expandFrameSequences(frameSequences, table.numOfRows,
+        table.numOfSets, dayRange=parseDayRange('latest'))
+
+Developed and tested with Python 3.8.
+"""
+import json
+import re
+from collections import namedtuple
+
+from .renderScheduler import FrameJob, PLOT_FUNCTION_NAMES
+
+# One frame sequence (see the module docstring), with the style and the
+# figure size merged into kwargs, and overrides as a tuple of DayOverride.
+FrameSequence = namedtuple('FrameSequence', ['name', 'plotType', 'firstDay',
+    'lastDay', 'flagPerSet', 'kwargs', 'overrides'])
+
+# Keyword arguments replacing the ones of a FrameSequence for a range of days
+# (lastDay None for no limit).
+DayOverride = namedtuple('DayOverride', ['firstDay', 'lastDay', 'kwargs'])
+
+SEQUENCE_FIELDS = ('name', 'plotType', 'firstDay', 'lastDay', 'perSet',
+    'figureSize', 'style', 'kwargs', 'overrides')
+OVERRIDE_FIELDS = ('firstDay', 'lastDay', 'kwargs')
+
+# Days relative to the latest day of the data.
+_RELATIVE_DAY_PATTERN = re.compile(r'^latest(?:([+-])(\d+))?$')
+
+def toHashable(value):
+    """
+    Convert the (nested) lists of a JSON value into tuples.
+    """
+    if isinstance(value, list):
+        return tuple(toHashable(item) for item in value)
+    if isinstance(value, dict):
+        return {key: toHashable(item) for (key, item) in value.items()}
+    return value
+
+def parseDay(day):
+    """
+    Validate a day of a range: a number of at least 1, 'latest', 'latest+K'
+    or 'latest-K'. Digit strings are converted to int.
+    """
+    if isinstance(day, str) and day.isdigit():
+        day = int(day)
+    if isinstance(day, bool) or not isinstance(day, (int, str)) or \
+        (isinstance(day, int) and day<1) or \
+        (isinstance(day, str) and not _RELATIVE_DAY_PATTERN.match(day)):
+        raise ValueError("Invalid day {!r}!".format(day))
+    return day
+
+def resolveDay(day, latestDay):
+    """
+    Get the number of a day (see parseDay) given the latest day of the data.
+    """
+    if isinstance(day, int):
+        return day
+    (sign, offset) = _RELATIVE_DAY_PATTERN.match(day).groups()
+    if sign is None:
+        return latestDay
+    return latestDay+int(offset) if sign=='+' else latestDay-int(offset)
+
+def parseDayRange(dayRangeStr):
+    """
+    Parse a day range 'FIRST:LAST' (e.g. 'latest-6:latest'), 'FIRST:' (no
+    limit) or 'DAY' (one day) into (firstDay, lastDay).
+    """
+    (firstDayStr, separator, lastDayStr) = dayRangeStr.partition(':')
+    if not separator:
+        lastDayStr = firstDayStr
+    firstDay = parseDay(firstDayStr) if firstDayStr else 1
+    lastDay = parseDay(lastDayStr) if lastDayStr else None
+    return (firstDay, lastDay)
+
+def _checkFields(config, fields, description):
+    if not isinstance(config, dict):
+        raise ValueError("{} should be a JSON object!".format(description))
+    unknownFields = sorted(set(config)-set(fields))
+    if unknownFields:
+        raise ValueError("Unknown fields {} in {}!".format(
+            ', '.join(unknownFields), description))
+
+def parseFrameSequence(sequenceConfig, styles):
+    """
+    Parse the JSON object of one sequence into a FrameSequence, with the
+    styles (a dict of keyword argument dicts by name).
+    """
+    _checkFields(sequenceConfig, SEQUENCE_FIELDS, 'a frame sequence')
+    for field in ('name', 'plotType'):
+        if field not in sequenceConfig:
+            raise ValueError("Field {} is needed for a frame sequence!".format(
+                field))
+    name = sequenceConfig['name']
+    description = "frame sequence {}".format(name)
+    if sequenceConfig['plotType'] not in PLOT_FUNCTION_NAMES:
+        raise ValueError("Unknown plot type {} of {}!".format(
+            sequenceConfig['plotType'], description))
+
+    kwargs = {}
+    if 'style' in sequenceConfig:
+        if sequenceConfig['style'] not in styles:
+            raise ValueError("Unknown style {} of {}!".format(
+                sequenceConfig['style'], description))
+        kwargs.update(styles[sequenceConfig['style']])
+    if 'figureSize' in sequenceConfig:
+        kwargs['figureSize'] = sequenceConfig['figureSize']
+    kwargs.update(sequenceConfig.get('kwargs', {}))
+
+    overrides = []
+    for overrideConfig in sequenceConfig.get('overrides', []):
+        _checkFields(overrideConfig, OVERRIDE_FIELDS,
+            "an override of {}".format(description))
+        lastDay = overrideConfig.get('lastDay')
+        overrides.append(DayOverride(parseDay(overrideConfig.get('firstDay',
+            1)), None if lastDay is None else parseDay(lastDay),
+            toHashable(overrideConfig.get('kwargs', {}))))
+    return FrameSequence(name, sequenceConfig['plotType'],
+        parseDay(sequenceConfig.get('firstDay', 1)),
+        parseDay(sequenceConfig.get('lastDay', 'latest')),
+        bool(sequenceConfig.get('perSet', False)), toHashable(kwargs),
+        tuple(overrides))
+
+def parseFrameConfig(config):
+    """
+    Parse a frame job configuration (as loaded from JSON) into a list of
+    FrameSequence.
+    """
+    _checkFields(config, ('styles', 'sequences'), 'the frame job config')
+    styles = config.get('styles', {})
+    return [parseFrameSequence(sequenceConfig, styles)
+        for sequenceConfig in config.get('sequences', [])]
+
+def loadFrameSequences(pathToConfig):
+    """
+    Load the list of FrameSequence from a frame job configuration file.
+    """
+    with open(pathToConfig, mode='r', encoding='utf-8') as configFile:
+        return parseFrameConfig(json.load(configFile))
+
+def expandFrameSequences(frameSequences, totalNumOfRows, totalNumOfSets,
+    dayRange=None, idxFirstRow=0, flagWorkoutTime=True):
+    """
+    Expand a list of FrameSequence into the list of FrameJob to render, for
+    data with totalNumOfRows days (the latest day) and totalNumOfSets sets.
+    Only the days in dayRange (firstDay, lastDay), if it is given, are
+    included. For a WorkoutTable of a sliding window (see
+    WorkoutTable.idxFirstRow), only the days in the window are included, with
+    numOfRowsToShow relative to it. Without flagWorkoutTime, the daily time
+    spent ('time') frames are left out.
+    """
+    (firstDayToShow, lastDayToShow) = (1, None) if dayRange is None \
+        else dayRange
+    firstDayToShow = max(resolveDay(firstDayToShow, totalNumOfRows),
+        idxFirstRow+1)
+    frameJobs = []
+    for frameSequence in frameSequences:
+        if frameSequence.plotType=='time' and not flagWorkoutTime:
+            continue
+        firstDay = max(resolveDay(frameSequence.firstDay, totalNumOfRows),
+            firstDayToShow)
+        lastDay = resolveDay(frameSequence.lastDay, totalNumOfRows)
+        if lastDayToShow is not None:
+            lastDay = min(lastDay, resolveDay(lastDayToShow, totalNumOfRows))
+        overrides = [(resolveDay(override.firstDay, totalNumOfRows),
+                None if override.lastDay is None
+                    else resolveDay(override.lastDay, totalNumOfRows),
+                override.kwargs)
+            for override in frameSequence.overrides]
+        for day in range(firstDay, lastDay+1):
+            kwargs = dict(frameSequence.kwargs,
+                numOfRowsToShow=day-idxFirstRow)
+            for (overrideFirstDay, overrideLastDay, overrideKwargs) \
+                in overrides:
+                if overrideFirstDay<=day and (overrideLastDay is None
+                    or day<=overrideLastDay):
+                    kwargs.update(overrideKwargs)
+            fileNamePrefix = '{}_day_{}'.format(frameSequence.name, day)
+            if not frameSequence.flagPerSet:
+                frameJobs.append(FrameJob(frameSequence.plotType,
+                    fileNamePrefix+'.png', kwargs))
+                continue
+            for idxSet in range(totalNumOfSets):
+                frameJobs.append(FrameJob(frameSequence.plotType,
+                    '{}_set_{}.png'.format(fileNamePrefix, idxSet+1),
+                    dict(kwargs, numOfSetsToShowForLastRow=idxSet+1)))
+    return frameJobs
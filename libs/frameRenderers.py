@@ -0,0 +1,605 @@
+"""
+Stateful renderers that reuse one persistent figure per plot type.
+
+For frame sequences that only differ in data and title, creating a new figure
+for each frame (with axes, grids, locators, legends and labels) dominates the
+rendering time. The renderers here create the figure and the static artists
+once, and only update the line data, bar heights, texts and title for each
+frame:
+
+    1. BarChartRenderer for plot3dBarChart (and LayeredBarChartRenderer, which
+       only draws the bars of the latest day for each frame of a day);
+    2. TrendRenderer for plotTrend;
+    3. DailyTimeSpentRenderer for plotDailyTimeSpent.
+
+Example:
+
+    renderer = TrendRenderer(table, figureSize=(9,16))
+    for numOfRowsToShow in range(2, 365):
+        renderer.render(numOfRowsToShow=numOfRowsToShow)
+        renderer.save('trend_day_{}.png'.format(numOfRowsToShow))
+    renderer.close()
+
+Developed and tested with Python 3.8.
+"""
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.image import imsave
+from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+from . import exerciseStatistics as es
+from .frameSinks import getFigureRgbaBuffer
+from .phaseProfiler import getPhaseTimer
+from .statisticsIndex import getStatisticsIndex
+
+class FrameRenderer(object):
+    """
+    Base class for the renderers. Subclasses implement setUpFigure (for the
+    static artists) and updateFigure (for each frame). The keyword arguments
+    that may change from frame to frame are listed in frameKwargNames.
+
+    The layout is done again for each frame, from the default subplot
+    parameters, so that a frame only depends on its own keyword arguments
+    (and not on the frames rendered before it with the same figure) and
+    matches the frame of the plotting function.
+
+    The font, font sizes and figure size are taken from style (a
+    plotStyle.PlotStyle) if it is given, as for the plotting functions.
+    """
+    frameKwargNames = ('numOfRowsToShow',)
+
+    def __init__(self, table, fontInPlot='Microsoft YaHei', figureSize=None,
+        labelSize='large', titleSize='large', tickSize='large', style=None):
+        self.table = table
+        self.statisticsIndex = getStatisticsIndex(table)
+        if style is None:
+            style = es.getPlotStyle(fontInPlot, labelSize, titleSize,
+                tickSize, figureSize)
+        # The style is applied (if another one is in effect) for rendering
+        # and saving.
+        self.style = style
+        self.tickSize = style.tickSize
+        self.fig = None
+        self.ax = None
+        self.title = None
+
+    def render(self, **frameKwargs):
+        """
+        Update the persistent figure for one frame. Returns (fig, ax).
+        """
+        # Opt-in timing of the phases (see phaseProfiler).
+        phaseTimer = getPhaseTimer(type(self).__name__)
+        phaseTimer.start('rcParamsSetup')
+        self.style.apply()
+        phaseTimer.start('artistCreation')
+        if self.fig is None:
+            self.fig = plt.figure(figsize=self.style.figureSize)
+        self.updateFigure(**frameKwargs)
+        phaseTimer.start('layout')
+        self.layOut()
+        phaseTimer.stop()
+        return (self.fig, self.ax)
+
+    def layOut(self):
+        """
+        Adjust the layout via tight_layout.
+        """
+        # Start from the default subplot parameters, as for a new figure, so
+        # that the layout does not drift over frames.
+        self.fig.subplots_adjust(**{k: plt.rcParams['figure.subplot.'+k]
+            for k in ('left', 'right', 'bottom', 'top')})
+        es.applyTightLayout(self.fig)
+
+    def save(self, pathToOutput, **kwargs):
+        """
+        Save the current frame via fig.savefig.
+        """
+        phaseTimer = getPhaseTimer(type(self).__name__)
+        self.style.apply()
+        phaseTimer.start('savefig')
+        self.fig.savefig(pathToOutput, **kwargs)
+        phaseTimer.stop()
+
+    def getRgbaBuffer(self, dpi=None):
+        """
+        Get the current frame (at dpi, if it is given) as an RGBA numpy array
+        (see frameSinks.getFigureRgbaBuffer).
+        """
+        phaseTimer = getPhaseTimer(type(self).__name__)
+        self.style.apply()
+        phaseTimer.start('draw')
+        rgbaBuffer = getFigureRgbaBuffer(self.fig, dpi)
+        phaseTimer.stop()
+        return rgbaBuffer
+
+    def close(self):
+        if self.fig is not None:
+            plt.close(self.fig)
+        self.fig = None
+        self.ax = None
+
+    def updateFigure(self, **frameKwargs):
+        """
+        Update the artists for one frame (and create the static ones if
+        necessary).
+        """
+        raise NotImplementedError
+
+class BarChartRenderer(FrameRenderer):
+    """
+    Persistent-figure version of plot3dBarChart.
+    """
+    frameKwargNames = ('numOfRowsToShow', 'numOfSetsToShowForLastRow')
+
+    def __init__(self, table, fontInPlot='Microsoft YaHei', titleEndPad=0,
+        zTickPad=0, figureSize=None, labelSize='large', titleSize='large',
+        tickSize='large', labelPad3D=None, extraLabelPadZ=0,
+        camView=(None, None), titleY=1, titleLoc='center',
+        maxNumOfHistoryRows=None, flagBatchBars=True, style=None):
+        super(BarChartRenderer, self).__init__(table, fontInPlot, figureSize,
+            labelSize, titleSize, tickSize, style)
+        self.titleEndPad = titleEndPad
+        self.zTickPad = zTickPad
+        self.labelPad3D = labelPad3D
+        self.extraLabelPadZ = extraLabelPadZ
+        self.camView = camView
+        self.titleY = titleY
+        self.titleLoc = titleLoc
+        self.maxNumOfHistoryRows = maxNumOfHistoryRows
+        self.flagBatchBars = flagBatchBars
+        # Whether the bars of the latest day are drawn as a separate
+        # collection (see LayeredBarChartRenderer).
+        self.flagSeparateLastRow = False
+        self.flag3d = None
+        self.dynamicArtists = []
+
+    def setUpFigure(self, flag3d):
+        self.fig.clf()
+        self.dynamicArtists = []
+        if flag3d:
+            ax = self.fig.add_subplot(projection='3d')
+            # Labels.
+            ax.set_xlabel('组数（组）', labelpad=self.labelPad3D)
+            ax.set_ylabel('历史记录（天前）', labelpad=self.labelPad3D)
+            if self.labelPad3D is not None:
+                labelPadZ = self.labelPad3D + self.extraLabelPadZ
+            else:
+                labelPadZ = None
+            ax.set_zlabel('完成动作数（个）', labelpad=labelPadZ)
+            # Camera view angles.
+            ax.view_init(elev=self.camView[0], azim=self.camView[1])
+            # We expect integer values.
+            ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+            ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+            ax.zaxis.set_major_locator(MaxNLocator(integer=True))
+            # Move Z ticks away from the axis (see layOut).
+            zTickPadStr = ' '*self.zTickPad
+            self.zTickFormatter = FuncFormatter(
+                lambda z, pos: zTickPadStr+'%d' % z)
+            ax.zaxis.set_major_formatter(self.zTickFormatter)
+        else:
+            ax = self.fig.gca()
+            # Better grid.
+            ax.grid(True, which='major', color='b', linestyle='-' , alpha=0.5)
+            ax.grid(True, which='minor', color='y', linestyle='--', alpha=0.5)
+            ax.minorticks_on()
+            # Labels.
+            ax.set_xlabel('组数（组）')
+            ax.set_ylabel('完成动作数（个）')
+        self.title = ax.set_title('', y=self.titleY, loc=self.titleLoc)
+        self.ax = ax
+        self.flag3d = flag3d
+
+    def layOut(self):
+        if self.flag3d:
+            # As in plot3dBarChart, the Z ticks are only moved away from the
+            # axis after the layout is done.
+            self.ax.zaxis.set_major_formatter(
+                FuncFormatter(lambda z, pos: '%d' % z))
+            # The tight bounding box of a 3D axes is computed with the
+            # projection of its last draw if there is one, so the projection
+            # is reset to get the layout of a new axes.
+            self.ax.M = None
+            super(BarChartRenderer, self).layOut()
+            self.ax.zaxis.set_major_formatter(self.zTickFormatter)
+        else:
+            super(BarChartRenderer, self).layOut()
+
+    def updateFigure(self, numOfRowsToShow=None,
+        numOfSetsToShowForLastRow=None):
+        table = self.table
+        if numOfRowsToShow is None:
+            numOfRowsToShow = table.numOfRows
+        if numOfSetsToShowForLastRow is None:
+            numOfSetsToShowForLastRow = table.numOfSets
+        if numOfRowsToShow<1:
+            raise ValueError("numOfRowsToShow should be at least 1!")
+
+        idxFirstRow = es.getIdxFirstRowToShow(numOfRowsToShow,
+            self.maxNumOfHistoryRows)
+        histSetValues = es.getHistSetValues(table,
+            numOfRowsToShow, numOfSetsToShowForLastRow, idxFirstRow)
+        numOfHistoryRows = numOfRowsToShow-idxFirstRow
+        titleStr = es.constructTitleFromDate(
+            table, numOfRowsToShow-1)+' '*self.titleEndPad
+
+        flag3d = numOfRowsToShow>1
+        if flag3d!=self.flag3d:
+            self.setUpFigure(flag3d)
+        ax = self.ax
+
+        for artist in self.dynamicArtists:
+            artist.remove()
+        if flag3d:
+            # The bar colors are by the row index in the whole history.
+            self.dynamicArtists = es.plotBarChart3d(ax, histSetValues,
+                numOfSetsToShowForLastRow, self.tickSize,
+                table.idxFirstRow+idxFirstRow, self.flagBatchBars,
+                flagSeparateLastRow=self.flagSeparateLastRow)
+            # Change Y range.
+            ax.set_ylim(0, max(numOfHistoryRows-1, 1))
+            # Limit the number of y tick labels.
+            maxNumOfYTickLs = 5
+            curNumOfYTickLs = min(numOfHistoryRows, maxNumOfYTickLs)
+            ax.locator_params(axis='y', nbins=curNumOfYTickLs)
+        else:
+            self.dynamicArtists = es.plotBarChart2d(ax, histSetValues[0],
+                numOfSetsToShowForLastRow, self.tickSize)
+            ax.set_autoscale_on(True)
+            ax.relim()
+            ax.autoscale_view()
+
+        self.title.set_text(titleStr)
+
+class LayeredBarChartRenderer(BarChartRenderer):
+    """
+    BarChartRenderer which composites each 3D frame from two layers: the
+    background (axes, title and the bars of the earlier days), which is drawn
+    once and kept as a pixel buffer, and the bars and value labels of the
+    latest day, which are blitted on top of it. The frames for the sets of a
+    day only differ in the foreground, so the background is only drawn again
+    when the day, the axis limits or the layout change.
+
+    The bars of the latest day are always drawn over the earlier days, which
+    is the correct occlusion for the camera views with the latest day in front
+    (as in plotPullUpStatistics.py); in a plot3dBarChart frame, the depth
+    sorting may instead let a taller bar behind cover part of a bar in front.
+    The layout leaves the latest day out, so that it is only done again with
+    the background (the value labels of the latest day may thus be placed
+    slightly differently). Use save or getRgbaBuffer to output the
+    composited frames, as drawing the figure (e.g. via fig.savefig) draws all
+    the layers again.
+    """
+    def __init__(self, table, **kwargs):
+        super(LayeredBarChartRenderer, self).__init__(table, **kwargs)
+        if not self.flagBatchBars:
+            raise ValueError("Layered bar charts need flagBatchBars!")
+        self.flagSeparateLastRow = True
+        self.background = None
+        self._backgroundKey = None
+        self._numOfRowsToShow = None
+        self._flagComposited = False
+
+    def setUpFigure(self, flag3d):
+        super(LayeredBarChartRenderer, self).setUpFigure(flag3d)
+        self.background = None
+        self._backgroundKey = None
+
+    def updateFigure(self, numOfRowsToShow=None,
+        numOfSetsToShowForLastRow=None):
+        if numOfRowsToShow is None:
+            numOfRowsToShow = self.table.numOfRows
+        self._numOfRowsToShow = numOfRowsToShow
+        super(LayeredBarChartRenderer, self).updateFigure(numOfRowsToShow,
+            numOfSetsToShowForLastRow)
+        if self.flag3d:
+            for artist in self.dynamicArtists[1:]:
+                artist.set_in_layout(False)
+
+    def getBackgroundKey(self):
+        """
+        Get a key for the background: the day (which determines the bars of
+        the earlier days and the title) and the axis limits, which also
+        determine the layout.
+        """
+        return (self._numOfRowsToShow, tuple(self.ax.get_w_lims()))
+
+    def layOut(self):
+        if self.flag3d and self.getBackgroundKey()==self._backgroundKey:
+            return
+        super(LayeredBarChartRenderer, self).layOut()
+
+    def render(self, **frameKwargs):
+        (fig, ax) = super(LayeredBarChartRenderer, self).render(**frameKwargs)
+        self._flagComposited = False
+        if not self.flag3d:
+            return (fig, ax)
+
+        phaseTimer = getPhaseTimer(type(self).__name__)
+        # The bars of the latest day and the value labels.
+        foregroundArtists = self.dynamicArtists[1:]
+        backgroundKey = self.getBackgroundKey()
+        flagNewBackground = backgroundKey!=self._backgroundKey
+        if flagNewBackground:
+            phaseTimer.start('draw')
+            for artist in foregroundArtists:
+                artist.set_visible(False)
+            fig.canvas.draw()
+            for artist in foregroundArtists:
+                artist.set_visible(True)
+            self.background = fig.canvas.copy_from_bbox(fig.bbox)
+            self._backgroundKey = backgroundKey
+
+        phaseTimer.start('blit')
+        if not flagNewBackground:
+            fig.canvas.restore_region(self.background)
+        # Project the bars with the view of the background draw.
+        foregroundArtists[0].do_3d_projection()
+        for artist in foregroundArtists:
+            ax.draw_artist(artist)
+        phaseTimer.stop()
+        self._flagComposited = True
+        return (fig, ax)
+
+    def save(self, pathToOutput, **kwargs):
+        """
+        Save the current frame. The composited frame is saved directly from
+        the canvas buffer for .png files at the figure dpi (without other
+        savefig arguments); otherwise, the figure is drawn again via
+        fig.savefig.
+        """
+        if not self._flagComposited or kwargs or \
+            os.path.splitext(str(pathToOutput))[1].lower()!='.png':
+            super(LayeredBarChartRenderer, self).save(pathToOutput, **kwargs)
+            return
+        phaseTimer = getPhaseTimer(type(self).__name__)
+        phaseTimer.start('savefig')
+        # As FigureCanvasAgg.print_png, but without drawing the figure.
+        imsave(pathToOutput, self.fig.canvas.buffer_rgba(),
+            format='png', dpi=self.fig.dpi)
+        phaseTimer.stop()
+
+    def getRgbaBuffer(self, dpi=None):
+        if not self._flagComposited or (dpi is not None and dpi!=self.fig.dpi):
+            return super(LayeredBarChartRenderer, self).getRgbaBuffer(dpi)
+        return np.asarray(self.fig.canvas.buffer_rgba())
+
+    def close(self):
+        super(LayeredBarChartRenderer, self).close()
+        self.background = None
+        self._backgroundKey = None
+        self._flagComposited = False
+
+class TrendRenderer(FrameRenderer):
+    """
+    Persistent-figure version of plotTrend.
+    """
+    frameKwargNames = ('numOfRowsToShow', 'lineWidth')
+
+    def __init__(self, table, fontInPlot='Microsoft YaHei', figureSize=None,
+        labelSize='large', titleSize='large', tickSize='large',
+        flagEndDateDataInTitle=False, inFigTextSize='large',
+        trendFitType='linear', style=None, seriesReduction=None):
+        super(TrendRenderer, self).__init__(table, fontInPlot, figureSize,
+            labelSize, titleSize, tickSize, style)
+        self.flagEndDateDataInTitle = flagEndDateDataInTitle
+        self.inFigTextSize = inFigTextSize
+        self.trendFitType = trendFitType
+        self.seriesReduction = seriesReduction
+
+    def setUpFigure(self):
+        colorMap = es.colorMap
+        ax = self.fig.gca()
+        (self.lineTotal,) = ax.plot([], [], color=colorMap[0], linestyle='-')
+        (self.lineFirstSet,) = ax.plot([], [], color=colorMap[1],
+            linestyle='--')
+        # Artists for the predictions.
+        (self.lineFirstSetPre,) = ax.plot([], [], color=colorMap[1],
+            linestyle=':', alpha=0.5)
+        (self.lineTotalPre,) = ax.plot([], [], color=colorMap[0],
+            linestyle='-.', alpha=0.5)
+        (self.markerFirstSetPre,) = ax.plot([], [], color=colorMap[1],
+            marker='o', alpha=0.5)
+        (self.markerTotalPre,) = ax.plot([], [], color=colorMap[1],
+            marker='s', alpha=0.5)
+        self.textFirstSetPre = ax.text(0, 0, '', weight='bold', ha='right',
+            va='center', fontsize=self.inFigTextSize)
+        self.textTotalPre = ax.text(0, 0, '', weight='bold', ha='right',
+            va='center', fontsize=self.inFigTextSize)
+        self.predictionArtists = (self.lineFirstSetPre, self.lineTotalPre,
+            self.markerFirstSetPre, self.markerTotalPre,
+            self.textFirstSetPre, self.textTotalPre)
+
+        # We expect integer values.
+        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+        self.title = ax.set_title('')
+        # Better grid.
+        ax.grid(True, which='major', color='b', linestyle='-' , alpha=0.5)
+        ax.grid(True, which='minor', color='y', linestyle='--', alpha=0.5)
+        ax.minorticks_on()
+        # Labels.
+        ax.set_xlabel('天数（天）')
+        ax.set_ylabel('完成动作数（个）')
+        self.ax = ax
+        self.lineWidth = None
+
+    def updateFigure(self, numOfRowsToShow=None, lineWidth=5):
+        if self.ax is None:
+            self.setUpFigure()
+        ax = self.ax
+
+        totalNumOfRows = self.table.numOfRows
+        extraRowsToPredict = 0
+        if numOfRowsToShow is None:
+            numOfRowsToShow = totalNumOfRows
+        elif numOfRowsToShow>totalNumOfRows:
+            extraRowsToPredict = numOfRowsToShow-totalNumOfRows
+            numOfRowsToShow = totalNumOfRows
+
+        xs = np.arange(es.getDayNumber(self.table, 0),
+            es.getDayNumber(self.table, numOfRowsToShow))
+        dates = self.table.dates[:numOfRowsToShow]
+        self.lineTotal.set_data(*es.reduceSeries(xs,
+            self.table.dailyAggregates.dailyTotals[:numOfRowsToShow], dates,
+            self.seriesReduction))
+        self.lineFirstSet.set_data(*es.reduceSeries(xs,
+            self.table.dailyAggregates.firstSetReps[:numOfRowsToShow], dates,
+            self.seriesReduction))
+
+        flagPredict = extraRowsToPredict>0
+        for artist in self.predictionArtists:
+            artist.set_visible(flagPredict)
+        if flagPredict:
+            (xsPre, firstSetRepsPre, totalRepsPre) = es.getTrendPredictions(
+                self.statisticsIndex, numOfRowsToShow, extraRowsToPredict,
+                self.trendFitType)
+            self.lineFirstSetPre.set_data(xsPre, firstSetRepsPre)
+            self.lineTotalPre.set_data(xsPre, totalRepsPre)
+            self.markerFirstSetPre.set_data([xsPre[-1]], [firstSetRepsPre[-1]])
+            self.markerTotalPre.set_data([xsPre[-1]], [totalRepsPre[-1]])
+            self.textFirstSetPre.set_position((xsPre[-1], firstSetRepsPre[-1]))
+            self.textFirstSetPre.set_text(str(int(firstSetRepsPre[-1])))
+            self.textTotalPre.set_position((xsPre[-1], totalRepsPre[-1]))
+            self.textTotalPre.set_text(str(int(totalRepsPre[-1])))
+        if lineWidth!=self.lineWidth:
+            for line in (self.lineTotal, self.lineFirstSet,
+                self.lineFirstSetPre, self.lineTotalPre):
+                line.set_linewidth(lineWidth)
+            # The legend copies the line styles, so it is (re)created here.
+            ax.legend([self.lineTotal, self.lineFirstSet], ["总计", "首组"],
+                prop={'size': self.tickSize})
+            self.lineWidth = lineWidth
+
+        # Limit the number of y tick labels.
+        maxNumOfYTickLs = 5
+        curNumOfYTickLs = min(numOfRowsToShow, maxNumOfYTickLs)
+        ax.locator_params(axis='y', nbins=curNumOfYTickLs)
+
+        self.title.set_text(es.constructTrendTitle(self.table,
+            numOfRowsToShow, extraRowsToPredict, self.flagEndDateDataInTitle))
+
+        # Change X and Y ranges.
+        ax.set_autoscale_on(True)
+        ax.relim(visible_only=True)
+        ax.autoscale_view()
+        ax.set_xlim(es.getDayNumber(self.table, 0), es.getDayNumber(
+            self.table, numOfRowsToShow+extraRowsToPredict-1))
+        ax.set_ylim(bottom=0)
+
+class DailyTimeSpentRenderer(FrameRenderer):
+    """
+    Persistent-figure version of plotDailyTimeSpent.
+    """
+    frameKwargNames = ('numOfRowsToShow', 'lineWidth')
+
+    def __init__(self, table, fontInPlot='Microsoft YaHei', figureSize=None,
+        labelSize='large', titleSize='large', tickSize='large',
+        flagEndDateDataInTitle=False, style=None, rollingWindowSize=None,
+        seriesReduction=None):
+        super(DailyTimeSpentRenderer, self).__init__(table, fontInPlot,
+            figureSize, labelSize, titleSize, tickSize, style)
+        if table.workoutTimesInS is None:
+            raise ValueError(
+                "Field WorkoutTime is needed for DailyTimeSpentRenderer!")
+        self.flagEndDateDataInTitle = flagEndDateDataInTitle
+        self.rollingWindowSize = rollingWindowSize
+        self.seriesReduction = seriesReduction
+
+    def setUpFigure(self):
+        colorMap = es.colorMap
+        ax = self.fig.gca()
+        (self.lineTime,) = ax.plot([], [], color=colorMap[0], linestyle='-')
+        (self.lineMean,) = ax.plot([], [], color=colorMap[1], linestyle=':',
+            alpha=0.75)
+        self.textMean = ax.text(0, 0, '', weight='bold', ha='right', va='top',
+            fontsize=self.tickSize)
+        if self.rollingWindowSize is None:
+            self.lineRollingMean = None
+        else:
+            (self.lineRollingMean,) = ax.plot([], [], color=colorMap[2],
+                linestyle='--')
+
+        # We expect integer tick values.
+        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+        self.title = ax.set_title('')
+        # Better grid.
+        ax.grid(True, which='major', color='b', linestyle='-' , alpha=0.5)
+        ax.grid(True, which='minor', color='y', linestyle='--', alpha=0.5)
+        ax.minorticks_on()
+        # Labels.
+        ax.set_xlabel('天数（天）')
+        ax.set_ylabel('用时（分钟）')
+        self.ax = ax
+        self.lineWidth = None
+
+    def updateFigure(self, numOfRowsToShow=None, lineWidth=5):
+        if self.ax is None:
+            self.setUpFigure()
+        ax = self.ax
+        if numOfRowsToShow is None:
+            numOfRowsToShow = self.table.numOfRows
+
+        workoutTimesInS = self.table.workoutTimesInS[:numOfRowsToShow]
+        workoutTimeInSMean = self.statisticsIndex.getMeanWorkoutTimeInS(
+            numOfRowsToShow)
+        workoutTimeInMMean = workoutTimeInSMean/float(60)
+
+        (xFirst, xLast) = (es.getDayNumber(self.table, 0),
+            es.getDayNumber(self.table, numOfRowsToShow-1))
+        xs = np.arange(xFirst, xLast+1)
+        dates = self.table.dates[:numOfRowsToShow]
+        # The missing durations are left out of the plot.
+        workoutTimesInM = np.where(es.getValidDurationFlags(workoutTimesInS),
+            workoutTimesInS/float(60), np.nan)
+        self.lineTime.set_data(*es.reduceSeries(xs, workoutTimesInM, dates,
+            self.seriesReduction))
+        self.lineMean.set_data([xFirst, xLast], [workoutTimeInMMean]*2)
+        lines = [self.lineTime, self.lineMean]
+        legendStrs = ["每日时长", "平均时长"]
+        if self.lineRollingMean is not None:
+            rollingMeansInS = es.getDurationStatistics(self.table,
+                self.rollingWindowSize).getRollingMeansInS(
+                    'WorkoutTime')[:numOfRowsToShow]
+            self.lineRollingMean.set_data(*es.reduceSeries(xs,
+                rollingMeansInS/float(60), dates, self.seriesReduction))
+            lines.append(self.lineRollingMean)
+            legendStrs.append("{}日均值".format(self.rollingWindowSize))
+        if lineWidth!=self.lineWidth:
+            for line in lines:
+                line.set_linewidth(lineWidth)
+            # The legend copies the line styles, so it is (re)created here.
+            ax.legend(lines, legendStrs, loc="lower right",
+                prop={'size': self.tickSize})
+            self.lineWidth = lineWidth
+        # The text stays at 0 without any valid WorkoutTime.
+        self.textMean.set_position((xLast, np.nan_to_num(workoutTimeInMMean)))
+        self.textMean.set_text("日均 "+es.getDurationStr(workoutTimeInSMean))
+
+        # Limit the number of y tick labels.
+        maxNumOfYTickLs = 5
+        curNumOfYTickLs = min(numOfRowsToShow, maxNumOfYTickLs)
+        ax.locator_params(axis='y', nbins=curNumOfYTickLs)
+
+        self.title.set_text(es.constructDailyTimeSpentTitle(self.table,
+            numOfRowsToShow, self.flagEndDateDataInTitle))
+
+        # Change X and Y ranges.
+        ax.set_autoscale_on(True)
+        ax.relim()
+        ax.autoscale_view()
+        ax.set_xlim(xFirst, xLast)
+        ax.set_ylim(bottom=0)
+
+# Renderer classes for the plot types in renderScheduler.
+RENDERER_CLASSES = {
+    'bar': BarChartRenderer,
+    'layeredBar': LayeredBarChartRenderer,
+    'trend': TrendRenderer,
+    'time': DailyTimeSpentRenderer
+}
@@ -0,0 +1,267 @@
+"""
+Output sinks for rendered frames.
+
+    1. PngFrameSink saves each frame as a separate .png file;
+    2. VideoFrameSink pipes the raw RGBA canvas buffer of each frame directly
+       into a local ffmpeg binary, which encodes all the frames into one video
+       file, without any intermediate PNG encoding/decoding or disk I/O;
+    3. PdfFrameSink saves the frames as the pages of one (vector) PDF file;
+    4. SpriteSheetFrameSink tiles the frames into a few large .png files.
+
+The frames can be output at the resolution of an output tier (see
+OUTPUT_TIER_DPIS): low resolution previews, which are fast to rasterize, e.g.
+for scrubbing through the frames while iterating on the layouts, or the final
+frames at full resolution.
+
+Example:
+
+    with VideoFrameSink('trend.mp4', fps=30) as sink:
+        for numOfRowsToShow in range(2, 365):
+            (fig, _) = es.plotTrend(header, data, numOfRowsToShow)
+            sink.write(fig)
+            plt.close(fig)
+
+Developed and tested with Python 3.8.
+"""
+import os
+import shutil
+import subprocess
+
+import numpy as np
+
+# Resolutions (dots per inch) of the output tiers, with None for the figure
+# dpi (100 by default).
+OUTPUT_TIER_DPIS = {
+    'preview': 30,
+    'final': None
+}
+
+def getFigureRgbaBuffer(fig, dpi=None):
+    """
+    Draw the figure (at dpi, if it is given) and get its canvas as an RGBA
+    numpy array (height x width x 4, uint8).
+    """
+    if dpi is None or dpi==fig.dpi:
+        fig.canvas.draw()
+        return np.asarray(fig.canvas.buffer_rgba())
+    # As in fig.savefig, the figure is drawn at another dpi temporarily.
+    figureDpi = fig.dpi
+    fig.set_dpi(dpi)
+    try:
+        fig.canvas.draw()
+        return np.array(fig.canvas.buffer_rgba())
+    finally:
+        fig.set_dpi(figureDpi)
+
+class PngFrameSink(object):
+    """
+    Save each frame as a .png file in outputDir.
+    """
+    def __init__(self, outputDir):
+        self.outputDir = outputDir
+        if not os.path.exists(outputDir):
+            os.makedirs(outputDir)
+
+    def write(self, fig, fileName):
+        fig.savefig(os.path.join(self.outputDir, fileName))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class VideoFrameSink(object):
+    """
+    Encode frames into a video file by piping raw RGBA buffers to ffmpeg. All
+    frames should have the same size in pixels.
+    """
+    def __init__(self, pathToVideo, fps=30, ffmpegPath='ffmpeg',
+        codec='libx264', extraOutputArgs=('-pix_fmt', 'yuv420p')):
+        self.pathToVideo = pathToVideo
+        self.fps = fps
+        self.ffmpegPath = ffmpegPath
+        self.codec = codec
+        self.extraOutputArgs = list(extraOutputArgs)
+        self.frameSize = None
+        self.numOfFrames = 0
+        self._process = None
+
+    def getFfmpegCommand(self, width, height):
+        return [self.ffmpegPath, '-y', '-loglevel', 'error',
+            # Input: raw RGBA frames from stdin.
+            '-f', 'rawvideo', '-pix_fmt', 'rgba',
+            '-s', '{}x{}'.format(width, height), '-r', str(self.fps),
+            '-i', '-',
+            # Most codecs need even frame sizes.
+            '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-c:v', self.codec]+self.extraOutputArgs+[self.pathToVideo]
+
+    def _start(self, width, height):
+        if shutil.which(self.ffmpegPath) is None:
+            raise RuntimeError(
+                "ffmpeg ({}) is needed for video output!".format(
+                    self.ffmpegPath))
+        outputDir = os.path.dirname(os.path.abspath(self.pathToVideo))
+        if not os.path.exists(outputDir):
+            os.makedirs(outputDir)
+        self.frameSize = (width, height)
+        self._process = subprocess.Popen(
+            self.getFfmpegCommand(width, height), stdin=subprocess.PIPE)
+
+    def writeRgbaBuffer(self, rgbaBuffer):
+        """
+        Write one frame as an RGBA array (height x width x 4, uint8).
+        """
+        (height, width) = rgbaBuffer.shape[:2]
+        if self._process is None:
+            self._start(width, height)
+        elif (width, height)!=self.frameSize:
+            raise ValueError(
+                "Frame size {}x{} does not match the video size {}x{}!".format(
+                    width, height, *self.frameSize))
+        self._process.stdin.write(np.ascontiguousarray(rgbaBuffer).data)
+        self.numOfFrames += 1
+
+    def write(self, fig, fileName=None):
+        """
+        Write one frame from a figure. The fileName is ignored; it is accepted
+        for compatibility with PngFrameSink.
+        """
+        self.writeRgbaBuffer(getFigureRgbaBuffer(fig))
+
+    def close(self):
+        if self._process is None:
+            return
+        self._process.stdin.close()
+        returnCode = self._process.wait()
+        self._process = None
+        if returnCode!=0:
+            raise RuntimeError(
+                "ffmpeg exited with code {} for {}!".format(
+                    returnCode, self.pathToVideo))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class PdfFrameSink(object):
+    """
+    Save the frames as the pages of one PDF file, with the texts and lines as
+    vector graphics.
+    """
+    def __init__(self, pathToPdf):
+        self.pathToPdf = pathToPdf
+        self.numOfFrames = 0
+        self._pdfPages = None
+
+    def write(self, fig, fileName=None):
+        """
+        Add a figure as a new page. The fileName is ignored; it is accepted
+        for compatibility with PngFrameSink.
+        """
+        if self._pdfPages is None:
+            outputDir = os.path.dirname(os.path.abspath(self.pathToPdf))
+            if not os.path.exists(outputDir):
+                os.makedirs(outputDir)
+            from matplotlib.backends.backend_pdf import PdfPages
+            self._pdfPages = PdfPages(self.pathToPdf)
+        self._pdfPages.savefig(fig)
+        self.numOfFrames += 1
+
+    def close(self):
+        if self._pdfPages is not None:
+            self._pdfPages.close()
+            self._pdfPages = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+class SpriteSheetFrameSink(object):
+    """
+    Tile the frames into sprite sheets of numOfColumns x numOfRows frames, in
+    row-major order. The sheets are saved as .png files named after
+    pathToSheet, e.g. trend_sheet_1.png, trend_sheet_2.png, ... for
+    trend_sheet.png, with frame i (from 0) in sheet
+    i//(numOfColumns*numOfRows)+1. All frames should have the same size in
+    pixels; only one sheet is kept in memory at a time.
+    """
+    def __init__(self, pathToSheet, numOfColumns=5, numOfRows=5):
+        if numOfColumns<1 or numOfRows<1:
+            raise ValueError("A sprite sheet needs at least one frame!")
+        self.pathToSheet = pathToSheet
+        self.numOfColumns = numOfColumns
+        self.numOfRows = numOfRows
+        self.frameSize = None
+        self.numOfFrames = 0
+        self.pathsToSheets = []
+        self._sheet = None
+        self._numOfFramesInSheet = 0
+
+    def getPathToSheet(self, idxSheet):
+        (pathRoot, fileExt) = os.path.splitext(self.pathToSheet)
+        return '{}_{}{}'.format(pathRoot, idxSheet+1, fileExt or '.png')
+
+    def writeRgbaBuffer(self, rgbaBuffer):
+        """
+        Add one frame as an RGBA array (height x width x 4, uint8).
+        """
+        (height, width) = rgbaBuffer.shape[:2]
+        if self.frameSize is None:
+            self.frameSize = (width, height)
+        elif (width, height)!=self.frameSize:
+            raise ValueError(
+                "Frame size {}x{} does not match the sprite size {}x{}!".format(
+                    width, height, *self.frameSize))
+        if self._sheet is None:
+            # Cells without frames are left transparent.
+            self._sheet = np.zeros((self.numOfRows*height,
+                self.numOfColumns*width, 4), dtype=np.uint8)
+        (idxRow, idxColumn) = divmod(self._numOfFramesInSheet,
+            self.numOfColumns)
+        self._sheet[idxRow*height:(idxRow+1)*height,
+            idxColumn*width:(idxColumn+1)*width] = rgbaBuffer
+        self._numOfFramesInSheet += 1
+        self.numOfFrames += 1
+        if self._numOfFramesInSheet==self.numOfColumns*self.numOfRows:
+            self._saveSheet()
+
+    def write(self, fig, fileName=None):
+        """
+        Add one frame from a figure. The fileName is ignored; it is accepted
+        for compatibility with PngFrameSink.
+        """
+        self.writeRgbaBuffer(getFigureRgbaBuffer(fig))
+
+    def _saveSheet(self):
+        from matplotlib.image import imsave
+
+        pathToSheet = self.getPathToSheet(len(self.pathsToSheets))
+        outputDir = os.path.dirname(os.path.abspath(pathToSheet))
+        if not os.path.exists(outputDir):
+            os.makedirs(outputDir)
+        # Leave out the rows without frames in the last sheet.
+        numOfRowsUsed = -(-self._numOfFramesInSheet//self.numOfColumns)
+        imsave(pathToSheet,
+            self._sheet[:numOfRowsUsed*self.frameSize[1]], format='png')
+        self.pathsToSheets.append(pathToSheet)
+        self._sheet = None
+        self._numOfFramesInSheet = 0
+
+    def close(self):
+        if self._numOfFramesInSheet>0:
+            self._saveSheet()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,190 @@
+"""
+Opt-in per-phase timing for the plotting functions.
+
+The plotting functions (and the persistent-figure renderers) mark the start of
+each of their phases:
+
+    1. dataExtraction: converting and slicing the data, titles and statistics;
+    2. rcParamsSetup: updating the matplotlib rcParams;
+    3. artistCreation: creating the figure, axes and artists;
+    4. layout: tight_layout (see exerciseStatistics.applyTightLayout);
+    5. draw: extra canvas draws (e.g. for the z tick labels of 3D bar charts);
+    6. blit: drawing the changed artists over a cached background (see
+       frameRenderers.LayeredBarChartRenderer);
+    7. savefig: saving the figure (in the render scheduler).
+
+The wall time of each phase is only recorded while profiling is enabled via
+the profilePhases context manager. Otherwise, getPhaseTimer returns a timer
+whose methods do nothing, so the instrumentation costs one function call per
+plot plus one no-op method call per phase. Example:
+
+    with profilePhases() as phaseProfile:
+        for numOfRowsToShow in range(2, 365):
+            (fig, _) = es.plotTrend(header, data, numOfRowsToShow)
+            plt.close(fig)
+    print(phaseProfile.formatSummary())
+
+A callback can also be passed to profilePhases; it is called with
+(functionName, phaseName, elapsedTimeInS) for each phase of each call.
+
+Developed and tested with Python 3.8.
+"""
+import time
+
+PHASE_NAMES = ('dataExtraction', 'rcParamsSetup', 'artistCreation', 'layout',
+    'draw', 'blit', 'savefig')
+
+# The profilers (PhaseProfile or callbacks) currently enabled.
+_activeListeners = []
+
+class PhaseProfile(object):
+    """
+    Aggregated phase timings: for each (functionName, phaseName), the number
+    of calls, the total and the maximum wall time in seconds. Profiles (e.g.
+    from different worker processes) can be combined with merge.
+    """
+    def __init__(self):
+        self.records = {}
+
+    def __call__(self, functionName, phaseName, elapsedTimeInS):
+        self.add(functionName, phaseName, elapsedTimeInS)
+
+    def add(self, functionName, phaseName, elapsedTimeInS, numOfCalls=1):
+        key = (functionName, phaseName)
+        record = self.records.get(key)
+        if record is None:
+            self.records[key] = [numOfCalls, elapsedTimeInS, elapsedTimeInS]
+        else:
+            record[0] += numOfCalls
+            record[1] += elapsedTimeInS
+            record[2] = max(record[2], elapsedTimeInS)
+
+    def merge(self, other):
+        """
+        Add the records of another PhaseProfile into this one.
+        """
+        for ((functionName, phaseName), (numOfCalls, totalTimeInS,
+            maxTimeInS)) in other.records.items():
+            key = (functionName, phaseName)
+            if key not in self.records:
+                self.records[key] = [numOfCalls, totalTimeInS, maxTimeInS]
+            else:
+                record = self.records[key]
+                record[0] += numOfCalls
+                record[1] += totalTimeInS
+                record[2] = max(record[2], maxTimeInS)
+        return self
+
+    def getSummary(self):
+        """
+        Get the records as a list of dicts (e.g. for JSON output), sorted by
+        function name and phase order.
+        """
+        def sortKey(key):
+            (functionName, phaseName) = key
+            if phaseName in PHASE_NAMES:
+                return (functionName, PHASE_NAMES.index(phaseName), phaseName)
+            return (functionName, len(PHASE_NAMES), phaseName)
+
+        return [{'functionName': functionName, 'phaseName': phaseName,
+                'numOfCalls': numOfCalls, 'totalTimeInS': totalTimeInS,
+                'meanTimeInS': totalTimeInS/numOfCalls,
+                'maxTimeInS': maxTimeInS}
+            for (functionName, phaseName) in sorted(self.records, key=sortKey)
+            for (numOfCalls, totalTimeInS, maxTimeInS) in
+                [self.records[(functionName, phaseName)]]]
+
+    def formatSummary(self):
+        """
+        Format the records as a table, with the share of each phase in the
+        total time of its function.
+        """
+        summary = self.getSummary()
+        totalTimesInS = {}
+        for record in summary:
+            totalTimesInS[record['functionName']] = totalTimesInS.get(
+                record['functionName'], 0)+record['totalTimeInS']
+        lines = ['{:<24}{:<16}{:>8}{:>12}{:>12}{:>8}'.format('Function',
+            'Phase', 'Calls', 'Total (s)', 'Mean (ms)', 'Share')]
+        for record in summary:
+            totalTimeInS = totalTimesInS[record['functionName']]
+            lines.append('{:<24}{:<16}{:>8}{:>12.3f}{:>12.2f}{:>7.1f}%'.format(
+                record['functionName'], record['phaseName'],
+                record['numOfCalls'], record['totalTimeInS'],
+                record['meanTimeInS']*1000,
+                100*record['totalTimeInS']/totalTimeInS if totalTimeInS>0
+                    else 0))
+        return '\n'.join(lines)
+
+class PhaseTimer(object):
+    """
+    Time consecutive phases of one call: start(phaseName) ends the current
+    phase (if any) and starts a new one; stop() ends the current phase.
+    """
+    def __init__(self, functionName, listeners):
+        self.functionName = functionName
+        self.listeners = listeners
+        self.phaseName = None
+        self.startTime = None
+
+    def start(self, phaseName):
+        currentTime = time.perf_counter()
+        if self.phaseName is not None:
+            self._report(currentTime)
+        self.phaseName = phaseName
+        self.startTime = currentTime
+
+    def stop(self):
+        if self.phaseName is not None:
+            self._report(time.perf_counter())
+        self.phaseName = None
+
+    def _report(self, currentTime):
+        elapsedTimeInS = currentTime-self.startTime
+        for listener in self.listeners:
+            listener(self.functionName, self.phaseName, elapsedTimeInS)
+
+class NullPhaseTimer(object):
+    """
+    The timer used when profiling is disabled.
+    """
+    def start(self, phaseName):
+        pass
+
+    def stop(self):
+        pass
+
+_nullPhaseTimer = NullPhaseTimer()
+
+def isProfilingEnabled():
+    return len(_activeListeners)>0
+
+def getPhaseTimer(functionName):
+    """
+    Get a PhaseTimer for one call of functionName, or a timer doing nothing if
+    profiling is disabled.
+    """
+    if not _activeListeners:
+        return _nullPhaseTimer
+    return PhaseTimer(functionName, list(_activeListeners))
+
+class profilePhases(object):
+    """
+    Context manager enabling the phase timing. The timings are aggregated into
+    phaseProfile (a new PhaseProfile by default), which is returned by
+    __enter__; callback, if given, is also called for each phase.
+    """
+    def __init__(self, phaseProfile=None, callback=None):
+        self.phaseProfile = phaseProfile if phaseProfile is not None \
+            else PhaseProfile()
+        self.listeners = [self.phaseProfile]
+        if callback is not None:
+            self.listeners.append(callback)
+
+    def __enter__(self):
+        _activeListeners.extend(self.listeners)
+        return self.phaseProfile
+
+    def __exit__(self, *args):
+        for listener in self.listeners:
+            _activeListeners.remove(listener)
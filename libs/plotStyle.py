@@ -0,0 +1,112 @@
+"""
+Reusable plot styles (font and font sizes) for the plotting functions.
+
+A PlotStyle is resolved once: its rcParams are validated and its font is
+looked up as a FontProperties when it is constructed. Applying it for a frame
+only updates the rcParams when a different style is in effect, so consecutive
+frames with the same style have no configuration cost. The figure size is
+passed to each new figure instead of being set in the global rcParams.
+
+Example:
+
+    style = getPlotStyle(labelSize=30, titleSize=40, tickSize=30,
+        figureSize=(9,16))
+    for numOfRowsToShow in range(2, 365):
+        (fig, _) = es.plotTrend(header, data, numOfRowsToShow, style=style)
+        ...
+
+Developed and tested with Python 3.8.
+"""
+import functools
+
+import matplotlib as mpl
+from matplotlib.font_manager import FontProperties, findfont
+
+def getPlotRcParams(fontInPlot='Microsoft YaHei', labelSize='large',
+    titleSize='large', tickSize='large', figureSize=None):
+    """
+    Get the rcParams for the font, font sizes and figure size used in the
+    plots.
+    """
+    rcParams = {
+        # Font to use in the plot.
+        'font.sans-serif': [fontInPlot],
+        # Just in case that the minus sign is not displayed correctly.
+        'axes.unicode_minus': False,
+        # Font size.
+        'axes.labelsize':  labelSize,
+        'axes.titlesize':  titleSize,
+        'xtick.labelsize': tickSize,
+        'ytick.labelsize': tickSize
+    }
+    if figureSize is not None:
+        rcParams['figure.figsize'] = figureSize
+    return rcParams
+
+class PlotStyle(object):
+    """
+    The font, font sizes and figure size of a plot.
+
+    Attributes:
+        fontInPlot, labelSize, titleSize, tickSize, figureSize: As for the
+            plotting functions. figureSize is None for the default size.
+        rcParams: The validated rcParams for the font and font sizes.
+        fontProperties: A FontProperties for the font family actually used for
+            fontInPlot (or its fallback), for setting the font of the texts
+            explicitly, independent of the global rcParams.
+    """
+    def __init__(self, fontInPlot='Microsoft YaHei', labelSize='large',
+        titleSize='large', tickSize='large', figureSize=None):
+        self.fontInPlot = fontInPlot
+        self.labelSize = labelSize
+        self.titleSize = titleSize
+        self.tickSize = tickSize
+        self.figureSize = None if figureSize is None else tuple(figureSize)
+        self.rcParams = dict(mpl.RcParams(getPlotRcParams(fontInPlot,
+            labelSize, titleSize, tickSize)))
+        # Look up the font (with the same fallback as when drawing with the
+        # rcParams, but without changing them), and keep the family instead
+        # of the font file, so that e.g. bold texts still use the bold
+        # variant.
+        pathToFont = findfont(FontProperties(family=[fontInPlot]))
+        self.fontProperties = FontProperties(
+            family=[FontProperties(fname=pathToFont).get_name()])
+
+    def getFontProperties(self, size=None):
+        """
+        Get a copy of fontProperties with the font size set to size (e.g. 30
+        or 'large'), if it is given.
+        """
+        fontProperties = self.fontProperties.copy()
+        if size is not None:
+            fontProperties.set_size(size)
+        return fontProperties
+
+    def isInEffect(self):
+        """
+        Check whether the rcParams of the style are in effect.
+        """
+        rcParams = mpl.rcParams
+        return all(rcParams[key]==value
+            for (key, value) in self.rcParams.items())
+
+    def apply(self):
+        """
+        Update the global rcParams for the style, unless they are already in
+        effect.
+        """
+        if not self.isInEffect():
+            mpl.rcParams.update(self.rcParams)
+
+@functools.lru_cache(maxsize=None)
+def _getPlotStyle(fontInPlot, labelSize, titleSize, tickSize, figureSize):
+    return PlotStyle(fontInPlot, labelSize, titleSize, tickSize, figureSize)
+
+def getPlotStyle(fontInPlot='Microsoft YaHei', labelSize='large',
+    titleSize='large', tickSize='large', figureSize=None):
+    """
+    Get the PlotStyle for the given font, font sizes and figure size. The
+    styles are cached, so that each one is only resolved once per process.
+    """
+    return _getPlotStyle(fontInPlot, labelSize, titleSize, tickSize,
+        None if figureSize is None else tuple(figureSize))
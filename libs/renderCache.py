@@ -0,0 +1,126 @@
+"""
+Content-addressed cache for rendered frames.
+
+Each frame is keyed on a hash of the exact data slice it depends on, its
+plotting parameters and the versions of the libraries used for rendering. The
+keys of the frames rendered are stored in a manifest file in the output
+folder, so that a frame can be skipped if its key has not changed and its
+output file still exists. Appending a new day to the csv file thus only
+requires rendering the frames that show that day (and the prediction frames,
+whose fitted trends change).
+
+The manifest is also saved every checkpointInterval frames recorded (see
+RenderCache.checkpoint), so that a run which is killed without the chance to
+save it at the end can still be resumed, with only the frames rendered since
+the last checkpoint rendered again.
+
+Developed and tested with Python 3.8.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Increase this to invalidate all cached frames, e.g. when the plotting
+# functions are changed.
+RENDER_CACHE_VERSION = 2
+
+# Name of the manifest file in the output folder.
+MANIFEST_FILE_NAME = 'renderCacheManifest.json'
+
+# Default number of frames recorded between the saves of the manifest.
+DEFAULT_CHECKPOINT_INTERVAL = 50
+
+def getFrameDataSlice(table, frameJob):
+    """
+    Get the list of arrays the frame depends on. A frame showing the first
+    numOfRowsToShow days only depends on these rows; prediction frames (with
+    numOfRowsToShow larger than the number of rows available) depend on all the
+    rows.
+    """
+    numOfRowsToShow = frameJob.kwargs.get('numOfRowsToShow')
+    if numOfRowsToShow is None:
+        numOfRows = table.numOfRows
+    else:
+        numOfRows = min(numOfRowsToShow, table.numOfRows)
+
+    dataSlice = [table.dates[:numOfRows].astype(np.int64)]
+    if frameJob.plotType=='time':
+        dataSlice.append(table.workoutTimesInS[:numOfRows])
+    else:
+        dataSlice.append(table.setValues[:numOfRows])
+    return dataSlice
+
+def getFrameKey(table, frameJob, extraParams=None):
+    """
+    Get the cache key (a hex digest) for a frame.
+    """
+    # Only imported when a frame is rendered (for its version).
+    import matplotlib
+
+    hasher = hashlib.sha256()
+    params = {
+        'cacheVersion': RENDER_CACHE_VERSION,
+        'matplotlib': matplotlib.__version__,
+        'numpy': np.__version__,
+        'plotType': frameJob.plotType,
+        'kwargs': sorted(frameJob.kwargs.items()),
+        'extraParams': sorted((extraParams or {}).items())
+    }
+    hasher.update(repr(params).encode('utf-8'))
+    for array in getFrameDataSlice(table, frameJob):
+        array = np.ascontiguousarray(array)
+        hasher.update(repr((array.dtype.str, array.shape)).encode('utf-8'))
+        hasher.update(array.tobytes())
+    return hasher.hexdigest()
+
+class RenderCache(object):
+    """
+    Manifest of the frames rendered in an output folder, mapping the output
+    file names to the cache keys.
+    """
+    def __init__(self, outputDir):
+        self.outputDir = outputDir
+        self.pathToManifest = os.path.join(outputDir, MANIFEST_FILE_NAME)
+        self.frameKeys = {}
+        # Number of frames recorded since the manifest was last saved.
+        self.numOfUnsavedFrames = 0
+        if os.path.exists(self.pathToManifest):
+            try:
+                with open(self.pathToManifest, mode='r') as manifestFile:
+                    self.frameKeys = json.load(manifestFile)
+            except ValueError:
+                # A broken manifest: render everything again.
+                self.frameKeys = {}
+
+    def isUpToDate(self, fileName, frameKey):
+        """
+        Check whether the output file exists and was rendered with frameKey.
+        """
+        return self.frameKeys.get(fileName)==frameKey and \
+            os.path.exists(os.path.join(self.outputDir, fileName))
+
+    def update(self, fileName, frameKey):
+        self.frameKeys[fileName] = frameKey
+        self.numOfUnsavedFrames += 1
+
+    def checkpoint(self, checkpointInterval=DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        Save the manifest if at least checkpointInterval frames (if it is not
+        None) have been recorded since it was last saved.
+        """
+        if checkpointInterval is not None and \
+            self.numOfUnsavedFrames>=checkpointInterval:
+            self.save()
+
+    def save(self):
+        """
+        Write the manifest file (via a temporary file, so that an interrupted
+        run does not leave a broken manifest behind).
+        """
+        pathToTempFile = self.pathToManifest+'.tmp'
+        with open(pathToTempFile, mode='w') as manifestFile:
+            json.dump(self.frameKeys, manifestFile, indent=0, sort_keys=True)
+        os.replace(pathToTempFile, self.pathToManifest)
+        self.numOfUnsavedFrames = 0
@@ -0,0 +1,459 @@
+"""
+Parallel frame rendering with a process pool.
+
+Each frame to render is described by a FrameJob (plot type, output file name
+and the keyword arguments for the plotting function). The jobs are
+independent and are rendered by a concurrent.futures.ProcessPoolExecutor, with
+the dataset loaded only once per worker process.
+
+With flagReuseFigures, each worker keeps one persistent figure per plot type
+and set of static parameters (see frameRenderers) and only updates the data for
+each frame. The jobs are handed out to the workers in order (in chunks), so
+consecutive frames of a sequence are mostly rendered with the same figure. A
+frame does not depend on the frames rendered before it with the same figure,
+so the output does not depend on the number of workers, or on which frames
+were skipped with flagUseCache.
+
+With flagUseCache, frames whose inputs have not changed since the last run are
+skipped (see renderCache). The frames rendered are recorded in the cache
+manifest in any case (with checkpoints during the run), so that an interrupted
+run can be resumed with flagUseCache. Frame sequences can also be streamed
+into a video file via renderFrameJobsToVideo, tiled into sprite sheets via
+renderFrameJobsToSpriteSheets, or saved as the pages of one PDF file via
+renderFrameJobsToPdf.
+
+With a dpi (e.g. from frameSinks.OUTPUT_TIER_DPIS), the frames are output at
+that resolution instead of the figure dpi, e.g. as fast low resolution
+previews.
+
+With flagUseSnapshot, the worker processes load the dataset from the snapshot
+saved next to the csv file (see tableSnapshot), if it is up to date.
+
+With a phaseProfile (see phaseProfiler), the phase timings of all the frames
+are collected in the worker processes and merged into it.
+
+Long logs can also be rendered in the current process while reading the csv
+file row by row, with only a sliding window of rows in memory, via
+renderFrameJobsInStream (see workoutStream).
+
+Developed and tested with Python 3.8.
+"""
+import multiprocessing
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from .frameSinks import PdfFrameSink, SpriteSheetFrameSink, VideoFrameSink, \
+    getFigureRgbaBuffer
+from .phaseProfiler import getPhaseTimer, profilePhases
+from .renderCache import DEFAULT_CHECKPOINT_INTERVAL, RenderCache, \
+    getFrameKey
+from .tableSnapshot import loadWorkoutTableIncrementally
+from .workoutStream import iterWorkoutWindows
+from .workoutTable import loadWorkoutTable
+
+# One frame to render.
+#   plotType: One of the keys in PLOT_FUNCTION_NAMES.
+#   fileName: Output file name (relative to the output folder).
+#   kwargs: A dict of keyword arguments for the plotting function.
+FrameJob = namedtuple('FrameJob', ['plotType', 'fileName', 'kwargs'])
+
+# Plotting functions in exerciseStatistics for the plot types. The
+# 'layeredBar' frames are plotted as the 'bar' ones, but only the bars of the
+# latest day are drawn for each frame with flagReuseFigures (see
+# frameRenderers.LayeredBarChartRenderer).
+PLOT_FUNCTION_NAMES = {
+    'bar': 'plot3dBarChart',
+    'layeredBar': 'plot3dBarChart',
+    'trend': 'plotTrend',
+    'time': 'plotDailyTimeSpent'
+}
+
+# Per-process state, set up by initRenderWorker.
+_workerState = {}
+
+# Maximum number of datasets kept loaded per (worker) process when rendering
+# frames of several datasets (see activateRenderDataset).
+MAX_NUM_OF_DATASETS_PER_WORKER = 8
+
+# Per-process states of the datasets loaded, most recently used last.
+_datasetStates = OrderedDict()
+
+def initRenderWorker(pathToCsvFile, outputDir, flagReuseFigures=False,
+    flagUseSnapshot=False, dpi=None):
+    """
+    Load the dataset once for the current (worker) process.
+    """
+    # Render off screen.
+    import matplotlib
+    matplotlib.use('Agg')
+    from . import exerciseStatistics as es
+
+    # Only the main process updates the snapshot.
+    (header, data) = es.loadStatisticsFromCsv(pathToCsvFile,
+        flagUseSnapshot=flagUseSnapshot, flagSaveSnapshot=False)
+    setRenderDataset(header, data, outputDir, flagReuseFigures, dpi)
+
+def setRenderDataset(header, data, outputDir, flagReuseFigures=False,
+    dpi=None):
+    """
+    Make a loaded dataset (e.g. a WorkoutTable) the current one for the
+    (worker) process. The frames are output at dpi (the figure dpi by
+    default).
+    """
+    # Render off screen.
+    import matplotlib
+    matplotlib.use('Agg')
+    from . import exerciseStatistics as es
+
+    _workerState.update({
+        'es': es,
+        'header': header,
+        'data': data,
+        'outputDir': outputDir,
+        'flagReuseFigures': flagReuseFigures,
+        'dpi': dpi,
+        'renderers': {}
+    })
+
+def preloadPlottingModules():
+    """
+    Import the plotting modules in the current process before starting the
+    worker processes, so that forked workers inherit them instead of each
+    importing them again (they are not imported at start-up, see
+    exerciseStatistics.loadPlottingModules). Does nothing if the workers are
+    not forked.
+    """
+    if multiprocessing.get_start_method()!='fork':
+        return
+    from . import exerciseStatistics as es
+    from . import frameRenderers
+
+    es.loadPlottingModules()
+
+def closeFrameRenderers(renderers):
+    for renderer in renderers.values():
+        renderer.close()
+    renderers.clear()
+
+def activateRenderDataset(pathToCsvFile, outputDir, flagReuseFigures=False,
+    flagUseSnapshot=False):
+    """
+    Make a dataset the current one for the (worker) process, loading it if
+    necessary. Up to MAX_NUM_OF_DATASETS_PER_WORKER datasets (with their
+    persistent figures) are kept loaded, so that switching between datasets
+    does not load them again.
+    """
+    datasetKey = (pathToCsvFile, outputDir)
+    if datasetKey in _datasetStates:
+        _datasetStates.move_to_end(datasetKey)
+    else:
+        initRenderWorker(pathToCsvFile, outputDir, flagReuseFigures,
+            flagUseSnapshot)
+        _datasetStates[datasetKey] = dict(_workerState)
+        while len(_datasetStates)>MAX_NUM_OF_DATASETS_PER_WORKER:
+            (_, datasetState) = _datasetStates.popitem(last=False)
+            closeFrameRenderers(datasetState['renderers'])
+    _workerState.update(_datasetStates[datasetKey])
+
+def getFrameRenderer(frameJob):
+    """
+    Get the persistent renderer for a frame in the current (worker) process.
+    Returns (renderer, frameKwargs).
+    """
+    from .frameRenderers import RENDERER_CLASSES
+
+    rendererClass = RENDERER_CLASSES[frameJob.plotType]
+    frameKwargs = {}
+    staticKwargs = {}
+    for (name, value) in frameJob.kwargs.items():
+        if name in rendererClass.frameKwargNames:
+            frameKwargs[name] = value
+        else:
+            staticKwargs[name] = value
+    rendererKey = (frameJob.plotType, tuple(sorted(staticKwargs.items())))
+
+    renderers = _workerState['renderers']
+    if rendererKey not in renderers:
+        renderers[rendererKey] = rendererClass(_workerState['data'],
+            **staticKwargs)
+    return (renderers[rendererKey], frameKwargs)
+
+def renderFrame(frameJob, outputFunction, outputPhaseName='savefig',
+    rendererOutputFunction=None):
+    """
+    Render one frame in the current (worker) process and pass the figure to
+    outputFunction, with the style of the frame in effect. With
+    flagReuseFigures, the persistent renderer is passed to
+    rendererOutputFunction instead, if it is given. Returns what the output
+    function returns. The time spent in the output function is reported as
+    outputPhaseName when profiling is enabled.
+    """
+    if _workerState['flagReuseFigures']:
+        (renderer, frameKwargs) = getFrameRenderer(frameJob)
+        renderer.render(**frameKwargs)
+        if rendererOutputFunction is not None:
+            # The output methods of the renderers apply the style and report
+            # their timings themselves.
+            return rendererOutputFunction(renderer)
+        phaseTimer = getPhaseTimer(type(renderer).__name__)
+        renderer.style.apply()
+        phaseTimer.start(outputPhaseName)
+        result = outputFunction(renderer.fig)
+        phaseTimer.stop()
+        return result
+
+    es = _workerState['es']
+    plt = es.plt
+    plotFunctionName = PLOT_FUNCTION_NAMES[frameJob.plotType]
+    plotFunction = getattr(es, plotFunctionName)
+    # The plotting functions only change the rcParams of their style (see
+    # plotStyle), which are fully set for each frame, so the result does not
+    # depend on the frames rendered before in the same process.
+    (fig, _) = plotFunction(_workerState['header'], _workerState['data'],
+        flagShowPlot=False, **frameJob.kwargs)
+    try:
+        phaseTimer = getPhaseTimer(plotFunctionName)
+        phaseTimer.start(outputPhaseName)
+        result = outputFunction(fig)
+        phaseTimer.stop()
+        return result
+    finally:
+        plt.close(fig)
+
+def renderFrameJob(frameJob):
+    """
+    Render one frame in the current (worker) process and save it to the output
+    folder. Returns the path to the output file.
+    """
+    pathToOutput = os.path.join(_workerState['outputDir'], frameJob.fileName)
+    dpi = _workerState['dpi']
+    saveKwargs = {} if dpi is None else {'dpi': dpi}
+    renderFrame(frameJob, lambda fig: fig.savefig(pathToOutput, **saveKwargs),
+        rendererOutputFunction=lambda renderer: renderer.save(pathToOutput,
+            **saveKwargs))
+    return pathToOutput
+
+def renderFrameJobToBuffer(frameJob):
+    """
+    Render one frame in the current (worker) process. Returns the RGBA canvas
+    buffer as a numpy array.
+    """
+    dpi = _workerState['dpi']
+    return renderFrame(frameJob, lambda fig: getFigureRgbaBuffer(fig, dpi),
+        'draw',
+        rendererOutputFunction=lambda renderer: renderer.getRgbaBuffer(dpi))
+
+def renderProfiledFrameJob(renderFunction, frameJob):
+    """
+    Render one frame with renderFunction with the phase timing enabled.
+    Returns (result, phaseProfile).
+    """
+    with profilePhases() as phaseProfile:
+        result = renderFunction(frameJob)
+    return (result, phaseProfile)
+
+def getDefaultNumOfWorkers():
+    return os.cpu_count() or 1
+
+def iterRenderedFrameJobs(pathToCsvFile, frameJobs, outputDir,
+    numOfWorkers=None, chunkSize=None, flagReuseFigures=False,
+    renderFunction=renderFrameJob, phaseProfile=None, flagUseSnapshot=False,
+    dpi=None):
+    """
+    Render a list of FrameJob with renderFunction (renderFrameJob or
+    renderFrameJobToBuffer) and yield the results as the frames are done, in
+    the same order as frameJobs. See renderFrameJobs.
+    """
+    if numOfWorkers is None:
+        numOfWorkers = getDefaultNumOfWorkers()
+    if not os.path.exists(outputDir):
+        os.makedirs(outputDir)
+
+    if numOfWorkers<=1:
+        initRenderWorker(pathToCsvFile, outputDir, flagReuseFigures,
+            flagUseSnapshot, dpi)
+        for frameJob in frameJobs:
+            if phaseProfile is None:
+                yield renderFunction(frameJob)
+            else:
+                with profilePhases(phaseProfile):
+                    result = renderFunction(frameJob)
+                yield result
+        return
+
+    if phaseProfile is not None:
+        # Collect the timings of each frame from the workers.
+        renderFunction = partial(renderProfiledFrameJob, renderFunction)
+
+    if chunkSize is None:
+        # Small chunks for load balancing, but not too small for the
+        # inter-process communication overhead.
+        chunkSize = max(1, len(frameJobs)//(numOfWorkers*8))
+    preloadPlottingModules()
+    with ProcessPoolExecutor(max_workers=numOfWorkers,
+        initializer=initRenderWorker,
+        initargs=(pathToCsvFile, outputDir, flagReuseFigures,
+            flagUseSnapshot, dpi)) as executor:
+        for result in executor.map(renderFunction, frameJobs,
+            chunksize=chunkSize):
+            if phaseProfile is not None:
+                (result, framePhaseProfile) = result
+                phaseProfile.merge(framePhaseProfile)
+            yield result
+
+def getFrameJobsToRender(table, frameJobs, renderCache,
+    flagReuseFigures=False, dpi=None):
+    """
+    Get the frames which are not up to date in renderCache (all the frames if
+    it is None). Returns (frameJobsToRender, frameKeysToRender).
+    """
+    # The rendering mode and resolution also affect the output.
+    extraParams = {'flagReuseFigures': flagReuseFigures}
+    if dpi is not None:
+        extraParams['dpi'] = dpi
+    frameJobsToRender = []
+    frameKeysToRender = []
+    for frameJob in frameJobs:
+        frameKey = getFrameKey(table, frameJob, extraParams)
+        if renderCache is None or \
+            not renderCache.isUpToDate(frameJob.fileName, frameKey):
+            frameJobsToRender.append(frameJob)
+            frameKeysToRender.append(frameKey)
+    return (frameJobsToRender, frameKeysToRender)
+
+def renderFrameJobs(pathToCsvFile, frameJobs, outputDir, numOfWorkers=None,
+    chunkSize=None, flagReuseFigures=False, flagUseCache=False,
+    phaseProfile=None, flagUseSnapshot=False, dpi=None,
+    checkpointInterval=DEFAULT_CHECKPOINT_INTERVAL):
+    """
+    Render a list of FrameJob into outputDir with numOfWorkers processes (one
+    per CPU core by default). With numOfWorkers=1, everything is rendered in the
+    current process. With flagReuseFigures, persistent figures are updated
+    instead of creating a new figure for each frame. With flagUseCache, only
+    the frames whose inputs changed since the last run are rendered. The
+    frames done are recorded in the cache manifest, which is saved every
+    checkpointInterval frames and at the end (even if interrupted). The phase
+    timings are added to phaseProfile if it is given. With flagUseSnapshot, the
+    dataset is loaded via the snapshot next to the csv file. The frames are
+    saved at dpi (the figure dpi by default). Returns the paths to the output
+    files, in the same order as frameJobs.
+    """
+    pathsToOutputs = [os.path.join(outputDir, frameJob.fileName)
+        for frameJob in frameJobs]
+    if flagUseSnapshot:
+        table = loadWorkoutTableIncrementally(pathToCsvFile,
+            flagSaveSnapshot=False)
+    else:
+        table = loadWorkoutTable(pathToCsvFile)
+    renderCache = RenderCache(outputDir)
+    (frameJobsToRender, frameKeysToRender) = getFrameJobsToRender(table,
+        frameJobs, renderCache if flagUseCache else None, flagReuseFigures,
+        dpi)
+
+    # Record the frames done even if the run is interrupted.
+    try:
+        for (frameJob, frameKey, _) in zip(frameJobsToRender,
+            frameKeysToRender, iterRenderedFrameJobs(pathToCsvFile,
+                frameJobsToRender, outputDir, numOfWorkers, chunkSize,
+                flagReuseFigures, phaseProfile=phaseProfile,
+                flagUseSnapshot=flagUseSnapshot, dpi=dpi)):
+            renderCache.update(frameJob.fileName, frameKey)
+            renderCache.checkpoint(checkpointInterval)
+    finally:
+        renderCache.save()
+    return pathsToOutputs
+
+def renderFrameJobsToVideo(pathToCsvFile, frameJobs, pathToVideo,
+    numOfWorkers=None, chunkSize=None, flagReuseFigures=False, fps=30,
+    ffmpegPath='ffmpeg', phaseProfile=None, flagUseSnapshot=False, dpi=None):
+    """
+    Render a list of FrameJob (which should all have the same figure size)
+    into one video file. The frames are rendered in parallel as for
+    renderFrameJobs, and their raw RGBA buffers are piped into ffmpeg in order
+    (see frameSinks.VideoFrameSink), without writing any .png files. Returns
+    the number of frames written.
+    """
+    outputDir = os.path.dirname(os.path.abspath(pathToVideo))
+    with VideoFrameSink(pathToVideo, fps=fps, ffmpegPath=ffmpegPath) as sink:
+        for rgbaBuffer in iterRenderedFrameJobs(pathToCsvFile, frameJobs,
+            outputDir, numOfWorkers, chunkSize, flagReuseFigures,
+            renderFunction=renderFrameJobToBuffer, phaseProfile=phaseProfile,
+            flagUseSnapshot=flagUseSnapshot, dpi=dpi):
+            sink.writeRgbaBuffer(rgbaBuffer)
+        return sink.numOfFrames
+
+def renderFrameJobsToSpriteSheets(pathToCsvFile, frameJobs, pathToSheet,
+    numOfColumns=5, numOfRows=5, numOfWorkers=None, chunkSize=None,
+    flagReuseFigures=False, phaseProfile=None, flagUseSnapshot=False,
+    dpi=None):
+    """
+    Render a list of FrameJob (which should all have the same figure size)
+    into sprite sheets of numOfColumns x numOfRows frames (see
+    frameSinks.SpriteSheetFrameSink). The frames are rendered in parallel as
+    for renderFrameJobsToVideo. Returns the paths to the sheets.
+    """
+    outputDir = os.path.dirname(os.path.abspath(pathToSheet))
+    with SpriteSheetFrameSink(pathToSheet, numOfColumns, numOfRows) as sink:
+        for rgbaBuffer in iterRenderedFrameJobs(pathToCsvFile, frameJobs,
+            outputDir, numOfWorkers, chunkSize, flagReuseFigures,
+            renderFunction=renderFrameJobToBuffer, phaseProfile=phaseProfile,
+            flagUseSnapshot=flagUseSnapshot, dpi=dpi):
+            sink.writeRgbaBuffer(rgbaBuffer)
+    return sink.pathsToSheets
+
+def renderFrameJobsToPdf(pathToCsvFile, frameJobs, pathToPdf,
+    flagReuseFigures=False, phaseProfile=None, flagUseSnapshot=False):
+    """
+    Render a list of FrameJob as the pages of one PDF file (see
+    frameSinks.PdfFrameSink). As the figures can not be passed between
+    processes, the pages are rendered in the current process. Returns the
+    number of pages written.
+    """
+    outputDir = os.path.dirname(os.path.abspath(pathToPdf))
+    initRenderWorker(pathToCsvFile, outputDir, flagReuseFigures,
+        flagUseSnapshot)
+    with PdfFrameSink(pathToPdf) as sink:
+        for frameJob in frameJobs:
+            if phaseProfile is None:
+                renderFrame(frameJob, sink.write)
+            else:
+                with profilePhases(phaseProfile):
+                    renderFrame(frameJob, sink.write)
+        return sink.numOfFrames
+
+def renderFrameJobsInStream(pathToCsvFile, outputDir, maxNumOfRows,
+    getRowFrameJobs, getLastFrameJobs=None, phaseProfile=None, dpi=None):
+    """
+    Render the frames in the current process while reading the csv file row
+    by row, with only the latest maxNumOfRows rows kept in memory (see
+    workoutStream.iterWorkoutWindows). After each row, the frames given by
+    getRowFrameJobs(table) are rendered for the WorkoutTable of the window;
+    after the last row, those given by getLastFrameJobs(table), if any. The
+    numOfRowsToShow of the frames are relative to the window. The phase
+    timings are added to phaseProfile if it is given. The frames are saved at
+    dpi (the figure dpi by default). Returns the number of rows read.
+    """
+    if not os.path.exists(outputDir):
+        os.makedirs(outputDir)
+
+    def renderTableFrameJobs(table, frameJobs):
+        # The table is only valid until the next row is read, so the frames
+        # are rendered with a new figure each.
+        setRenderDataset(table.header, table, outputDir, dpi=dpi)
+        for frameJob in frameJobs:
+            if phaseProfile is None:
+                renderFrameJob(frameJob)
+            else:
+                with profilePhases(phaseProfile):
+                    renderFrameJob(frameJob)
+
+    table = None
+    numOfRows = 0
+    for table in iterWorkoutWindows(pathToCsvFile, maxNumOfRows):
+        numOfRows += 1
+        renderTableFrameJobs(table, getRowFrameJobs(table))
+    if table is not None and getLastFrameJobs is not None:
+        renderTableFrameJobs(table, getLastFrameJobs(table))
+    return numOfRows
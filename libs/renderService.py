@@ -0,0 +1,354 @@
+"""
+On-demand rendering of frames over HTTP.
+
+Instead of rendering every possible frame to disk, a RenderService renders a
+requested frame of a dataset when it is asked for, and keeps the encoded
+images of the recent requests in a size-bounded LRU cache. Each dataset is
+loaded and indexed once, and loaded again (incrementally, via the snapshot,
+see tableSnapshot) when the modification time or size of its csv file
+changes. The frames are rendered without pyplot (see threadScheduler), so the
+requests are served concurrently by the threads of the HTTP server.
+
+The frames are named as the output files of plotPullUpStatistics.py, e.g.
+
+    GET /frames/PullUps/bar_day_3_set_2.png
+    GET /frames/PullUps/trend_wide_day_100.svg?size=16x9
+
+with the optional size (in inches) overriding the figure size of the frame.
+The other requests are:
+
+    GET /datasets: The datasets with their numbers of rows and sets (JSON);
+    GET /stats: The cache statistics, the latency of the requests and the
+        errors of the datasets which failed to (re)load (JSON).
+
+Unexpected errors are logged and answered with a JSON error (status 500).
+
+Each frame response has the headers X-Cache (hit or miss) and
+X-Render-Time-Ms (the time spent on the request in the service).
+
+Developed and tested with Python 3.8.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from .statisticsIndex import getStatisticsIndex
+from .tableSnapshot import loadWorkoutTableIncrementally
+from .threadScheduler import renderFrameJobToBytes
+from .workoutTable import loadWorkoutTable
+
+# Content types of the image formats supported.
+CONTENT_TYPES = {
+    'png': 'image/png',
+    'svg': 'image/svg+xml'
+}
+
+class RenderServiceError(Exception):
+    """
+    An invalid request, with the HTTP status code to respond with.
+    """
+    def __init__(self, message, statusCode=400):
+        super(RenderServiceError, self).__init__(message)
+        self.statusCode = statusCode
+
+class FrameCache(object):
+    """
+    A thread-safe LRU cache of encoded images, bounded by the total size of
+    the images in bytes.
+    """
+    def __init__(self, maxSizeInBytes):
+        self.maxSizeInBytes = maxSizeInBytes
+        self.sizeInBytes = 0
+        self.numOfHits = 0
+        self.numOfMisses = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get the image for key (the most recently used one now), or None.
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self.numOfMisses += 1
+            else:
+                self.numOfHits += 1
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        """
+        Add an image, evicting the least recently used ones if necessary.
+        Images larger than the whole cache are not kept.
+        """
+        if len(image)>self.maxSizeInBytes:
+            return
+        with self._lock:
+            if key in self._images:
+                self.sizeInBytes -= len(self._images.pop(key))
+            self._images[key] = image
+            self.sizeInBytes += len(image)
+            while self.sizeInBytes>self.maxSizeInBytes:
+                (_, evictedImage) = self._images.popitem(last=False)
+                self.sizeInBytes -= len(evictedImage)
+
+    def discard(self, flagDiscard):
+        """
+        Remove the images whose keys satisfy flagDiscard(key).
+        """
+        with self._lock:
+            for key in [key for key in self._images if flagDiscard(key)]:
+                self.sizeInBytes -= len(self._images.pop(key))
+
+    def getStats(self):
+        with self._lock:
+            return {
+                'numOfImages': len(self._images),
+                'sizeInBytes': self.sizeInBytes,
+                'maxSizeInBytes': self.maxSizeInBytes,
+                'numOfHits': self.numOfHits,
+                'numOfMisses': self.numOfMisses
+            }
+
+class LoadedDataset(object):
+    """
+    A dataset as loaded from its csv file.
+
+    Attributes:
+        table: The WorkoutTable (with its StatisticsIndex built).
+        version: The (modification time in ns, size) of the csv file loaded.
+        frameJobs: A dict of the renderScheduler.FrameJob of the dataset by
+            file name without the extension.
+    """
+    def __init__(self, table, version, frameJobs):
+        self.table = table
+        self.version = version
+        self.frameJobs = frameJobs
+
+def getFileVersion(pathToFile):
+    fileStat = os.stat(pathToFile)
+    return (fileStat.st_mtime_ns, fileStat.st_size)
+
+class RenderService(object):
+    """
+    Render the frames of a set of datasets on demand.
+
+    datasets is a dict of the paths to the csv files by dataset name, and
+    constructFrameJobs(table) gives the list of renderScheduler.FrameJob
+    available for a WorkoutTable. The encoded images are kept in a FrameCache
+    of maxCacheSizeInBytes.
+    """
+    def __init__(self, datasets, constructFrameJobs,
+        maxCacheSizeInBytes=64*1024*1024, flagUseSnapshot=True):
+        self.datasets = dict(datasets)
+        self.constructFrameJobs = constructFrameJobs
+        self.flagUseSnapshot = flagUseSnapshot
+        self.frameCache = FrameCache(maxCacheSizeInBytes)
+        self._loadedDatasets = {}
+        self._datasetLocks = {name: threading.Lock() for name in self.datasets}
+        # The errors of the latest failed (re)loads by dataset name.
+        self._loadErrors = {}
+        # Latency of the frame requests: [number, total time, max time].
+        self._latency = {'hit': [0, 0.0, 0.0], 'miss': [0, 0.0, 0.0]}
+        self._latencyLock = threading.Lock()
+
+    def getDataset(self, datasetName):
+        """
+        Get the LoadedDataset of a dataset, (re)loading it if its csv file
+        has changed since it was loaded. If reloading fails (e.g. for a csv
+        file in the middle of being written), the dataset loaded last is kept
+        and the reload is tried again on the next request.
+        """
+        if datasetName not in self.datasets:
+            raise RenderServiceError(
+                "Unknown dataset: {}".format(datasetName), 404)
+        pathToCsvFile = self.datasets[datasetName]
+        with self._datasetLocks[datasetName]:
+            try:
+                version = getFileVersion(pathToCsvFile)
+            except OSError:
+                raise RenderServiceError(
+                    "Dataset not available: {}".format(datasetName), 404)
+            dataset = self._loadedDatasets.get(datasetName)
+            if dataset is not None and dataset.version==version:
+                return dataset
+
+            try:
+                if self.flagUseSnapshot:
+                    table = loadWorkoutTableIncrementally(pathToCsvFile)
+                else:
+                    table = loadWorkoutTable(pathToCsvFile)
+                getStatisticsIndex(table)
+                frameJobs = {os.path.splitext(frameJob.fileName)[0]: frameJob
+                    for frameJob in self.constructFrameJobs(table)}
+            except Exception as error:
+                self._loadErrors[datasetName] = "{}: {}".format(
+                    type(error).__name__, error)
+                if dataset is not None:
+                    return dataset
+                raise RenderServiceError("Dataset could not be loaded: "
+                    "{}".format(datasetName), 500)
+            self._loadErrors.pop(datasetName, None)
+            dataset = LoadedDataset(table, version, frameJobs)
+            self._loadedDatasets[datasetName] = dataset
+        # The frames of the earlier versions can not be requested any more.
+        self.frameCache.discard(
+            lambda key: key[0]==datasetName and key[1]!=version)
+        return dataset
+
+    def renderFrame(self, datasetName, frameName, fileFormat='png',
+        figureSize=None):
+        """
+        Get the encoded image of a frame (e.g. 'bar_day_3_set_2') of a
+        dataset as fileFormat ('png' or 'svg'), optionally with another figure
+        size. Returns (image, flagCacheHit).
+        """
+        if fileFormat not in CONTENT_TYPES:
+            raise RenderServiceError(
+                "Unsupported format: {}".format(fileFormat))
+        dataset = self.getDataset(datasetName)
+        frameJob = dataset.frameJobs.get(frameName)
+        if frameJob is None:
+            raise RenderServiceError("Unknown frame: {}".format(frameName),
+                404)
+
+        key = (datasetName, dataset.version, frameName, fileFormat,
+            figureSize)
+        image = self.frameCache.get(key)
+        if image is not None:
+            return (image, True)
+        if figureSize is not None:
+            frameJob = frameJob._replace(
+                kwargs=dict(frameJob.kwargs, figureSize=figureSize))
+        image = renderFrameJobToBytes(dataset.table, frameJob, fileFormat)
+        self.frameCache.put(key, image)
+        return (image, False)
+
+    def recordLatency(self, flagCacheHit, timeInS):
+        with self._latencyLock:
+            latency = self._latency['hit' if flagCacheHit else 'miss']
+            latency[0] += 1
+            latency[1] += timeInS
+            latency[2] = max(latency[2], timeInS)
+
+    def getDatasetInfo(self):
+        """
+        Get the names of the datasets with their numbers of rows and sets.
+        """
+        datasetInfo = []
+        for datasetName in sorted(self.datasets):
+            try:
+                table = self.getDataset(datasetName).table
+            except RenderServiceError:
+                continue
+            datasetInfo.append({'name': datasetName,
+                'numOfRows': table.numOfRows, 'numOfSets': table.numOfSets})
+        return datasetInfo
+
+    def getStats(self):
+        with self._latencyLock:
+            latencyInMs = {name: {
+                    'numOfRequests': numOfRequests,
+                    'meanInMs': 1000*totalTime/numOfRequests
+                        if numOfRequests>0 else None,
+                    'maxInMs': 1000*maxTime}
+                for (name, (numOfRequests, totalTime, maxTime))
+                in self._latency.items()}
+        return {'cache': self.frameCache.getStats(),
+            'latency': latencyInMs,
+            'loadErrors': dict(self._loadErrors)}
+
+def parseFigureSize(sizeStr):
+    """
+    Parse a figure size string in inches, e.g. "9x16", into a tuple.
+    """
+    try:
+        (width, height) = (float(v) for v in sizeStr.lower().split('x'))
+    except ValueError:
+        raise RenderServiceError("Invalid size: {}".format(sizeStr))
+    if not (0<width<=100 and 0<height<=100):
+        raise RenderServiceError("Invalid size: {}".format(sizeStr))
+    return (width, height)
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP request handler for a RenderService (the service attribute of the
+    server).
+    """
+    def do_GET(self):
+        startTime = time.perf_counter()
+        service = self.server.service
+        url = urlsplit(self.path)
+        pathParts = [unquote(part) for part in url.path.split('/') if part]
+        try:
+            if pathParts==['datasets']:
+                self.sendJson(service.getDatasetInfo())
+            elif pathParts==['stats']:
+                self.sendJson(service.getStats())
+            elif len(pathParts)>=3 and pathParts[0]=='frames':
+                # Dataset names may contain slashes.
+                datasetName = '/'.join(pathParts[1:-1])
+                (frameName, fileExt) = os.path.splitext(pathParts[-1])
+                query = parse_qs(url.query)
+                figureSize = parseFigureSize(query['size'][0]) \
+                    if 'size' in query else None
+                fileFormat = fileExt.lstrip('.').lower()
+                (image, flagCacheHit) = service.renderFrame(datasetName,
+                    frameName, fileFormat, figureSize)
+                timeInS = time.perf_counter()-startTime
+                service.recordLatency(flagCacheHit, timeInS)
+                self.sendBody(image, CONTENT_TYPES[fileFormat], {
+                    'X-Cache': 'hit' if flagCacheHit else 'miss',
+                    'X-Render-Time-Ms': '{:.1f}'.format(1000*timeInS)})
+            else:
+                raise RenderServiceError("Not found", 404)
+        except RenderServiceError as error:
+            self.sendJson({'error': str(error)}, error.statusCode)
+        except ConnectionError:
+            # The client is gone.
+            pass
+        except Exception as error:
+            self.log_error("Error serving %s: %s: %s", self.path,
+                type(error).__name__, error)
+            traceback.print_exc()
+            self.sendJson({'error': "Internal server error"}, 500)
+
+    def sendJson(self, content, statusCode=200):
+        self.sendBody(json.dumps(content).encode('utf-8'),
+            'application/json', statusCode=statusCode)
+
+    def sendBody(self, body, contentType, headers=None, statusCode=200):
+        self.send_response(statusCode)
+        self.send_header('Content-Type', contentType)
+        self.send_header('Content-Length', str(len(body)))
+        for (name, value) in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Only log the requests if asked for (see createRenderServer).
+        if self.server.flagLogRequests:
+            super(RenderRequestHandler, self).log_message(format, *args)
+
+    def log_error(self, format, *args):
+        # The errors are always logged.
+        super(RenderRequestHandler, self).log_message(format, *args)
+
+def createRenderServer(service, host='127.0.0.1', port=8000,
+    flagLogRequests=False):
+    """
+    Create a threaded HTTP server for a RenderService. Call serve_forever to
+    run it (port 0 picks a free port, see server_address).
+    """
+    server = ThreadingHTTPServer((host, port), RenderRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.flagLogRequests = flagLogRequests
+    return server
@@ -0,0 +1,161 @@
+"""
+Reduction of the daily series plotted in the trend and time plots.
+
+The line plots have one vertex per day, so their drawing time and file size
+grow with the history. A SeriesReduction bounds the number of vertices:
+
+    1. With historyWindowSize, only the latest historyWindowSize days are
+       kept as daily points, and the earlier days are aggregated into one
+       point per historyPeriod ('week', starting on Mondays, or 'month'), at
+       the mean day and value of the period;
+    2. With maxNumOfPoints, a series (after 1) with more points is downsampled
+       to at most maxNumOfPoints, keeping its shape, by method:
+           'lttb': Largest-Triangle-Three-Buckets, which picks the point of
+               each bucket forming the largest triangle with its neighbors;
+           'minmax': The minimum and the maximum of each bucket, which keeps
+               all the peaks.
+
+The first and the last points are always kept. A SeriesReduction is a
+namedtuple, so it can be passed in the kwargs of a frame job (and in the
+render cache key). Example:
+
+    seriesReduction = SeriesReduction(maxNumOfPoints=500,
+        historyWindowSize=90, historyPeriod='month')
+    (fig, _) = es.plotTrend(header, data, numOfRowsToShow,
+        seriesReduction=seriesReduction)
+
+Developed and tested with Python 3.8.
+"""
+from collections import namedtuple
+
+import numpy as np
+# Support running the files directly under ./libs for testing.
+try:
+    from .durationStatistics import getPeriodStarts
+except ImportError:
+    from durationStatistics import getPeriodStarts
+
+# How to reduce a series (see the module docstring); None for no limit.
+SeriesReduction = namedtuple('SeriesReduction',
+    ['maxNumOfPoints', 'method', 'historyWindowSize', 'historyPeriod'],
+    defaults=(None, 'lttb', None, 'week'))
+
+# Downsampling methods supported.
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+def getLttbIndices(xs, ys, numOfPoints):
+    """
+    Get the (sorted) indices of the numOfPoints points (at least 3) picked by
+    Largest-Triangle-Three-Buckets from a series with more points.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    numOfValues = len(xs)
+    # The points between the first and the last one are split into
+    # numOfPoints-2 buckets, with the edges bucketEdges.
+    bucketEdges = np.linspace(1, numOfValues-1, numOfPoints-1).astype(np.int64)
+    bucketSizes = np.diff(bucketEdges)
+    bucketMeanXs = np.add.reduceat(xs[:-1], bucketEdges[:-1])/bucketSizes
+    bucketMeanYs = np.add.reduceat(ys[:-1], bucketEdges[:-1])/bucketSizes
+    # The last point follows the last bucket.
+    nextXs = np.append(bucketMeanXs[1:], xs[-1])
+    nextYs = np.append(bucketMeanYs[1:], ys[-1])
+
+    idxs = np.empty(numOfPoints, dtype=np.int64)
+    (idxs[0], idxs[-1]) = (0, numOfValues-1)
+    idxPrevious = 0
+    for idxBucket in range(numOfPoints-2):
+        (idxStart, idxEnd) = bucketEdges[idxBucket:idxBucket+2]
+        (xPrevious, yPrevious) = (xs[idxPrevious], ys[idxPrevious])
+        # Twice the areas of the triangles.
+        areas = np.abs((xPrevious-nextXs[idxBucket])
+            *(ys[idxStart:idxEnd]-yPrevious)
+            -(xPrevious-xs[idxStart:idxEnd])*(nextYs[idxBucket]-yPrevious))
+        idxPrevious = idxStart+int(np.argmax(areas))
+        idxs[idxBucket+1] = idxPrevious
+    return idxs
+
+def getMinMaxIndices(ys, numOfPoints):
+    """
+    Get the (sorted) indices of the minimum and the maximum of each bucket of
+    a series with more than numOfPoints points (at least 4), plus its first
+    and last points, i.e. at most numOfPoints indices.
+    """
+    ys = np.asarray(ys, dtype=np.float64)
+    innerYs = ys[1:-1]
+    bucketSize = -(-len(innerYs)//max((numOfPoints-2)//2, 1))
+    numOfBuckets = -(-len(innerYs)//bucketSize)
+    idxsBucketStart = np.arange(numOfBuckets)*bucketSize
+    # Pad the last bucket so that the buckets are the rows of a matrix.
+    paddedYs = np.empty(numOfBuckets*bucketSize)
+    paddedYs[:len(innerYs)] = innerYs
+    paddedYs[len(innerYs):] = np.inf
+    idxsMin = idxsBucketStart+np.argmin(
+        paddedYs.reshape(numOfBuckets, bucketSize), axis=1)
+    paddedYs[len(innerYs):] = -np.inf
+    idxsMax = idxsBucketStart+np.argmax(
+        paddedYs.reshape(numOfBuckets, bucketSize), axis=1)
+    return np.unique(np.concatenate(
+        ([0], idxsMin+1, idxsMax+1, [len(ys)-1])))
+
+def downsampleSeries(xs, ys, maxNumOfPoints, method='lttb'):
+    """
+    Downsample a series to at most maxNumOfPoints points by method ('lttb' or
+    'minmax'), if it has more. Returns (xs, ys) as arrays.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise ValueError("Unknown downsampling method {}!".format(method))
+    if maxNumOfPoints<4:
+        raise ValueError("maxNumOfPoints should be at least 4!")
+    (xs, ys) = (np.asarray(xs), np.asarray(ys))
+    if len(xs)<=maxNumOfPoints:
+        return (xs, ys)
+    if method=='lttb':
+        idxs = getLttbIndices(xs, ys, maxNumOfPoints)
+    else:
+        idxs = getMinMaxIndices(ys, maxNumOfPoints)
+    return (xs[idxs], ys[idxs])
+
+def aggregateHistory(xs, ys, dates, historyWindowSize, period='week'):
+    """
+    Keep the latest historyWindowSize points of a daily series and replace
+    the earlier ones by one point per period ('week' or 'month'), at the mean
+    x and y of the period. Returns (xs, ys) as float arrays.
+    """
+    if historyWindowSize<1:
+        raise ValueError("historyWindowSize should be at least 1!")
+    (xs, ys) = (np.asarray(xs, dtype=np.float64),
+        np.asarray(ys, dtype=np.float64))
+    numOfHistoryPoints = len(xs)-historyWindowSize
+    if numOfHistoryPoints<=0:
+        return (xs, ys)
+    (_, idxsPeriod) = np.unique(getPeriodStarts(dates[:numOfHistoryPoints],
+        period), return_inverse=True)
+    counts = np.bincount(idxsPeriod)
+    historyXs = np.bincount(idxsPeriod, weights=xs[:numOfHistoryPoints]) \
+        /counts
+    historyYs = np.bincount(idxsPeriod, weights=ys[:numOfHistoryPoints]) \
+        /counts
+    return (np.concatenate((historyXs, xs[numOfHistoryPoints:])),
+        np.concatenate((historyYs, ys[numOfHistoryPoints:])))
+
+def reduceSeries(xs, ys, dates, seriesReduction=None):
+    """
+    Reduce a daily series (with the dates of its points) according to a
+    SeriesReduction, if it is given. Points with a NaN value are left out.
+    Returns (xs, ys).
+    """
+    if seriesReduction is None:
+        return (xs, ys)
+    (xs, ys, dates) = (np.asarray(xs), np.asarray(ys, dtype=np.float64),
+        np.asarray(dates))
+    flagsValid = np.isfinite(ys)
+    if not np.all(flagsValid):
+        (xs, ys, dates) = (xs[flagsValid], ys[flagsValid], dates[flagsValid])
+    if seriesReduction.historyWindowSize is not None:
+        (xs, ys) = aggregateHistory(xs, ys, dates,
+            seriesReduction.historyWindowSize, seriesReduction.historyPeriod)
+    if seriesReduction.maxNumOfPoints is not None:
+        (xs, ys) = downsampleSeries(xs, ys, seriesReduction.maxNumOfPoints,
+            seriesReduction.method)
+    return (xs, ys)
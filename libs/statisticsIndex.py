@@ -0,0 +1,189 @@
+"""
+Precomputed statistics index for a WorkoutTable.
+
+The index is built once per dataset with prefix (cumulative) sums, so that the
+statistics for the first numOfRowsToShow rows can be answered in O(1) for any
+numOfRowsToShow, instead of re-summing all the history rows for each plot.
+
+For a table holding only the latest rows of a longer history (see
+workoutStream), the sums start from the HistoryAggregates of the earlier rows.
+
+Developed and tested with Python 3.8.
+"""
+import numpy as np
+# Support running the files directly under ./libs for testing.
+try:
+    from .durationStatistics import getValidDurationFlags
+    from .trendModel import NUM_OF_SUMS, TrendModel, getSufficientStatistics
+except ImportError:
+    from durationStatistics import getValidDurationFlags
+    from trendModel import NUM_OF_SUMS, TrendModel, getSufficientStatistics
+
+def getPrefixSums(values, initialSum=0):
+    """
+    Get the prefix sums of a 1D array as float64, with a leading initialSum,
+    i.e. prefixSums[n] is initialSum plus the sum of the first n values.
+    """
+    prefixSums = np.zeros(len(values)+1, dtype=np.float64)
+    np.cumsum(values, out=prefixSums[1:])
+    prefixSums += initialSum
+    return prefixSums
+
+class HistoryAggregates(object):
+    """
+    Running aggregates of rows which are no longer kept in a WorkoutTable,
+    i.e. the days before its first row.
+
+    Attributes:
+        numOfRows: The number of rows aggregated.
+        sumDailyTotals, sumFirstSetReps, sumWorkoutTimesInS: The sums of the
+            daily totals, first-set repetition values and valid WorkoutTime
+            in seconds.
+        numOfWorkoutTimes: The number of rows with a valid WorkoutTime.
+        trendSums: A dict of the TrendModel running sums for the 'total' and
+            'firstSet' series, with x being the day numbers starting from 1.
+    """
+    def __init__(self):
+        self.numOfRows = 0
+        self.sumDailyTotals = 0
+        self.sumFirstSetReps = 0
+        self.sumWorkoutTimesInS = 0
+        self.numOfWorkoutTimes = 0
+        self.trendSums = {
+            'total': np.zeros(NUM_OF_SUMS, dtype=np.float64),
+            'firstSet': np.zeros(NUM_OF_SUMS, dtype=np.float64)
+        }
+
+    def addRows(self, setValues, workoutTimesInS=None):
+        """
+        Add the next rows (set values as a numOfRows x numOfSets array, and
+        optionally the WorkoutTime in seconds) to the aggregates.
+        """
+        setValues = np.asarray(setValues)
+        if setValues.shape[0]==0:
+            return
+        dailyTotals = setValues.sum(axis=1, dtype=np.int64)
+        firstSetReps = setValues[:, 0].astype(np.int64)
+        xs = np.arange(self.numOfRows+1, self.numOfRows+setValues.shape[0]+1)
+        self.numOfRows += setValues.shape[0]
+        self.sumDailyTotals += int(dailyTotals.sum())
+        self.sumFirstSetReps += int(firstSetReps.sum())
+        if workoutTimesInS is not None:
+            # The missing durations are skipped.
+            flagsValid = getValidDurationFlags(workoutTimesInS)
+            self.sumWorkoutTimesInS += int(np.sum(
+                np.asarray(workoutTimesInS)[flagsValid]))
+            self.numOfWorkoutTimes += int(np.count_nonzero(flagsValid))
+        self.trendSums['total'] += getSufficientStatistics(
+            xs, dailyTotals).sum(axis=0)
+        self.trendSums['firstSet'] += getSufficientStatistics(
+            xs, firstSetReps).sum(axis=0)
+
+    def copy(self):
+        historyAggregates = HistoryAggregates()
+        historyAggregates.numOfRows = self.numOfRows
+        historyAggregates.sumDailyTotals = self.sumDailyTotals
+        historyAggregates.sumFirstSetReps = self.sumFirstSetReps
+        historyAggregates.sumWorkoutTimesInS = self.sumWorkoutTimesInS
+        historyAggregates.numOfWorkoutTimes = self.numOfWorkoutTimes
+        historyAggregates.trendSums = {name: sums.copy()
+            for (name, sums) in self.trendSums.items()}
+        return historyAggregates
+
+class StatisticsIndex(object):
+    """
+    Cumulative statistics for a WorkoutTable.
+
+    Attributes:
+        idxFirstRow: The number of days before the first row of the table.
+        dailyTotals: The total repetition value of each day.
+        firstSetReps: The first-set repetition value of each day.
+            (Both are the arrays of the dailyAggregates of the table.)
+        cumDailyTotals, cumFirstSetReps: Prefix sums (with a leading 0) of the
+            series above.
+        cumWorkoutTimesInS, cumNumsOfWorkoutTimes: Prefix sums (with a
+            leading 0) of the valid WorkoutTime values in seconds and of the
+            number of rows with a valid WorkoutTime, or None if the field is
+            not available.
+        trendModels: A dict of TrendModel for the series ('total' for the
+            daily totals and 'firstSet' for the first-set repetition values),
+            with x being the day numbers starting from 1.
+    """
+    def __init__(self, table):
+        self.numOfRows = table.numOfRows
+        self.idxFirstRow = table.idxFirstRow
+        # The sums start from the aggregates of the earlier rows, if any.
+        historyAggregates = table.historyAggregates
+        if historyAggregates is None:
+            historyAggregates = HistoryAggregates()
+
+        self.dailyTotals = table.dailyAggregates.dailyTotals
+        self.firstSetReps = table.dailyAggregates.firstSetReps
+        self.cumDailyTotals = getPrefixSums(self.dailyTotals,
+            historyAggregates.sumDailyTotals)
+        self.cumFirstSetReps = getPrefixSums(self.firstSetReps,
+            historyAggregates.sumFirstSetReps)
+
+        if table.workoutTimesInS is None:
+            self.cumWorkoutTimesInS = None
+            self.cumNumsOfWorkoutTimes = None
+        else:
+            # The missing durations are skipped (as in durationStatistics).
+            flagsValid = getValidDurationFlags(table.workoutTimesInS)
+            self.cumWorkoutTimesInS = getPrefixSums(
+                np.where(flagsValid, table.workoutTimesInS, 0),
+                historyAggregates.sumWorkoutTimesInS)
+            self.cumNumsOfWorkoutTimes = getPrefixSums(flagsValid,
+                historyAggregates.numOfWorkoutTimes)
+
+        # Running sums for the trend fits over days.
+        xs = np.arange(self.idxFirstRow+1, self.idxFirstRow+self.numOfRows+1)
+        self.trendModels = {name: TrendModel(xs, ys,
+                initialSums=historyAggregates.trendSums[name])
+            for (name, ys) in (('total', self.dailyTotals),
+                ('firstSet', self.firstSetReps))}
+
+    def getTotalReps(self, numOfRowsToShow):
+        """
+        Get the sum of the daily totals over the first numOfRowsToShow rows
+        (and the days before the table, if any).
+        """
+        return self.cumDailyTotals[numOfRowsToShow]
+
+    def getMeanWorkoutTimeInS(self, numOfRowsToShow):
+        """
+        Get the average valid WorkoutTime in seconds over the first
+        numOfRowsToShow rows (and the days before the table, if any), or NaN
+        if there is none.
+        """
+        if self.cumWorkoutTimesInS is None:
+            raise ValueError("Field WorkoutTime is not available!")
+        numOfWorkoutTimes = self.cumNumsOfWorkoutTimes[numOfRowsToShow]
+        if numOfWorkoutTimes==0:
+            return np.nan
+        return self.cumWorkoutTimesInS[numOfRowsToShow]/numOfWorkoutTimes
+
+    def getTrendModel(self, seriesName):
+        """
+        Get the TrendModel of a series ('total' for the daily totals or
+        'firstSet' for the first-set repetition values).
+        """
+        if seriesName not in self.trendModels:
+            raise ValueError("Unknown series name {}!".format(seriesName))
+        return self.trendModels[seriesName]
+
+    def getLinearFit(self, seriesName, numOfRowsToShow):
+        """
+        Get the (slope, intercept) of the least-squares line fitted to the
+        first numOfRowsToShow values of a series.
+        """
+        return self.getTrendModel(seriesName).fit('linear', numOfRowsToShow)
+
+def getStatisticsIndex(table):
+    """
+    Get the StatisticsIndex of a WorkoutTable. The index is built on first use
+    and cached in the table.
+    """
+    if table.statisticsIndex is None:
+        table.statisticsIndex = StatisticsIndex(table)
+    return table.statisticsIndex
@@ -0,0 +1,228 @@
+"""
+Incremental loading of append-only workout csv files.
+
+The parsed WorkoutTable is stored in a binary snapshot file (.npz) next to the
+csv file, together with the byte offset of the data consumed and the
+checksums of the header line and of the last line consumed. On the next load,
+if these still match, only the lines appended after the offset are parsed;
+otherwise (e.g. an earlier row was edited and the file was shifted), the whole
+file is loaded again and the snapshot is rewritten.
+
+Only complete lines (ending with a line break) are stored in the snapshot. A
+last line without a line break, as written by most spreadsheet programs, is
+parsed on each load, so that it can still be edited or completed later.
+
+Note that an edit of an earlier row which keeps the size of the file and the
+last line unchanged can not be detected this way; delete the snapshot file (or
+load with flagUseSnapshot=False) after such edits.
+
+Developed and tested with Python 3.8.
+"""
+import csv
+import hashlib
+import io
+import os
+
+import numpy as np
+# Support running the files directly under ./libs for testing.
+try:
+    from .workoutTable import MalformedCell, WorkoutTable, \
+        concatenateWorkoutTables
+except ImportError:
+    from workoutTable import MalformedCell, WorkoutTable, \
+        concatenateWorkoutTables
+
+# Increase this to invalidate the snapshots, e.g. when the parsing changes.
+TABLE_SNAPSHOT_VERSION = 3
+
+# Encoding of the csv files.
+CSV_ENCODING = 'utf-8'
+
+def getDefaultPathToSnapshot(pathToCsvFile):
+    return pathToCsvFile+'.snapshot.npz'
+
+def getChecksum(content):
+    return hashlib.sha256(content).hexdigest()
+
+def parseCsvHeader(headerBytes):
+    return next(csv.reader([headerBytes.decode(CSV_ENCODING)]))
+
+def parseCsvLines(header, content):
+    """
+    Parse csv lines (bytes, without the header) into a WorkoutTable.
+    """
+    csvDictReader = csv.DictReader(
+        io.StringIO(content.decode(CSV_ENCODING), newline=''),
+        fieldnames=header)
+    return WorkoutTable.fromRows(header, list(csvDictReader))
+
+class TableSnapshot(object):
+    """
+    The parsed rows of a csv file up to offset (in bytes, always right after
+    a line break), with the checksums to check that the content of the file
+    up to offset has not changed.
+    """
+    def __init__(self, table, offset, headerSize, headerChecksum,
+        lastLineStart, lastLineChecksum):
+        self.table = table
+        self.offset = offset
+        self.headerSize = headerSize
+        self.headerChecksum = headerChecksum
+        self.lastLineStart = lastLineStart
+        self.lastLineChecksum = lastLineChecksum
+
+    def isValidFor(self, csvFile, fileSize):
+        """
+        Check whether the content of an open (binary) csv file up to offset
+        still matches the snapshot.
+        """
+        if fileSize<self.offset:
+            return False
+        csvFile.seek(0)
+        if getChecksum(csvFile.read(self.headerSize))!=self.headerChecksum:
+            return False
+        csvFile.seek(self.lastLineStart)
+        return getChecksum(csvFile.read(self.offset-self.lastLineStart)) \
+            ==self.lastLineChecksum
+
+    def save(self, pathToSnapshot):
+        """
+        Write the snapshot (via a temporary file, so that concurrent readers
+        never see a partial snapshot).
+        """
+        table = self.table
+        arrays = dict(
+            version=TABLE_SNAPSHOT_VERSION,
+            header=np.array(table.header, dtype=str),
+            setFieldNames=np.array(table.setFieldNames, dtype=str),
+            setValues=table.setValues,
+            dates=table.dates,
+            offset=self.offset,
+            headerSize=self.headerSize,
+            headerChecksum=self.headerChecksum,
+            lastLineStart=self.lastLineStart,
+            lastLineChecksum=self.lastLineChecksum,
+            malformedCellFields=np.array(
+                [cell.field for cell in table.malformedCells], dtype=str),
+            malformedCellRows=np.array(
+                [cell.idxRow for cell in table.malformedCells],
+                dtype=np.int64),
+            malformedCellStrs=np.array(
+                [cell.cellStr for cell in table.malformedCells], dtype=str))
+        if table.workoutTimesInS is not None:
+            arrays['workoutTimesInS'] = table.workoutTimesInS
+        if table.rawVideoTimesInS is not None:
+            arrays['rawVideoTimesInS'] = table.rawVideoTimesInS
+        if table.recordedSums is not None:
+            arrays['recordedSums'] = table.recordedSums
+
+        pathToTempFile = '{}.{}.tmp'.format(pathToSnapshot, os.getpid())
+        with open(pathToTempFile, mode='wb') as snapshotFile:
+            np.savez(snapshotFile, **arrays)
+        os.replace(pathToTempFile, pathToSnapshot)
+
+    @classmethod
+    def load(cls, pathToSnapshot):
+        """
+        Load a snapshot file. Returns None if the file does not exist, is
+        broken or is of another version.
+        """
+        if not os.path.exists(pathToSnapshot):
+            return None
+        try:
+            with np.load(pathToSnapshot, allow_pickle=False) as arrays:
+                if int(arrays['version'])!=TABLE_SNAPSHOT_VERSION:
+                    return None
+
+                def getOptionalArray(name):
+                    return arrays[name] if name in arrays.files else None
+
+                table = WorkoutTable(arrays['header'].tolist(),
+                    arrays['setFieldNames'].tolist(), arrays['setValues'],
+                    arrays['dates'],
+                    workoutTimesInS=getOptionalArray('workoutTimesInS'),
+                    rawVideoTimesInS=getOptionalArray('rawVideoTimesInS'),
+                    malformedCells=[MalformedCell(field, int(idxRow), cellStr)
+                        for (field, idxRow, cellStr) in zip(
+                            arrays['malformedCellFields'].tolist(),
+                            arrays['malformedCellRows'],
+                            arrays['malformedCellStrs'].tolist())],
+                    recordedSums=getOptionalArray('recordedSums'))
+                return cls(table, int(arrays['offset']),
+                    int(arrays['headerSize']), str(arrays['headerChecksum']),
+                    int(arrays['lastLineStart']),
+                    str(arrays['lastLineChecksum']))
+        except (OSError, ValueError, KeyError):
+            return None
+
+def loadWorkoutTableIncrementally(pathToCsvFile, pathToSnapshot=None,
+    flagSaveSnapshot=True):
+    """
+    Load the csv file into a WorkoutTable, only parsing the lines appended
+    since the snapshot at pathToSnapshot (by default, next to the csv file)
+    was saved. With flagSaveSnapshot, the snapshot is updated if new complete
+    lines were parsed.
+    """
+    if pathToSnapshot is None:
+        pathToSnapshot = getDefaultPathToSnapshot(pathToCsvFile)
+    snapshot = TableSnapshot.load(pathToSnapshot)
+
+    with open(pathToCsvFile, mode='rb') as csvFile:
+        fileSize = os.fstat(csvFile.fileno()).st_size
+        if snapshot is not None and snapshot.isValidFor(csvFile, fileSize):
+            csvFile.seek(snapshot.offset)
+            newContent = csvFile.read()
+            (header, offset) = (snapshot.table.header, snapshot.offset)
+            (headerSize, headerChecksum) = (snapshot.headerSize,
+                snapshot.headerChecksum)
+            tables = [snapshot.table]
+        else:
+            # Full reload.
+            csvFile.seek(0)
+            content = csvFile.read()
+            headerSize = content.find(b'\n')+1
+            if headerSize==0:
+                # No data rows yet.
+                headerSize = len(content)
+            header = parseCsvHeader(content[:headerSize]) if headerSize>0 \
+                else None
+            headerChecksum = getChecksum(content[:headerSize])
+            (newContent, offset) = (content[headerSize:], headerSize)
+            snapshot = None
+            tables = []
+
+    # Split the new content into complete lines and the last line without a
+    # line break (if any).
+    completeSize = newContent.rfind(b'\n')+1
+    if completeSize>0 or len(tables)==0:
+        tables.append(parseCsvLines(header, newContent[:completeSize]))
+    completeTable = tables[0] if len(tables)==1 else \
+        concatenateWorkoutTables(tables)
+    if completeSize<len(newContent):
+        table = concatenateWorkoutTables([completeTable,
+            parseCsvLines(header, newContent[completeSize:])])
+    else:
+        table = completeTable
+
+    # Save the snapshot if new complete lines were parsed (or after a full
+    # reload), as long as the data consumed ends with a line break.
+    flagNewSnapshot = completeSize>0 or \
+        (snapshot is None and header is not None and
+            content[headerSize-1:headerSize]==b'\n')
+    if flagSaveSnapshot and flagNewSnapshot:
+        if completeSize>0:
+            lastLineStart = offset+newContent.rfind(b'\n', 0,
+                completeSize-1)+1
+            lastLineChecksum = getChecksum(
+                newContent[lastLineStart-offset:completeSize])
+        else:
+            # Only the header has been consumed.
+            (lastLineStart, lastLineChecksum) = (0, headerChecksum)
+        try:
+            TableSnapshot(completeTable, offset+completeSize, headerSize,
+                headerChecksum, lastLineStart, lastLineChecksum).save(
+                pathToSnapshot)
+        except OSError:
+            # E.g. a read-only folder: just go without the snapshot.
+            pass
+    return table
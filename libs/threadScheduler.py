@@ -0,0 +1,69 @@
+"""
+Concurrent frame rendering with threads in the current process.
+
+The frames are rendered with the plotting functions in exerciseStatistics with
+flagUsePyplot=False: each frame is a standalone matplotlib Figure with its own
+Agg canvas and explicit fonts, without pyplot or the global rcParams, so that
+frames can be rendered concurrently, e.g. by the request handlers of a web
+service, where forking a process per request would be too expensive.
+
+Example:
+
+    table = loadWorkoutTable('20200401_PullUps.csv')
+    pngBytes = renderFrameJobToBytes(table, FrameJob('trend',
+        'trend.png', dict(numOfRowsToShow=10, figureSize=(9,16))))
+
+Note that the phase timing (see phaseProfiler) is not supported here, as the
+timings of concurrent frames would be mixed up.
+
+Developed and tested with Python 3.8.
+"""
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from . import exerciseStatistics as es
+from .renderScheduler import PLOT_FUNCTION_NAMES, getDefaultNumOfWorkers
+from .statisticsIndex import getStatisticsIndex
+
+def renderFrameJobToFigure(table, frameJob):
+    """
+    Render one frame of a WorkoutTable as a standalone Figure (which is not
+    tracked by pyplot and does not need to be closed).
+    """
+    plotFunction = getattr(es, PLOT_FUNCTION_NAMES[frameJob.plotType])
+    (fig, _) = plotFunction(table.header, table, flagShowPlot=False,
+        flagUsePyplot=False, **frameJob.kwargs)
+    return fig
+
+def renderFrameJobToBytes(table, frameJob, fileFormat='png'):
+    """
+    Render one frame of a WorkoutTable. Returns the encoded image (e.g. PNG)
+    as bytes.
+    """
+    buffer = io.BytesIO()
+    renderFrameJobToFigure(table, frameJob).savefig(buffer,
+        format=fileFormat)
+    return buffer.getvalue()
+
+def renderFrameJobsInThreads(table, frameJobs, outputDir,
+    numOfThreads=None):
+    """
+    Render a list of renderScheduler.FrameJob of a WorkoutTable into
+    outputDir with numOfThreads threads (one per CPU core by default).
+    Returns the paths to the output files, in the same order as frameJobs.
+    """
+    if numOfThreads is None:
+        numOfThreads = getDefaultNumOfWorkers()
+    if not os.path.exists(outputDir):
+        os.makedirs(outputDir)
+    # Build the statistics index once, before the threads share the table.
+    getStatisticsIndex(table)
+
+    def renderFrameJob(frameJob):
+        pathToOutput = os.path.join(outputDir, frameJob.fileName)
+        renderFrameJobToFigure(table, frameJob).savefig(pathToOutput)
+        return pathToOutput
+
+    with ThreadPoolExecutor(max_workers=numOfThreads) as executor:
+        return list(executor.map(renderFrameJob, frameJobs))
@@ -0,0 +1,183 @@
+"""
+Incremental, closed-form trend regression.
+
+A TrendModel keeps running sufficient statistics (e.g. sums of x, y, x*y and
+x^2) of the points appended so far, so that the least-squares fit for any
+prefix of the points can be computed in O(1) without refitting the data.
+
+Supported fits:
+
+    1. 'linear': y = a*x + b;
+    2. 'quadratic': y = a*x^2 + b*x + c;
+    3. 'exponential': y = a*exp(b*x), fitted linearly to log(y).
+
+Developed and tested with Python 3.8.
+"""
+import numpy as np
+
+TREND_FIT_TYPES = ('linear', 'quadratic', 'exponential')
+
+# Columns of the running sums.
+(IDX_N, IDX_X, IDX_XX, IDX_XXX, IDX_XXXX,
+    IDX_Y, IDX_XY, IDX_XXY, IDX_LOGY, IDX_XLOGY, IDX_NONPOSITIVE) = range(11)
+NUM_OF_SUMS = 11
+
+def getSufficientStatistics(xs, ys):
+    """
+    Get the per-point terms of the running sums as a (numOfPoints x
+    NUM_OF_SUMS) float64 array.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    terms = np.empty((len(xs), NUM_OF_SUMS), dtype=np.float64)
+    xxs = xs*xs
+    flagsPositive = ys>0
+    # Log values are only meaningful for positive y.
+    logYs = np.log(np.where(flagsPositive, ys, 1.0))
+    terms[:, IDX_N] = 1
+    terms[:, IDX_X] = xs
+    terms[:, IDX_XX] = xxs
+    terms[:, IDX_XXX] = xxs*xs
+    terms[:, IDX_XXXX] = xxs*xxs
+    terms[:, IDX_Y] = ys
+    terms[:, IDX_XY] = xs*ys
+    terms[:, IDX_XXY] = xxs*ys
+    terms[:, IDX_LOGY] = logYs
+    terms[:, IDX_XLOGY] = xs*logYs
+    terms[:, IDX_NONPOSITIVE] = ~flagsPositive
+    return terms
+
+def fitLine(n, sumX, sumXX, sumY, sumXY):
+    """
+    Closed-form least-squares line fit. Returns (slope, intercept).
+    """
+    denominator = n*sumXX-sumX*sumX
+    if denominator==0:
+        # Only one distinct x: keep it flat.
+        return (0.0, sumY/n)
+    slope = (n*sumXY-sumX*sumY)/denominator
+    intercept = (sumY-slope*sumX)/n
+    return (slope, intercept)
+
+class TrendModel(object):
+    """
+    Running sufficient statistics for trend fits over (x, y) points. Points
+    are appended with append or extend, and the fit for the first numOfPoints
+    points is available via fit in O(1).
+
+    initialSums, if given, are the running sums (a NUM_OF_SUMS vector) of
+    earlier points which are not kept (e.g. the days before a sliding window);
+    they are included in all the sums and fits.
+    """
+    def __init__(self, xs=None, ys=None, initialSums=None):
+        # Prefix sums of the sufficient statistics, with a leading row for the
+        # initial sums, i.e. self._cumSums[n] holds the sums over the first n
+        # points. The buffer grows by doubling so that appending is amortized
+        # O(1).
+        self._cumSums = np.zeros((1, NUM_OF_SUMS), dtype=np.float64)
+        if initialSums is not None:
+            self._cumSums[0] = initialSums
+        self.numOfPoints = 0
+        # Fits computed so far, keyed by (fitType, numOfPoints).
+        self._fitCache = {}
+        if xs is not None:
+            self.extend(xs, ys)
+
+    def _reserve(self, numOfPoints):
+        if self._cumSums.shape[0] < numOfPoints+1:
+            newCumSums = np.zeros(
+                (max(numOfPoints+1, 2*self._cumSums.shape[0]), NUM_OF_SUMS),
+                dtype=np.float64)
+            newCumSums[:self.numOfPoints+1] = \
+                self._cumSums[:self.numOfPoints+1]
+            self._cumSums = newCumSums
+
+    def append(self, x, y):
+        """
+        Append one (x, y) point.
+        """
+        self.extend([x], [y])
+
+    def extend(self, xs, ys):
+        """
+        Append a sequence of (x, y) points.
+        """
+        if len(xs)!=len(ys):
+            raise ValueError("xs and ys should have the same length!")
+        if len(xs)==0:
+            return
+        terms = getSufficientStatistics(xs, ys)
+        newNumOfPoints = self.numOfPoints+len(xs)
+        self._reserve(newNumOfPoints)
+        np.cumsum(terms, axis=0,
+            out=self._cumSums[self.numOfPoints+1:newNumOfPoints+1])
+        self._cumSums[self.numOfPoints+1:newNumOfPoints+1] += \
+            self._cumSums[self.numOfPoints]
+        self.numOfPoints = newNumOfPoints
+
+    def getSums(self, numOfPoints=None):
+        """
+        Get the running sums over the first numOfPoints points (all points by
+        default).
+        """
+        if numOfPoints is None:
+            numOfPoints = self.numOfPoints
+        if numOfPoints<1 or numOfPoints>self.numOfPoints:
+            raise ValueError(
+                "numOfPoints should be between 1 and {}!".format(
+                    self.numOfPoints))
+        return self._cumSums[numOfPoints]
+
+    def fit(self, fitType='linear', numOfPoints=None):
+        """
+        Fit the first numOfPoints points (all points by default). Returns the
+        coefficients as a tuple:
+
+            'linear': (a, b) for y = a*x + b;
+            'quadratic': (a, b, c) for y = a*x^2 + b*x + c;
+            'exponential': (a, b) for y = a*exp(b*x).
+        """
+        if numOfPoints is None:
+            numOfPoints = self.numOfPoints
+        key = (fitType, numOfPoints)
+        if key not in self._fitCache:
+            self._fitCache[key] = self._fit(fitType, numOfPoints)
+        return self._fitCache[key]
+
+    def _fit(self, fitType, numOfPoints):
+        s = self.getSums(numOfPoints)
+        n = s[IDX_N]
+        if fitType=='linear':
+            return fitLine(n, s[IDX_X], s[IDX_XX], s[IDX_Y], s[IDX_XY])
+        elif fitType=='quadratic':
+            normalMatrix = np.array([
+                [s[IDX_XXXX], s[IDX_XXX], s[IDX_XX]],
+                [s[IDX_XXX],  s[IDX_XX],  s[IDX_X]],
+                [s[IDX_XX],   s[IDX_X],   n]])
+            rhs = np.array([s[IDX_XXY], s[IDX_XY], s[IDX_Y]])
+            try:
+                return tuple(np.linalg.solve(normalMatrix, rhs))
+            except np.linalg.LinAlgError:
+                # Not enough distinct points for a parabola.
+                return (0.0,)+fitLine(
+                    n, s[IDX_X], s[IDX_XX], s[IDX_Y], s[IDX_XY])
+        elif fitType=='exponential':
+            if s[IDX_NONPOSITIVE]>0:
+                raise ValueError(
+                    "Exponential fits need all y values to be positive!")
+            (b, logA) = fitLine(
+                n, s[IDX_X], s[IDX_XX], s[IDX_LOGY], s[IDX_XLOGY])
+            return (np.exp(logA), b)
+        else:
+            raise ValueError("Unknown fit type {}!".format(fitType))
+
+    def predict(self, xs, fitType='linear', numOfPoints=None):
+        """
+        Evaluate the fit for the first numOfPoints points at xs.
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        coefficients = self.fit(fitType, numOfPoints)
+        if fitType=='exponential':
+            (a, b) = coefficients
+            return a*np.exp(b*xs)
+        return np.polyval(coefficients, xs)
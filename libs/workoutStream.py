@@ -0,0 +1,191 @@
+"""
+Memory-bounded streaming of workout records.
+
+The rows of a csv file are read lazily, one at a time, into a sliding window
+of the latest maxNumOfRows rows. The rows dropped from the window are folded
+into running aggregates (see statisticsIndex.HistoryAggregates), so that the
+cumulative statistics, averages and trend fits still cover the whole history,
+while the memory used does not grow with the length of the log.
+
+Example:
+
+    for table in iterWorkoutWindows('20200401_PullUps.csv', 100):
+        (fig, _) = es.plotTrend(table.header, table)
+        ...
+
+Developed and tested with Python 3.8.
+"""
+import csv
+from collections import namedtuple
+
+import numpy as np
+# Support running the files directly under ./libs for testing.
+try:
+    from .statisticsIndex import HistoryAggregates
+    from .workoutTable import WorkoutTable, isSetField, parseDateStr, \
+        parseTimeStrToSeconds
+except ImportError:
+    from statisticsIndex import HistoryAggregates
+    from workoutTable import WorkoutTable, isSetField, parseDateStr, \
+        parseTimeStrToSeconds
+
+# One parsed row of a workout csv file.
+#   date: A datetime.date object.
+#   setValues: A list of the repetition values, one for each set field.
+#   workoutTimeInS, rawVideoTimeInS: The WorkoutTime and RawVideoTime fields
+#       in seconds, or None if the field is not available.
+WorkoutRow = namedtuple('WorkoutRow',
+    ['date', 'setValues', 'workoutTimeInS', 'rawVideoTimeInS'])
+
+def readWorkoutCsvHeader(pathToCsvFile):
+    """
+    Read the header fields of a workout csv file.
+    """
+    with open(pathToCsvFile, mode='r') as csvFile:
+        return next(csv.reader(csvFile), [])
+
+def iterWorkoutRows(pathToCsvFile):
+    """
+    Read the rows of a workout csv file lazily. Yields a WorkoutRow for each
+    row.
+    """
+    with open(pathToCsvFile, mode='r') as csvFile:
+        csvReader = csv.reader(csvFile)
+        header = next(csvReader, [])
+        idxsSetFields = [idx for (idx, field) in enumerate(header)
+            if isSetField(field)]
+        idxDate = header.index('Date')
+
+        def getIdxField(field):
+            return header.index(field) if field in header else None
+        idxWorkoutTime = getIdxField('WorkoutTime')
+        idxRawVideoTime = getIdxField('RawVideoTime')
+
+        def parseDuration(row, idxField):
+            if idxField is None:
+                return None
+            return parseTimeStrToSeconds(
+                row[idxField] if idxField<len(row) else None)
+
+        for row in csvReader:
+            if len(row)==0:
+                continue
+            # Empty cells are treated as sets not done.
+            setValues = [int(row[idx]) if idx<len(row) and row[idx].strip()!=''
+                else 0 for idx in idxsSetFields]
+            yield WorkoutRow(parseDateStr(row[idxDate]), setValues,
+                parseDuration(row, idxWorkoutTime),
+                parseDuration(row, idxRawVideoTime))
+
+class SlidingWorkoutWindow(object):
+    """
+    The latest (at most) maxNumOfRows rows of a workout log, with the running
+    aggregates of the earlier rows.
+
+    The rows are stored in preallocated buffers for 2*maxNumOfRows rows; when
+    the end of the buffers is reached, the rows of the window are moved back
+    to the start, so that appending a row is amortized O(1) and getTable does
+    not copy the rows.
+    """
+    def __init__(self, header, maxNumOfRows):
+        if maxNumOfRows<1:
+            raise ValueError("maxNumOfRows should be at least 1!")
+        self.header = list(header)
+        self.setFieldNames = [field for field in header if isSetField(field)]
+        self.maxNumOfRows = maxNumOfRows
+        self.historyAggregates = HistoryAggregates()
+
+        bufferSize = 2*maxNumOfRows
+        self.setValues = np.zeros((bufferSize, len(self.setFieldNames)),
+            dtype=np.int32)
+        self.dates = np.empty(bufferSize, dtype='datetime64[D]')
+        self.workoutTimesInS = np.zeros(bufferSize, dtype=np.int32) \
+            if 'WorkoutTime' in header else None
+        self.rawVideoTimesInS = np.zeros(bufferSize, dtype=np.int32) \
+            if 'RawVideoTime' in header else None
+        # The window is [idxStart, idxEnd) in the buffers. The rows before
+        # idxStart, from idxAggregated on, are dropped from the window but not
+        # yet added to the history aggregates.
+        self.idxStart = 0
+        self.idxEnd = 0
+        self.idxAggregated = 0
+
+    @property
+    def numOfRows(self):
+        """
+        The number of rows in the window.
+        """
+        return self.idxEnd-self.idxStart
+
+    @property
+    def idxFirstRow(self):
+        """
+        The number of rows before the window.
+        """
+        return self.historyAggregates.numOfRows+self.idxStart \
+            -self.idxAggregated
+
+    def _aggregateDroppedRows(self):
+        (idxFrom, idxTo) = (self.idxAggregated, self.idxStart)
+        if idxTo>idxFrom:
+            self.historyAggregates.addRows(self.setValues[idxFrom:idxTo],
+                None if self.workoutTimesInS is None
+                else self.workoutTimesInS[idxFrom:idxTo])
+            self.idxAggregated = idxTo
+
+    def append(self, row):
+        """
+        Append a WorkoutRow, dropping the earliest row if the window is full.
+        """
+        if self.idxEnd==self.setValues.shape[0]:
+            # Move the window back to the start of the buffers.
+            self._aggregateDroppedRows()
+            numOfRows = self.numOfRows
+            for buffer in (self.setValues, self.dates, self.workoutTimesInS,
+                self.rawVideoTimesInS):
+                if buffer is not None:
+                    buffer[:numOfRows] = buffer[self.idxStart:self.idxEnd]
+            (self.idxStart, self.idxEnd, self.idxAggregated) = \
+                (0, numOfRows, 0)
+
+        idx = self.idxEnd
+        self.setValues[idx] = row.setValues
+        self.dates[idx] = row.date
+        if self.workoutTimesInS is not None:
+            self.workoutTimesInS[idx] = row.workoutTimeInS
+        if self.rawVideoTimesInS is not None:
+            self.rawVideoTimesInS[idx] = row.rawVideoTimeInS
+        self.idxEnd += 1
+        if self.numOfRows>self.maxNumOfRows:
+            self.idxStart += 1
+
+    def getTable(self):
+        """
+        Get the rows of the window as a WorkoutTable, with idxFirstRow and
+        historyAggregates set for the rows before the window. The table is a
+        view of the buffers and is only valid until the next append.
+        """
+        self._aggregateDroppedRows()
+        window = slice(self.idxStart, self.idxEnd)
+
+        def getOptionalRows(buffer):
+            return None if buffer is None else buffer[window]
+
+        return WorkoutTable(self.header, self.setFieldNames,
+            self.setValues[window], self.dates[window],
+            workoutTimesInS=getOptionalRows(self.workoutTimesInS),
+            rawVideoTimesInS=getOptionalRows(self.rawVideoTimesInS),
+            idxFirstRow=self.historyAggregates.numOfRows,
+            historyAggregates=self.historyAggregates.copy())
+
+def iterWorkoutWindows(pathToCsvFile, maxNumOfRows):
+    """
+    Read a workout csv file row by row. Yields the WorkoutTable of the latest
+    (at most) maxNumOfRows rows after each row (see
+    SlidingWorkoutWindow.getTable).
+    """
+    window = SlidingWorkoutWindow(readWorkoutCsvHeader(pathToCsvFile),
+        maxNumOfRows)
+    for row in iterWorkoutRows(pathToCsvFile):
+        window.append(row)
+        yield window.getTable()
@@ -0,0 +1,354 @@
+"""
+Columnar, NumPy-backed storage for workout records.
+
+All string parsing happens once at load time:
+
+    1. Set values are stored in an int32 matrix (rows x sets);
+    2. Dates are stored as a datetime64[D] array;
+    3. WorkoutTime and RawVideoTime are stored as int seconds, with the cells
+       which are not in the h:mm:ss format reported as malformed;
+    4. The Sum field is stored as ints, with the cells which are not
+       integers reported as malformed, and the per-day aggregates (e.g. the
+       daily totals, validated against it) are derived for all the rows when
+       the table is constructed (see dailyAggregates).
+
+Developed and tested with Python 3.8.
+"""
+# For loading data from a csv file.
+import csv
+# For date formatting.
+import datetime
+# For finding csv files.
+import os
+from collections import namedtuple
+
+import numpy as np
+# Support running the files directly under ./libs for testing.
+try:
+    from .dailyAggregates import MISSING_SUM, DailyAggregates
+except ImportError:
+    from dailyAggregates import MISSING_SUM, DailyAggregates
+
+# The field of the daily totals recorded in the csv files.
+SUM_FIELD = 'Sum'
+
+# Placeholder for duration cells that are missing or can not be parsed.
+MISSING_DURATION = -1
+
+# The duration fields, with the WorkoutTable attributes storing them.
+DURATION_FIELDS = (
+    ('WorkoutTime', 'workoutTimesInS'),
+    ('RawVideoTime', 'rawVideoTimesInS')
+)
+
+# A duration cell which is not in the h:mm:ss format (e.g. with a stray
+# quote) or a Sum cell which is not an integer, with the index of its row in
+# the table.
+MalformedCell = namedtuple('MalformedCell', ['field', 'idxRow', 'cellStr'])
+
+def isSetField(field):
+    """
+    Check whether a csv header field stores the repetition value of a set.
+    """
+    return field.lower().startswith('set')
+
+def parseDateStr(dateStr):
+    """
+    Parse a date string (e.g. "4/1/2020") into a datetime.date object.
+    """
+    (monthStr, dayStr, yearStr) = dateStr.strip().strip('"').split('/')
+    return datetime.date(int(yearStr), int(monthStr), int(dayStr))
+
+def parseTimeStrToSeconds(timeStr):
+    """
+    Convert a time string (e.g. "0:04:10" for 0 hour 4 minutes 10 seconds) into
+    the number of seconds. Stray quotes and spaces are ignored. Returns
+    MISSING_DURATION if the string can not be parsed.
+    """
+    if timeStr is None:
+        return MISSING_DURATION
+    try:
+        (hStr, mStr, sStr) = timeStr.strip().strip('"').split(':')
+        return (int(hStr)*60+int(mStr))*60+int(sStr)
+    except ValueError:
+        return MISSING_DURATION
+
+def parseSumColumn(sumStrs):
+    """
+    Convert a column of Sum cells into ints. Stray quotes and spaces are
+    ignored. Returns (recordedSums, flagsMalformed): an int32 array with
+    MISSING_SUM for the cells which are missing or can not be parsed, and a
+    bool array flagging the non-empty cells which are not integers.
+    """
+    numOfCells = len(sumStrs)
+    recordedSums = np.full(numOfCells, MISSING_SUM, dtype=np.int32)
+    flagsMalformed = np.zeros(numOfCells, dtype=bool)
+    for (idxCell, sumStr) in enumerate(sumStrs):
+        cellStr = '' if sumStr is None else sumStr.strip().strip('"')
+        if cellStr=='':
+            continue
+        try:
+            recordedSums[idxCell] = int(cellStr)
+        except ValueError:
+            flagsMalformed[idxCell] = True
+    return (recordedSums, flagsMalformed)
+
+def parseDurationColumn(timeStrs):
+    """
+    Convert a column of time strings (e.g. "0:04:10", with None or empty
+    strings for the missing cells) into the numbers of seconds at once.
+    Returns (durationsInS, flagsMalformed): an int32 array with
+    MISSING_DURATION for the cells which are missing or can not be parsed,
+    and a bool array flagging the non-empty cells which are not exactly in
+    the h:mm:ss format.
+
+    The well-formed cells are parsed together as a matrix of characters;
+    only the malformed ones are parsed one by one by parseTimeStrToSeconds
+    (e.g. 279 seconds for '0:04:39"', with a stray quote).
+    """
+    cellStrs = ['' if timeStr is None else timeStr for timeStr in timeStrs]
+    numOfCells = len(cellStrs)
+    durationsInS = np.full(numOfCells, MISSING_DURATION, dtype=np.int32)
+    flagsMalformed = np.zeros(numOfCells, dtype=bool)
+    if numOfCells==0:
+        return (durationsInS, flagsMalformed)
+
+    # One row of ASCII codes per cell, padded with zeros (other characters
+    # are replaced, so that the cell is parsed one by one).
+    cellBytes = np.array([cellStr if cellStr.isascii() else '\x7f'
+        for cellStr in cellStrs], dtype=bytes)
+    width = cellBytes.dtype.itemsize
+    chars = cellBytes.view(np.uint8).reshape(numOfCells, width)
+    lengths = np.count_nonzero(chars, axis=1)
+    flagsDigit = (chars>=ord('0')) & (chars<=ord('9'))
+    digits = chars.astype(np.int64)-ord('0')
+
+    # The positions counted from the end of h:mm:ss.
+    idxsCell = np.arange(numOfCells)
+    def getColumn(array, offsetFromEnd):
+        return array[idxsCell, np.clip(lengths-offsetFromEnd, 0, width-1)]
+    flagsWellFormed = (lengths>=7) \
+        & (getColumn(chars, 3)==ord(':')) & (getColumn(chars, 6)==ord(':'))
+    for offsetFromEnd in (1, 2, 4, 5):
+        flagsWellFormed &= getColumn(flagsDigit, offsetFromEnd)
+    flagsWellFormed &= (getColumn(digits, 2)<6) & (getColumn(digits, 5)<6)
+    # All the characters before the minutes are hour digits.
+    flagsHourChars = np.arange(width)<(lengths-6)[:, np.newaxis]
+    flagsWellFormed &= np.all(flagsDigit | ~flagsHourChars, axis=1)
+
+    hours = np.zeros(numOfCells, dtype=np.int64)
+    for idxChar in range(max(int(lengths.max())-6, 0)):
+        hours = np.where(flagsHourChars[:, idxChar],
+            hours*10+digits[:, idxChar], hours)
+    minutes = getColumn(digits, 5)*10+getColumn(digits, 4)
+    seconds = getColumn(digits, 2)*10+getColumn(digits, 1)
+    durationsInS[flagsWellFormed] = ((hours*60+minutes)*60
+        +seconds)[flagsWellFormed]
+
+    for idxCell in np.flatnonzero(~flagsWellFormed):
+        cellStr = cellStrs[idxCell]
+        if cellStr.strip()!='':
+            flagsMalformed[idxCell] = True
+            durationsInS[idxCell] = parseTimeStrToSeconds(cellStr)
+    return (durationsInS, flagsMalformed)
+
+class WorkoutTable(object):
+    """
+    Typed, columnar view of the records in a workout csv file.
+
+    Attributes:
+        header: The csv header fields.
+        setFieldNames: The header fields for the sets, in order.
+        setValues: An int32 numpy array (numOfRows x numOfSets) for the
+            repetition values.
+        dates: A datetime64[D] numpy array for the dates.
+        workoutTimesInS: An int32 numpy array for the WorkoutTime field in
+            seconds, or None if the field is not available.
+        rawVideoTimesInS: An int32 numpy array for the RawVideoTime field in
+            seconds, or None if the field is not available.
+        malformedCells: A list of MalformedCell for the duration cells not
+            in the h:mm:ss format and the Sum cells which are not integers.
+        recordedSums: An int32 numpy array for the Sum field (MISSING_SUM for
+            empty cells), or None if the field is not available.
+        dailyAggregates: The dailyAggregates.DailyAggregates of the rows,
+            derived when the table is constructed.
+        idxFirstRow: The number of days before the first row, for a table
+            holding only the latest rows of a longer history (0 by default).
+        historyAggregates: The statisticsIndex.HistoryAggregates of the days
+            before the first row, or None.
+        statisticsIndex: Cache for the StatisticsIndex of the table (see
+            statisticsIndex.getStatisticsIndex).
+        durationStatistics: Cache for the DurationStatistics of the table by
+            window size (see durationStatistics.getDurationStatistics).
+    """
+    def __init__(self, header, setFieldNames, setValues, dates,
+        workoutTimesInS=None, rawVideoTimesInS=None, idxFirstRow=0,
+        historyAggregates=None, malformedCells=None, recordedSums=None):
+        self.header = list(header)
+        self.setFieldNames = list(setFieldNames)
+        self.setValues = np.asarray(setValues, dtype=np.int32).reshape(
+            -1, len(self.setFieldNames))
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.workoutTimesInS = workoutTimesInS
+        self.rawVideoTimesInS = rawVideoTimesInS
+        self.idxFirstRow = idxFirstRow
+        self.historyAggregates = historyAggregates
+        self.malformedCells = list(malformedCells or [])
+        self.recordedSums = recordedSums
+        self.dailyAggregates = DailyAggregates(self.setValues,
+            workoutTimesInS, recordedSums)
+        self.statisticsIndex = None
+        self.durationStatistics = {}
+
+    @classmethod
+    def fromRows(cls, header, data):
+        """
+        Construct the table from the csv header and a list of dict (one dict
+        for each row, as generated by csv.DictReader).
+        """
+        setFieldNames = [field for field in header if isSetField(field)]
+        numOfRows = len(data)
+
+        setValues = np.zeros((numOfRows, len(setFieldNames)), dtype=np.int32)
+        dates = np.empty(numOfRows, dtype='datetime64[D]')
+        for (idxRow, row) in enumerate(data):
+            for (idxSet, field) in enumerate(setFieldNames):
+                valueStr = row[field]
+                # Empty cells are treated as sets not done.
+                if valueStr is not None and valueStr.strip()!='':
+                    setValues[idxRow, idxSet] = int(valueStr)
+            dates[idxRow] = parseDateStr(row['Date'])
+
+        durationColumns = {}
+        malformedCells = []
+        for (field, attributeName) in DURATION_FIELDS:
+            if field not in header:
+                durationColumns[attributeName] = None
+                continue
+            timeStrs = [row[field] for row in data]
+            (durationColumns[attributeName], flagsMalformed) = \
+                parseDurationColumn(timeStrs)
+            malformedCells += [MalformedCell(field, int(idxRow),
+                    timeStrs[idxRow])
+                for idxRow in np.flatnonzero(flagsMalformed)]
+
+        recordedSums = None
+        if SUM_FIELD in header:
+            sumStrs = [row[SUM_FIELD] for row in data]
+            (recordedSums, flagsMalformed) = parseSumColumn(sumStrs)
+            malformedCells += [MalformedCell(SUM_FIELD, int(idxRow),
+                    sumStrs[idxRow])
+                for idxRow in np.flatnonzero(flagsMalformed)]
+
+        return cls(header, setFieldNames, setValues, dates,
+            malformedCells=sorted(malformedCells,
+                key=lambda cell: cell.idxRow),
+            recordedSums=recordedSums, **durationColumns)
+
+    @property
+    def numOfRows(self):
+        return self.setValues.shape[0]
+
+    @property
+    def numOfSets(self):
+        return self.setValues.shape[1]
+
+    def __len__(self):
+        return self.numOfRows
+
+    def getDate(self, idxRow):
+        """
+        Get the date of a row as a datetime.date object.
+        """
+        return self.dates[idxRow].astype(datetime.date)
+
+def loadWorkoutTable(pathToCsvFile):
+    """
+    Load the input csv file into a WorkoutTable.
+    """
+    with open(pathToCsvFile, mode='r') as csvFile:
+        csvDictReader = csv.DictReader(csvFile)
+        header = csvDictReader.fieldnames
+        return WorkoutTable.fromRows(header, list(csvDictReader))
+
+def isWorkoutCsvFile(pathToCsvFile):
+    """
+    Check whether a csv file looks like a workout record file, i.e. its header
+    has a Date field and at least one set field.
+    """
+    try:
+        with open(pathToCsvFile, mode='r') as csvFile:
+            header = next(csv.reader(csvFile), [])
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return False
+    return 'Date' in header and any(isSetField(field) for field in header)
+
+def findWorkoutCsvFiles(rootDir, excludedDirs=()):
+    """
+    Find all the workout csv files under rootDir (recursively, skipping the
+    folders in excludedDirs), sorted by path.
+    """
+    excludedDirs = set(os.path.abspath(d) for d in excludedDirs)
+    pathsToCsvFiles = []
+    for (dirPath, dirNames, fileNames) in os.walk(rootDir):
+        dirNames[:] = [d for d in dirNames
+            if os.path.abspath(os.path.join(dirPath, d)) not in excludedDirs]
+        for fileName in fileNames:
+            pathToCsvFile = os.path.join(dirPath, fileName)
+            if fileName.lower().endswith('.csv') and \
+                isWorkoutCsvFile(pathToCsvFile):
+                pathsToCsvFiles.append(pathToCsvFile)
+    return sorted(pathsToCsvFiles)
+
+def concatenateWorkoutTables(tables):
+    """
+    Concatenate the rows of WorkoutTables with the same header into a new
+    WorkoutTable.
+    """
+    header = tables[0].header
+    for table in tables[1:]:
+        if table.header!=header:
+            raise ValueError(
+                "Can not concatenate tables with different headers!")
+
+    def concatenateOptionalColumns(name):
+        columns = [getattr(table, name) for table in tables]
+        if any(column is None for column in columns):
+            return None
+        return np.concatenate(columns)
+
+    # The rows of the malformed cells are counted from the first table.
+    malformedCells = []
+    idxFirstRowOfTable = 0
+    for table in tables:
+        malformedCells += [cell._replace(idxRow=idxFirstRowOfTable
+                +cell.idxRow)
+            for cell in table.malformedCells]
+        idxFirstRowOfTable += table.numOfRows
+
+    return WorkoutTable(header, tables[0].setFieldNames,
+        np.concatenate([table.setValues for table in tables]),
+        np.concatenate([table.dates for table in tables]),
+        workoutTimesInS=concatenateOptionalColumns('workoutTimesInS'),
+        rawVideoTimesInS=concatenateOptionalColumns('rawVideoTimesInS'),
+        malformedCells=malformedCells,
+        recordedSums=concatenateOptionalColumns('recordedSums'))
+
+def toWorkoutTable(header, data):
+    """
+    Make sure the data is available as a WorkoutTable. The data is returned
+    directly if it is already a WorkoutTable; otherwise, it should be a list of
+    dict from csv.DictReader and will be converted.
+    """
+    if isinstance(data, WorkoutTable):
+        return data
+    return WorkoutTable.fromRows(header, data)
+
+def formatMalformedCells(malformedCells):
+    """
+    Format the malformed cells of a table as lines of a report, with the rows
+    numbered from 1 (as the data rows of the csv file).
+    """
+    return ['Row {} ({}): {!r}'.format(cell.idxRow+1, cell.field,
+            cell.cellStr)
+        for cell in malformedCells]
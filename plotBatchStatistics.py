@@ -0,0 +1,103 @@
+"""
+===============================================
+Generate figures for a folder of workout records
+===============================================
+All the workout csv files (with the structure of 20200401_PullUps.csv) under
+a folder, e.g. one file per athlete and exercise, are found recursively, and
+the figures of plotPullUpStatistics.py are generated for each of them, with
+the frames of all the files rendered on one shared process pool. Usage:
+
+    python plotBatchStatistics.py INPUT_DIR [--output-dir OUTPUT_DIR]
+        [--workers NUM_OF_WORKERS] [--block-size BLOCK_SIZE]
+        [--reuse-figures] [--no-cache] [--no-snapshot]
+        [--max-history-rows MAX_NUM_OF_HISTORY_ROWS]
+
+The frames of INPUT_DIR/a/b.csv are stored in OUTPUT_DIR/a/b/. The progress
+and throughput are printed while rendering.
+
+Developed and tested with Python 3.8.
+"""
+import argparse
+import os
+import time
+
+import plotPullUpStatistics as driver
+from libs.batchScheduler import BatchDataset, renderBatch
+from libs.tableSnapshot import loadWorkoutTableIncrementally
+from libs.workoutTable import findWorkoutCsvFiles, loadWorkoutTable
+
+pwd = os.path.dirname(__file__)
+
+# Default output folder.
+outputDir = os.path.join(pwd, 'BatchOutput')
+
+def constructBatchDatasets(inputDir, outputDir, flagUseSnapshot=True,
+    maxNumOfHistoryRows=None):
+    """
+    Find the workout csv files under inputDir and construct the frames to
+    render for each of them. Returns a list of BatchDataset.
+    """
+    datasets = []
+    for pathToCsvFile in findWorkoutCsvFiles(inputDir,
+        excludedDirs=[outputDir]):
+        if flagUseSnapshot:
+            table = loadWorkoutTableIncrementally(pathToCsvFile)
+        else:
+            table = loadWorkoutTable(pathToCsvFile)
+        if table.numOfRows==0:
+            continue
+        frameJobs = driver.constructFrameJobs(table.numOfRows,
+            table.numOfSets, maxNumOfHistoryRows)
+        if table.workoutTimesInS is None:
+            # plotDailyTimeSpent needs the WorkoutTime field.
+            frameJobs = [f for f in frameJobs if f.plotType!='time']
+        datasetOutputDir = os.path.join(outputDir, os.path.splitext(
+            os.path.relpath(pathToCsvFile, inputDir))[0])
+        datasets.append(BatchDataset(pathToCsvFile, datasetOutputDir,
+            frameJobs, table))
+    return datasets
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate figures for a folder of workout records.')
+    parser.add_argument('inputDir',
+        help='Folder to search (recursively) for workout csv files.')
+    parser.add_argument('--output-dir', default=outputDir,
+        help='Output folder (default: ./BatchOutput).')
+    parser.add_argument('--workers', type=int, default=None,
+        help='Number of worker processes (default: one per CPU core).')
+    parser.add_argument('--block-size', type=int, default=16,
+        help='Number of consecutive frames of a file rendered per task.')
+    parser.add_argument('--reuse-figures', action='store_true',
+        help='Update persistent figures instead of creating one per frame.')
+    parser.add_argument('--no-cache', action='store_true',
+        help='Render all frames, even if their inputs have not changed.')
+    parser.add_argument('--no-snapshot', action='store_true',
+        help='Parse the whole csv files instead of using the snapshots.')
+    parser.add_argument('--max-history-rows', type=int, default=None,
+        help='Maximum number of days shown in the 3D bar charts.')
+    args = parser.parse_args()
+    flagUseSnapshot = not args.no_snapshot
+
+    datasets = constructBatchDatasets(args.inputDir, args.output_dir,
+        flagUseSnapshot, args.max_history_rows)
+    print('Found {} workout csv files with {} frames in total.'.format(
+        len(datasets), sum(len(d.frameJobs) for d in datasets)))
+
+    # Report the progress at most every second.
+    lastReportTime = [0]
+    def reportProgress(progress):
+        currentTime = time.perf_counter()
+        if currentTime-lastReportTime[0]>=1 or \
+            progress.numOfFramesDone==progress.numOfFrames:
+            print(progress.formatStatus(), flush=True)
+            lastReportTime[0] = currentTime
+
+    progress = renderBatch(datasets, numOfWorkers=args.workers,
+        blockSize=args.block_size, flagReuseFigures=args.reuse_figures,
+        flagUseCache=not args.no_cache, flagUseSnapshot=flagUseSnapshot,
+        progressCallback=reportProgress)
+    print('Done: '+progress.formatStatus())
+
+if __name__ == '__main__':
+    main()
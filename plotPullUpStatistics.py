@@ -7,126 +7,269 @@ Figures generated:
     1. One 3D bar chart for each day;
     2. Trend fit plots for first set & sum.
 
+The frame sequences are listed in frameJobs.json (see libs/frameJobConfig.py).
+Run with --help for the options, which are described in readme.md.
+
 Developed and tested with Python 3.8.
 
 Yaguang Zhang, 2020/04/29
 """
+import argparse
 import os
 import libs.exerciseStatistics as es
-import matplotlib.pyplot as plt
-# For setting font in the plot.
-from pylab import mpl
+from libs.dailyAggregates import formatSumMismatches
+from libs.frameJobConfig import DayOverride, expandFrameSequences, \
+    loadFrameSequences, parseDayRange
+from libs.frameSinks import OUTPUT_TIER_DPIS
+from libs.phaseProfiler import PhaseProfile
+from libs.renderScheduler import renderFrameJobs, renderFrameJobsInStream, \
+    renderFrameJobsToPdf, renderFrameJobsToSpriteSheets, \
+    renderFrameJobsToVideo
+from libs.seriesReduction import DOWNSAMPLING_METHODS, SeriesReduction
+from libs.workoutTable import formatMalformedCells
 
 pwd = os.path.dirname(__file__)
 pathToCsvFile = os.path.join(pwd, './20200401_PullUps.csv')
+# The frames to render (see libs/frameJobConfig.py).
+pathToFrameJobConfig = os.path.join(pwd, './frameJobs.json')
 
-(header, data) = es.loadStatisticsFromCsv(pathToCsvFile)
-totalNumOfRows = len(data)
-fieldsForSets  = [field for field in header
-    if field.lower().startswith('set')]
-totalNumOfSets = len(fieldsForSets)
+# Output folder.
+outputFolderName = 'Output'
+outputDir = os.path.join(pwd, outputFolderName)
+# Subfolder for the preview tier.
+previewFolderName = 'Preview'
 
-# Set font size.
-labelSize = 30
-titleSize = 40
-tickSize  = 30
-inFigTextSize = 100
+# Number of frames per row and column in the sprite sheets.
+spriteSheetGrid = (5, 5)
 
-# Set figure size.
-figureSize = (9,16)
-figureSizeWide = (16,9)
-figureSizeSquare = (9,8)
+def getFrameSequences(pathToConfig=None):
+    """
+    Load the frame sequences to render (see libs/frameJobConfig.py) from a
+    frame job configuration file (frameJobs.json by default).
+    """
+    return loadFrameSequences(pathToFrameJobConfig if pathToConfig is None
+        else pathToConfig)
 
-# Set line width in the trend plot.
-lineWidth = 5
-lineWidthPre = 3
+def customizeFrameSequences(frameSequences, maxNumOfHistoryRows=None,
+    flagLayeredBars=False, rollingWindowSize=None, seriesReduction=None):
+    """
+    Apply the options of the script to the frame sequences. The bar charts
+    show at most maxNumOfHistoryRows days (all days by default), and are
+    'layeredBar' ones with flagLayeredBars, which only draw the bars of the
+    latest day for each set with persistent figures. The daily time spent
+    plots show the rolling average over rollingWindowSize days, if it is given.
+    The lines of the trend and daily time spent plots are reduced according to
+    seriesReduction, if it is given.
+    """
+    customizedSequences = []
+    for frameSequence in frameSequences:
+        (plotType, kwargs, overrides) = (frameSequence.plotType,
+            dict(frameSequence.kwargs), frameSequence.overrides)
+        if plotType in ('bar', 'layeredBar'):
+            if flagLayeredBars:
+                plotType = 'layeredBar'
+            if maxNumOfHistoryRows is not None:
+                # Only the frames after the first day show any history.
+                overrides += (DayOverride(2, None,
+                    dict(maxNumOfHistoryRows=maxNumOfHistoryRows)),)
+        if plotType=='time' and rollingWindowSize is not None:
+            kwargs['rollingWindowSize'] = rollingWindowSize
+        if plotType in ('trend', 'time') and seriesReduction is not None:
+            kwargs['seriesReduction'] = seriesReduction
+        customizedSequences.append(frameSequence._replace(plotType=plotType,
+            kwargs=kwargs, overrides=overrides))
+    return customizedSequences
 
-# Output folder.
-outputFolderName = 'Output'
-try:
-    outputDir = os.path.join(pwd, outputFolderName)
-    os.mkdir(outputDir)
-except Exception:
-    pass
-
-# Loop through all days and all sets for the bar chart.
-for idxRow in range(totalNumOfRows):
-    for idxSet in range(totalNumOfSets):
-        if idxRow==0:
-            (fig, _) = es.plot3dBarChart(header, data, idxRow+1, idxSet+1,
-                labelSize=labelSize, titleSize=titleSize, tickSize=tickSize,
-                figureSize=figureSize, flagShowPlot=False)
-        else:
-            (fig, _) = es.plot3dBarChart(header, data, idxRow+1, idxSet+1,
-                labelSize=labelSize, titleSize=titleSize, tickSize=tickSize,
-                figureSize=figureSize, labelPad3D=30, extraLabelPadZ = 10,
-                titleY=0.9, titleLoc='right', titleEndPad=5, zTickPad=3,
-                camView=(10, -60), flagShowPlot=False)
-        fig.savefig(
-            os.path.join(outputDir,
-            'bar_day_'+str(idxRow+1)+'_set_'+str(idxSet+1)+'.png'))
-        plt.close(fig)
-
-# Loop through (1) all days for the trend plots and (2) future days for the
-# prediction trend plots.
-for idxRow in range(1, 365):
-    if idxRow<totalNumOfRows:
-        lw = lineWidth
-    else:
-        lw = lineWidthPre
-    (fig, _) = es.plotTrend(header, data,  idxRow+1,
-        figureSize=figureSize, lineWidth=lw, labelSize=labelSize,
-        titleSize=titleSize, tickSize=tickSize, flagShowPlot=False)
-    fig.savefig(
-        os.path.join(outputDir,
-        'trend_day_'+str(idxRow+1)+'.png'))
-    plt.close(fig)
-
-# Loop through all days for square trend plots.
-for idxRow in range(1, totalNumOfRows):
-    (fig, _) = es.plotTrend(header, data,  idxRow+1,
-        figureSize=figureSizeSquare, lineWidth=lineWidth, labelSize=labelSize,
-        titleSize=titleSize, tickSize=tickSize, flagShowPlot=False,
-        flagEndDateDataInTitle=True)
-    fig.savefig(
-        os.path.join(outputDir,
-        'trend_square_day_'+str(idxRow+1)+'.png'))
-    plt.close(fig)
-
-    (fig, _) = es.plotDailyTimeSpent(header, data,  idxRow+1,
-        figureSize=figureSizeSquare, lineWidth=lineWidth, labelSize=labelSize,
-        titleSize=titleSize, tickSize=tickSize, flagShowPlot=False,
-        flagEndDateDataInTitle=True)
-    fig.savefig(
-        os.path.join(outputDir,
-        'time_square_day_'+str(idxRow+1)+'.png'))
-    plt.close(fig)
-
-# Loop through future days for wider prediction trend plots.
-for idxRow in range(totalNumOfRows, 365):
-    if idxRow<totalNumOfRows:
-        lw = lineWidth
-    else:
-        lw = lineWidthPre
-    (fig, _) = es.plotTrend(header, data,  idxRow+1,
-        figureSize=figureSizeWide, lineWidth=lw, labelSize=labelSize,
-        titleSize=titleSize, tickSize=tickSize, flagShowPlot=False,
-        inFigTextSize=inFigTextSize)
-    fig.savefig(
-        os.path.join(outputDir,
-        'trend_wide_day_'+str(idxRow+1)+'.png'))
-    plt.close(fig)
-
-# Wide version for the data available.
-for idxRow in range(totalNumOfRows):
-    if idxRow<totalNumOfRows:
-        lw = lineWidth
+def constructFrameJobs(totalNumOfRows, totalNumOfSets,
+    maxNumOfHistoryRows=None, flagLayeredBars=False, rollingWindowSize=None,
+    frameSequences=None, dayRange=None):
+    """
+    Construct the list of frames to render from the frame sequences (those of
+    frameJobs.json by default), customized as for customizeFrameSequences.
+    With dayRange (see frameJobConfig.parseDayRange), only the frames of
+    these days are included.
+    """
+    if frameSequences is None:
+        frameSequences = getFrameSequences()
+    return expandFrameSequences(customizeFrameSequences(frameSequences,
+        maxNumOfHistoryRows, flagLayeredBars, rollingWindowSize),
+        totalNumOfRows, totalNumOfSets, dayRange)
+
+def constructStreamRowFrameJobs(table, frameSequences=None):
+    """
+    Construct the frames of the last day of a (sliding window) WorkoutTable,
+    for renderFrameJobsInStream.
+    """
+    if frameSequences is None:
+        frameSequences = getFrameSequences()
+    return expandFrameSequences(frameSequences,
+        table.idxFirstRow+table.numOfRows, table.numOfSets,
+        ('latest', 'latest'), table.idxFirstRow,
+        table.workoutTimesInS is not None)
+
+def constructStreamLastFrameJobs(table, frameSequences=None):
+    """
+    Construct the prediction frames from the last (sliding window)
+    WorkoutTable, for renderFrameJobsInStream.
+    """
+    if frameSequences is None:
+        frameSequences = getFrameSequences()
+    return expandFrameSequences(frameSequences,
+        table.idxFirstRow+table.numOfRows, table.numOfSets,
+        ('latest+1', None), table.idxFirstRow,
+        table.workoutTimesInS is not None)
+
+def groupFrameJobsBySequence(frameJobs):
+    """
+    Group the frames into sequences according to their file names, e.g.
+    'trend_square_day_2.png' belongs to sequence 'trend_square'. Returns a list
+    of (sequenceName, frameJobs).
+    """
+    sequences = {}
+    for frameJob in frameJobs:
+        sequenceName = frameJob.fileName.split('_day_')[0]
+        sequences.setdefault(sequenceName, []).append(frameJob)
+    return list(sequences.items())
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate figures for pull up statistics.')
+    parser.add_argument('--workers', type=int, default=None,
+        help='Number of worker processes (default: one per CPU core).')
+    parser.add_argument('--reuse-figures', action='store_true',
+        help='Update persistent figures instead of creating one per frame.')
+    parser.add_argument('--no-cache', action='store_true',
+        help='Render all frames, even if their inputs have not changed.')
+    outputFormats = parser.add_mutually_exclusive_group()
+    outputFormats.add_argument('--video', action='store_true',
+        help='Stream each frame sequence into a video file via ffmpeg.')
+    outputFormats.add_argument('--pdf', action='store_true',
+        help='Save each frame sequence as one multi-page PDF file.')
+    outputFormats.add_argument('--sprite-sheet', action='store_true',
+        help='Tile each frame sequence into a few sprite sheet .png files.')
+    parser.add_argument('--tier', choices=sorted(OUTPUT_TIER_DPIS),
+        default='final',
+        help='Output tier: low resolution previews or the final frames.')
+    parser.add_argument('--fps', type=int, default=30,
+        help='Frame rate for --video (default: 30).')
+    parser.add_argument('--profile', action='store_true',
+        help='Print the time spent in each phase of the plotting functions.')
+    parser.add_argument('--max-history-rows', type=int, default=None,
+        help='Maximum number of days shown in the 3D bar charts.')
+    parser.add_argument('--no-snapshot', action='store_true',
+        help='Parse the whole csv file instead of using the snapshot.')
+    parser.add_argument('--layered-bars', action='store_true',
+        help='Only draw the bars of the latest day for each bar chart frame '
+            '(implies --reuse-figures).')
+    parser.add_argument('--stream-window', type=int, default=None,
+        help='Read the csv file row by row, keeping only this many days '
+            '(without the render cache).')
+    parser.add_argument('--rolling-window', type=int, default=None,
+        help='Also plot the average daily time spent over this many days.')
+    parser.add_argument('--max-points', type=int, default=None,
+        help='Maximum number of points of the lines in the trend and daily '
+            'time spent plots.')
+    parser.add_argument('--downsampling', choices=DOWNSAMPLING_METHODS,
+        default='lttb', help='Downsampling method for --max-points.')
+    parser.add_argument('--history-window', type=int, default=None,
+        help='Number of latest days plotted day by day in the trend and '
+            'daily time spent plots, with the earlier ones aggregated.')
+    parser.add_argument('--history-period', choices=('month', 'week'),
+        default='week', help='Period of the points aggregated before '
+            '--history-window.')
+    parser.add_argument('--config', default=pathToFrameJobConfig,
+        help='Frame job configuration file (default: frameJobs.json).')
+    parser.add_argument('--days', default=None,
+        help='Only render the frames of these days, as FIRST:LAST, FIRST: or '
+            'DAY, with the days as numbers or latest[+-K] (e.g. latest).')
+    args = parser.parse_args()
+    if args.rolling_window is not None and args.stream_window is not None:
+        parser.error('--rolling-window is not supported with --stream-window.')
+    if args.rolling_window is not None and args.rolling_window<1:
+        parser.error('--rolling-window should be at least 1.')
+    if args.max_points is not None and args.max_points<4:
+        parser.error('--max-points should be at least 4.')
+    if args.history_window is not None and args.history_window<1:
+        parser.error('--history-window should be at least 1.')
+    if args.days is not None and (args.stream_window is not None
+        or args.video or args.pdf or args.sprite_sheet):
+        parser.error('--days is not supported with --stream-window, --video, '
+            '--pdf or --sprite-sheet.')
+    try:
+        dayRange = None if args.days is None else parseDayRange(args.days)
+        frameSequences = getFrameSequences(args.config)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    seriesReduction = None
+    if args.max_points is not None or args.history_window is not None:
+        seriesReduction = SeriesReduction(args.max_points, args.downsampling,
+            args.history_window, args.history_period)
+    flagUseSnapshot = not args.no_snapshot
+    phaseProfile = PhaseProfile() if args.profile else None
+    # The layers are only kept by the persistent figures.
+    flagReuseFigures = args.reuse_figures or args.layered_bars
+    dpi = OUTPUT_TIER_DPIS[args.tier]
+    tierOutputDir = outputDir if args.tier=='final' \
+        else os.path.join(outputDir, previewFolderName)
+
+    if args.stream_window is not None:
+        frameSequences = customizeFrameSequences(frameSequences,
+            seriesReduction=seriesReduction)
+        renderFrameJobsInStream(pathToCsvFile, tierOutputDir,
+            args.stream_window,
+            lambda table: constructStreamRowFrameJobs(table, frameSequences),
+            lambda table: constructStreamLastFrameJobs(table, frameSequences),
+            phaseProfile=phaseProfile, dpi=dpi)
+        if phaseProfile is not None:
+            print(phaseProfile.formatSummary())
+        return
+
+    (header, data) = es.loadStatisticsFromCsv(pathToCsvFile,
+        flagUseSnapshot=flagUseSnapshot)
+    (totalNumOfRows, totalNumOfSets) = es.getNumsOfRowsAndSets(header, data)
+    if data.malformedCells:
+        print('Malformed cells (parsed leniently if possible, otherwise '
+            'skipped):')
+        for line in formatMalformedCells(data.malformedCells):
+            print('    '+line)
+    if data.dailyAggregates.sumMismatches:
+        print('Rows whose Sum field differs from the total of the sets:')
+        for line in formatSumMismatches(data.dailyAggregates.sumMismatches):
+            print('    '+line)
+
+    frameJobs = expandFrameSequences(customizeFrameSequences(frameSequences,
+        args.max_history_rows, args.layered_bars, args.rolling_window,
+        seriesReduction), totalNumOfRows, totalNumOfSets, dayRange)
+    if args.video or args.pdf or args.sprite_sheet:
+        for (sequenceName, sequenceFrameJobs) in groupFrameJobsBySequence(
+            frameJobs):
+            pathToOutput = os.path.join(tierOutputDir, sequenceName)
+            if args.video:
+                renderFrameJobsToVideo(pathToCsvFile, sequenceFrameJobs,
+                    pathToOutput+'.mp4', numOfWorkers=args.workers,
+                    flagReuseFigures=flagReuseFigures, fps=args.fps,
+                    phaseProfile=phaseProfile,
+                    flagUseSnapshot=flagUseSnapshot, dpi=dpi)
+            elif args.pdf:
+                renderFrameJobsToPdf(pathToCsvFile, sequenceFrameJobs,
+                    pathToOutput+'.pdf', flagReuseFigures=flagReuseFigures,
+                    phaseProfile=phaseProfile,
+                    flagUseSnapshot=flagUseSnapshot)
+            else:
+                renderFrameJobsToSpriteSheets(pathToCsvFile,
+                    sequenceFrameJobs, pathToOutput+'_sheet.png',
+                    *spriteSheetGrid, numOfWorkers=args.workers,
+                    flagReuseFigures=flagReuseFigures,
+                    phaseProfile=phaseProfile,
+                    flagUseSnapshot=flagUseSnapshot, dpi=dpi)
     else:
-        lw = lineWidthPre
-    (fig, _) = es.plotTrend(header, data,  idxRow+1,
-        figureSize=figureSizeWide, lineWidth=lw, labelSize=labelSize,
-        titleSize=titleSize, tickSize=tickSize, flagShowPlot=False)
-    fig.savefig(
-        os.path.join(outputDir,
-        'trend_available_wide_day_'+str(idxRow+1)+'.png'))
-    plt.close(fig)
\ No newline at end of file
+        renderFrameJobs(pathToCsvFile, frameJobs, tierOutputDir,
+            numOfWorkers=args.workers, flagReuseFigures=flagReuseFigures,
+            flagUseCache=not args.no_cache, phaseProfile=phaseProfile,
+            flagUseSnapshot=flagUseSnapshot, dpi=dpi)
+
+    if phaseProfile is not None:
+        print(phaseProfile.formatSummary())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+=============================================
+Serve the figures of workout records on demand
+=============================================
+Instead of generating all the figures up front, a local HTTP server renders
+each frame of plotPullUpStatistics.py when it is requested, and keeps the
+recent ones in an in-memory LRU cache (see libs/renderService.py). Usage:
+
+    python serveStatistics.py [INPUT ...] [--host HOST] [--port PORT]
+        [--cache-size-mb CACHE_SIZE_IN_MB] [--no-snapshot]
+
+Each INPUT is a workout csv file or a folder searched (recursively) for them
+(default: 20200401_PullUps.csv). A csv file is served as the dataset named as
+its file name without the extension, and the csv files found under a folder
+as their paths relative to the folder without the extension. The frames are
+named as the output files of plotPullUpStatistics.py, e.g.
+
+    http://127.0.0.1:8000/frames/20200401_PullUps/bar_day_3_set_2.png
+    http://127.0.0.1:8000/frames/20200401_PullUps/trend_day_10.svg?size=9x16
+
+and http://127.0.0.1:8000/datasets and http://127.0.0.1:8000/stats list the
+datasets and the cache hits/latency, respectively. A dataset is loaded again
+when its csv file changes.
+
+Developed and tested with Python 3.8.
+"""
+import argparse
+import os
+
+import plotPullUpStatistics as driver
+from libs.renderService import RenderService, createRenderServer
+from libs.workoutTable import findWorkoutCsvFiles
+
+def findDatasets(inputs):
+    """
+    Find the workout csv files of the inputs (csv files or folders). Returns a
+    dict of the paths to the csv files by dataset name.
+    """
+    datasets = {}
+    for pathToInput in inputs:
+        if os.path.isdir(pathToInput):
+            for pathToCsvFile in findWorkoutCsvFiles(pathToInput):
+                datasetName = os.path.splitext(os.path.relpath(
+                    pathToCsvFile, pathToInput))[0].replace(os.sep, '/')
+                datasets[datasetName] = pathToCsvFile
+        else:
+            datasetName = os.path.splitext(os.path.basename(pathToInput))[0]
+            datasets[datasetName] = pathToInput
+    return datasets
+
+def constructFrameJobs(table):
+    """
+    Construct the frames available for a WorkoutTable.
+    """
+    frameJobs = driver.constructFrameJobs(table.numOfRows, table.numOfSets)
+    if table.workoutTimesInS is None:
+        # plotDailyTimeSpent needs the WorkoutTime field.
+        frameJobs = [f for f in frameJobs if f.plotType!='time']
+    return frameJobs
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve the figures of workout records on demand.')
+    parser.add_argument('inputs', nargs='*', default=[driver.pathToCsvFile],
+        help='Workout csv files or folders to search for them.')
+    parser.add_argument('--host', default='127.0.0.1',
+        help='Address to listen on (default: 127.0.0.1).')
+    parser.add_argument('--port', type=int, default=8000,
+        help='Port to listen on (default: 8000).')
+    parser.add_argument('--cache-size-mb', type=float, default=64,
+        help='Maximum size of the cached images in MB (default: 64).')
+    parser.add_argument('--no-snapshot', action='store_true',
+        help='Parse the whole csv files instead of using the snapshots.')
+    args = parser.parse_args()
+
+    datasets = findDatasets(args.inputs)
+    service = RenderService(datasets, constructFrameJobs,
+        maxCacheSizeInBytes=int(args.cache_size_mb*1024*1024),
+        flagUseSnapshot=not args.no_snapshot)
+    server = createRenderServer(service, args.host, args.port,
+        flagLogRequests=True)
+    (host, port) = server.server_address[:2]
+    print('Serving {} datasets on http://{}:{}/ (Ctrl+C to stop).'.format(
+        len(datasets), host, port), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
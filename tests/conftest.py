@@ -0,0 +1,98 @@
+"""
+Shared fixtures for the regression tests.
+
+The frames are rendered off screen with the DejaVu Sans font shipped with
+matplotlib, so that the golden images do not depend on the fonts installed
+(the Chinese titles and labels are drawn as placeholder boxes, but the data,
+layout and styling are still compared). Run under the repository root:
+
+    python -m pytest tests
+
+Options:
+
+    --update-golden: Render the golden images (tests/golden/*.png) again
+        instead of comparing with them, e.g. after an intended change of the
+        plots or when upgrading matplotlib;
+    -m "not performance": Skip the time and memory budget tests. The budgets
+        can be scaled for slower machines via the environment variable
+        PERF_BUDGET_SCALE (e.g. 2 for twice the time).
+
+Developed and tested with Python 3.8.
+"""
+import os
+import sys
+
+import matplotlib
+matplotlib.use('Agg')
+import pytest
+
+# Make the repository root and the benchmarks importable.
+pathToRepo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, pathToRepo)
+sys.path.insert(0, os.path.join(pathToRepo, 'benchmarks'))
+
+from benchmarkExerciseStatistics import generateSyntheticCsv
+from libs import renderScheduler
+from libs.workoutTable import loadWorkoutTable
+
+pathToSampleCsvFile = os.path.join(pathToRepo, '20200401_PullUps.csv')
+
+# The synthetic datasets, as (numOfDays, numOfSets).
+SYNTHETIC_DATASETS = {
+    'year': (365, 5),
+    'decade': (3650, 10)
+}
+
+def pytest_addoption(parser):
+    parser.addoption('--update-golden', action='store_true',
+        help='Render the golden images again instead of comparing.')
+
+def pytest_configure(config):
+    config.addinivalue_line('markers',
+        'performance: time and memory budget tests.')
+    # The Chinese texts are not in DejaVu Sans.
+    config.addinivalue_line('filterwarnings',
+        'ignore:Glyph .* missing from font:UserWarning')
+
+@pytest.fixture(scope='session')
+def flagUpdateGolden(request):
+    return request.config.getoption('--update-golden')
+
+@pytest.fixture(scope='session')
+def pathsToCsvFiles(tmp_path_factory):
+    """
+    The paths to the csv files of the datasets by name: 'sample' for
+    20200401_PullUps.csv, and the SYNTHETIC_DATASETS (generated once).
+    """
+    pathsToCsvFiles = {'sample': pathToSampleCsvFile}
+    dataDir = tmp_path_factory.mktemp('data')
+    for (name, (numOfDays, numOfSets)) in SYNTHETIC_DATASETS.items():
+        pathToCsvFile = str(dataDir/'{}.csv'.format(name))
+        generateSyntheticCsv(pathToCsvFile, numOfDays, numOfSets)
+        pathsToCsvFiles[name] = pathToCsvFile
+    return pathsToCsvFiles
+
+@pytest.fixture(scope='session')
+def datasets(pathsToCsvFiles):
+    """
+    The WorkoutTables of the datasets by name (see pathsToCsvFiles).
+    """
+    return {name: loadWorkoutTable(pathToCsvFile)
+        for (name, pathToCsvFile) in pathsToCsvFiles.items()}
+
+@pytest.fixture
+def renderDataset(tmp_path):
+    """
+    Make a WorkoutTable the current dataset of the render scheduler (in the
+    current process), via renderDataset(table, flagReuseFigures, dpi). The
+    persistent figures are closed after the test.
+    """
+    def setDataset(table, flagReuseFigures=False, dpi=None):
+        renderScheduler.closeFrameRenderers(
+            renderScheduler._workerState.get('renderers', {}))
+        renderScheduler.setRenderDataset(table.header, table, str(tmp_path),
+            flagReuseFigures, dpi)
+
+    yield setDataset
+    renderScheduler.closeFrameRenderers(
+        renderScheduler._workerState.get('renderers', {}))
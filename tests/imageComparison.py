@@ -0,0 +1,119 @@
+"""
+Perceptual comparison of rendered frames with golden images.
+
+The tolerance is only meant for the golden images, which may be rasterized
+slightly differently by other matplotlib and freetype versions; the frames
+rendered within one run (e.g. with new and with persistent figures) are
+compared pixel by pixel instead.
+
+Two images are compared via their luminance (composited over white, as the
+saved .png files are viewed). A pixel of one image mismatches if its
+luminance is not within LUMINANCE_TOLERANCE of the range of the pixels of the
+other image within SHIFT_TOLERANCE pixels around it, which tolerates
+antialiasing and font rasterization. The images match if the density of
+mismatched pixels stays below MAX_MISMATCH_DENSITY over all the windows of
+MISMATCH_WINDOW_SIZE pixels: moved, missing, resized or recolored artists
+give dense blocks of mismatches, the rasterization only thin edges.
+
+Developed and tested with Python 3.8.
+"""
+import numpy as np
+from matplotlib.image import imread, imsave
+
+# Luminance difference (in [0, 1]) tolerated for a pixel.
+LUMINANCE_TOLERANCE = 0.1
+
+# Shift (in pixels) tolerated for a pixel.
+SHIFT_TOLERANCE = 2
+
+# Size of the (square) windows for the density of mismatched pixels.
+MISMATCH_WINDOW_SIZE = 9
+
+# Maximum density of mismatched pixels in any window for two frames to match.
+MAX_MISMATCH_DENSITY = 0.1
+
+def toLuminance(image):
+    """
+    Convert an RGB(A) image (uint8 or float in [0, 1]) into a float64
+    luminance array in [0, 1], composited over white.
+    """
+    image = np.asarray(image)
+    if image.dtype==np.uint8:
+        image = image/255.0
+    rgb = image[..., :3]
+    if image.shape[-1]==4:
+        alpha = image[..., 3:4]
+        rgb = rgb*alpha+(1-alpha)
+    return rgb@np.array([0.299, 0.587, 0.114])
+
+def getNeighborhoodExtremum(values, radius, extremum):
+    """
+    Get the extremum (np.minimum or np.maximum) of the 2D array over the
+    (2*radius+1) x (2*radius+1) neighborhood of each element, row and column
+    separately.
+    """
+    for axis in (0, 1):
+        padded = np.pad(values, [(radius, radius) if i==axis else (0, 0)
+            for i in (0, 1)], mode='edge')
+        length = values.shape[axis]
+        result = values
+        for offset in range(2*radius+1):
+            result = extremum(result,
+                np.take(padded, range(offset, offset+length), axis=axis))
+        values = result
+    return values
+
+def getWindowMeans(values, windowSize):
+    """
+    Get the means of the 2D array over all the windowSize x windowSize
+    windows (valid positions only), via integral images.
+    """
+    integral = np.zeros((values.shape[0]+1, values.shape[1]+1))
+    integral[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+    sums = integral[windowSize:, windowSize:]-integral[:-windowSize,
+        windowSize:]-integral[windowSize:, :-windowSize] \
+        +integral[:-windowSize, :-windowSize]
+    return sums/windowSize**2
+
+def getMismatchedPixels(image, referenceImage,
+    luminanceTolerance=LUMINANCE_TOLERANCE, shiftTolerance=SHIFT_TOLERANCE):
+    """
+    Get a boolean array of the pixels where the two images (of the same size)
+    mismatch, in either direction.
+    """
+    (x, y) = (toLuminance(image), toLuminance(referenceImage))
+    if x.shape!=y.shape:
+        raise ValueError("Image sizes {} and {} differ!".format(x.shape,
+            y.shape))
+    flagsMismatched = np.zeros(x.shape, dtype=bool)
+    for (values, otherValues) in ((x, y), (y, x)):
+        flagsMismatched |= values<getNeighborhoodExtremum(otherValues,
+            shiftTolerance, np.minimum)-luminanceTolerance
+        flagsMismatched |= values>getNeighborhoodExtremum(otherValues,
+            shiftTolerance, np.maximum)+luminanceTolerance
+    return flagsMismatched
+
+def getMaxMismatchDensity(image, referenceImage,
+    windowSize=MISMATCH_WINDOW_SIZE):
+    """
+    Get the largest density of mismatched pixels over the windows of two
+    images of the same size (0 for matching images).
+    """
+    flagsMismatched = getMismatchedPixels(image, referenceImage)
+    windowSize = min(windowSize, *flagsMismatched.shape)
+    return float(getWindowMeans(flagsMismatched.astype(np.float64),
+        windowSize).max())
+
+def loadImage(pathToImage):
+    return imread(pathToImage)
+
+def saveImage(pathToImage, image):
+    imsave(pathToImage, np.asarray(image))
+
+def saveDiffImage(pathToImage, image, referenceImage):
+    """
+    Save the mismatched pixels of two images (black over white), for
+    inspecting a failed comparison.
+    """
+    flagsMismatched = getMismatchedPixels(image, referenceImage)
+    imsave(pathToImage, ~flagsMismatched, cmap='gray', vmin=0, vmax=1)
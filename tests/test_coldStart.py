@@ -0,0 +1,45 @@
+"""
+Cold start tests: importing the library and the example scripts in a new
+Python process does not import matplotlib (which is only loaded when the first
+figure is plotted, see exerciseStatistics.loadPlottingModules) and stays
+within a time budget.
+
+The modules are those of COLD_START_MODULES in
+benchmarks/benchmarkExerciseStatistics.py, which reports the same numbers via
+--cold-start-only. The time budget is a few times the import time measured on
+the development machine, and can be scaled via the environment variable
+PERF_BUDGET_SCALE.
+
+Developed and tested with Python 3.8.
+"""
+import os
+
+import pytest
+
+from benchmarkExerciseStatistics import COLD_START_MODULES, measureColdStart
+
+NUM_OF_REPEATS = 3
+
+BUDGET_SCALE = float(os.environ.get('PERF_BUDGET_SCALE', 1))
+
+# Budget for the import of a module in seconds (the fastest of the repeats).
+MAX_IMPORT_TIME_IN_S = 0.3
+
+MODULE_NAMES = [moduleName
+    for (moduleName, flagMatplotlibAllowed) in COLD_START_MODULES
+    if not flagMatplotlibAllowed]
+
+@pytest.mark.parametrize('moduleName', MODULE_NAMES)
+def test_noMatplotlibAtStartUp(moduleName):
+    assert not measureColdStart(moduleName)['flagMatplotlibImported'], \
+        "Importing {} imports matplotlib!".format(moduleName)
+
+@pytest.mark.performance
+@pytest.mark.parametrize('moduleName', MODULE_NAMES)
+def test_importBudget(moduleName):
+    importTimeInS = min(measureColdStart(moduleName)['timeInS']
+        for _ in range(NUM_OF_REPEATS))
+    print("{}: {:.3f} s".format(moduleName, importTimeInS))
+    assert importTimeInS<=MAX_IMPORT_TIME_IN_S*BUDGET_SCALE, \
+        "Importing {} takes {:.3f} s, over the budget of {} s!".format(
+            moduleName, importTimeInS, MAX_IMPORT_TIME_IN_S*BUDGET_SCALE)
@@ -0,0 +1,75 @@
+"""
+Tests that the frames rendered with the persistent figures do not depend on
+the frames rendered before them with the same figure.
+
+The frames of a sequence of 20200401_PullUps.csv are rendered in order with
+the persistent figures, and some of them again alone (as by another worker
+process or when resuming a run with the render cache); both must be
+pixel-identical.
+
+Developed and tested with Python 3.8.
+"""
+import os
+
+import numpy as np
+import pytest
+
+from conftest import pathToSampleCsvFile
+from imageComparison import loadImage
+from libs.renderScheduler import FrameJob, renderFrameJobToBuffer, \
+    renderFrameJobs
+
+# Low resolution for speed.
+DPI = 30
+
+FONT_KWARGS = dict(fontInPlot='DejaVu Sans', labelSize=30, titleSize=40,
+    tickSize=30)
+BAR_LAYOUT_KWARGS = dict(figureSize=(9,16), labelPad3D=30, extraLabelPadZ=10,
+    titleY=0.9, titleLoc='right', titleEndPad=5, zTickPad=3,
+    camView=(10, -60))
+
+def getFrameJobs(plotType, table, numOfDays):
+    """
+    Get the frames of the first days (with the frames of all the sets of each
+    day for the bar charts).
+    """
+    if plotType in ('bar', 'layeredBar'):
+        return [FrameJob(plotType, 'day_{}_set_{}.png'.format(day, numOfSets),
+                dict(FONT_KWARGS, numOfRowsToShow=day,
+                    numOfSetsToShowForLastRow=numOfSets,
+                    **BAR_LAYOUT_KWARGS))
+            for day in range(1, numOfDays+1)
+            for numOfSets in range(1, table.numOfSets+1)]
+    return [FrameJob(plotType, 'day_{}.png'.format(day),
+            dict(FONT_KWARGS, numOfRowsToShow=day, figureSize=(9,8),
+                lineWidth=5, flagEndDateDataInTitle=True))
+        for day in range(1, numOfDays+1)]
+
+@pytest.mark.parametrize(('plotType', 'numOfDays'),
+    [('trend', 26), ('time', 26), ('bar', 8), ('layeredBar', 8)])
+def test_frameIndependentOfEarlierFrames(plotType, numOfDays, datasets,
+    renderDataset):
+    table = datasets['sample']
+    frameJobs = getFrameJobs(plotType, table, numOfDays)
+    renderDataset(table, flagReuseFigures=True, dpi=DPI)
+    images = [renderFrameJobToBuffer(frameJob).copy()
+        for frameJob in frameJobs]
+    for idxFrame in (len(frameJobs)//2, len(frameJobs)-2, len(frameJobs)-1):
+        renderDataset(table, flagReuseFigures=True, dpi=DPI)
+        image = renderFrameJobToBuffer(frameJobs[idxFrame])
+        assert np.array_equal(image, images[idxFrame]), \
+            "Frame {} differs when rendered alone!".format(
+                frameJobs[idxFrame].fileName)
+
+def test_resumedRunMatchesFullRun(datasets, tmp_path):
+    frameJobs = getFrameJobs('trend', datasets['sample'], 26)
+    (fullRunDir, resumedRunDir) = (str(tmp_path/'full'),
+        str(tmp_path/'resumed'))
+    renderFrameJobs(pathToSampleCsvFile, frameJobs, fullRunDir,
+        numOfWorkers=1, flagReuseFigures=True, dpi=DPI)
+    # As if the run was interrupted before the last frame.
+    renderFrameJobs(pathToSampleCsvFile, frameJobs[-1:], resumedRunDir,
+        numOfWorkers=1, flagReuseFigures=True, dpi=DPI)
+    fileName = frameJobs[-1].fileName
+    assert np.array_equal(loadImage(os.path.join(resumedRunDir, fileName)),
+        loadImage(os.path.join(fullRunDir, fileName)))
@@ -0,0 +1,212 @@
+"""
+Golden-image regression tests for the plotting functions and the
+persistent-figure renderers.
+
+A fixed set of frames of 20200401_PullUps.csv and of a synthetic year of data
+is rendered with a new figure per frame and compared with the golden images
+under tests/golden with a perceptual tolerance (see imageComparison), which
+only absorbs the rasterization differences across matplotlib and freetype
+versions. The same frames rendered with the persistent figures (after
+rendering the previous day, so that the updates of the artists are covered)
+must be pixel-identical to the frames with a new figure, as must the other
+frames compared within a run. On a failure, the frames and a difference image
+are saved in the temporary folder of the test.
+
+Developed and tested with Python 3.8.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from imageComparison import MAX_MISMATCH_DENSITY, getMaxMismatchDensity, \
+    loadImage, saveDiffImage, saveImage
+from libs.renderScheduler import FrameJob, renderFrameJobToBuffer
+from libs.seriesReduction import SeriesReduction
+from libs.workoutStream import iterWorkoutWindows
+
+goldenDir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'golden')
+
+# Resolution of the golden images.
+GOLDEN_DPI = 50
+
+FONT_KWARGS = dict(fontInPlot='DejaVu Sans', labelSize=30, titleSize=40,
+    tickSize=30)
+BAR_LAYOUT_KWARGS = dict(figureSize=(9,16), labelPad3D=30, extraLabelPadZ=10,
+    titleY=0.9, titleLoc='right', titleEndPad=5, zTickPad=3,
+    camView=(10, -60))
+
+# One frame to compare: the golden image is tests/golden/<name>.png.
+GoldenCase = namedtuple('GoldenCase', ['name', 'datasetName', 'plotType',
+    'kwargs'])
+
+GOLDEN_CASES = [
+    GoldenCase('bar_day_1_set_3', 'sample', 'bar',
+        dict(numOfRowsToShow=1, numOfSetsToShowForLastRow=3,
+            figureSize=(9,16))),
+    GoldenCase('bar_day_12_set_5', 'sample', 'bar',
+        dict(numOfRowsToShow=12, numOfSetsToShowForLastRow=5,
+            **BAR_LAYOUT_KWARGS)),
+    GoldenCase('bar_history_day_29_set_10', 'sample', 'bar',
+        dict(numOfRowsToShow=29, numOfSetsToShowForLastRow=10,
+            maxNumOfHistoryRows=7, **BAR_LAYOUT_KWARGS)),
+    GoldenCase('trend_day_20', 'sample', 'trend',
+        dict(numOfRowsToShow=20, figureSize=(9,16), lineWidth=5)),
+    GoldenCase('trend_square_day_29', 'sample', 'trend',
+        dict(numOfRowsToShow=29, figureSize=(9,8), lineWidth=5,
+            flagEndDateDataInTitle=True)),
+    GoldenCase('trend_wide_day_100', 'sample', 'trend',
+        dict(numOfRowsToShow=100, figureSize=(16,9), lineWidth=3,
+            inFigTextSize=100)),
+    GoldenCase('trend_quadratic_day_60', 'sample', 'trend',
+        dict(numOfRowsToShow=60, figureSize=(16,9), lineWidth=3,
+            inFigTextSize=100, trendFitType='quadratic')),
+    GoldenCase('time_square_rolling_day_29', 'sample', 'time',
+        dict(numOfRowsToShow=29, figureSize=(9,8), lineWidth=5,
+            flagEndDateDataInTitle=True, rollingWindowSize=7)),
+    GoldenCase('year_bar_history_day_365_set_5', 'year', 'bar',
+        dict(numOfRowsToShow=365, numOfSetsToShowForLastRow=5,
+            maxNumOfHistoryRows=30, **BAR_LAYOUT_KWARGS)),
+    GoldenCase('year_trend_reduced_day_365', 'year', 'trend',
+        dict(numOfRowsToShow=365, figureSize=(9,16), lineWidth=5,
+            seriesReduction=SeriesReduction(maxNumOfPoints=100,
+                historyWindowSize=90, historyPeriod='month'))),
+    GoldenCase('year_time_minmax_day_365', 'year', 'time',
+        dict(numOfRowsToShow=365, figureSize=(9,8), lineWidth=5,
+            rollingWindowSize=7, seriesReduction=SeriesReduction(
+                maxNumOfPoints=60, method='minmax'))),
+]
+
+def getFrameJob(goldenCase, **frameKwargs):
+    return FrameJob(goldenCase.plotType, goldenCase.name+'.png',
+        dict(FONT_KWARGS, **dict(goldenCase.kwargs, **frameKwargs)))
+
+def saveImages(image, referenceImage, name, outputDir):
+    """
+    Save two frames which differ with their difference image into outputDir.
+    """
+    saveImage(os.path.join(str(outputDir), name+'_actual.png'), image)
+    saveImage(os.path.join(str(outputDir), name+'_expected.png'),
+        referenceImage)
+    saveDiffImage(os.path.join(str(outputDir), name+'_diff.png'), image,
+        referenceImage)
+
+def assertSameSize(image, referenceImage, name):
+    assert np.shape(image)[:2]==np.shape(referenceImage)[:2], \
+        "Frame {}: size {} instead of {}!".format(name, np.shape(image)[:2],
+            np.shape(referenceImage)[:2])
+
+def assertSimilarImages(image, referenceImage, name, outputDir,
+    maxMismatchDensity=MAX_MISMATCH_DENSITY):
+    """
+    Check that a frame is perceptually the same as its golden image;
+    otherwise, save them with their difference image into outputDir and fail.
+    """
+    assertSameSize(image, referenceImage, name)
+    mismatchDensity = getMaxMismatchDensity(image, referenceImage)
+    if mismatchDensity>maxMismatchDensity:
+        saveImages(image, referenceImage, name, outputDir)
+        pytest.fail("Frame {}: mismatch density {:.3f} above {} (images "
+            "saved in {}).".format(name, mismatchDensity, maxMismatchDensity,
+                outputDir))
+
+def assertIdenticalImages(image, referenceImage, name, outputDir):
+    """
+    Check that two frames rendered in the same run are pixel-identical;
+    otherwise, save them with their difference image into outputDir and fail.
+    """
+    assertSameSize(image, referenceImage, name)
+    numOfDifferentPixels = int(np.count_nonzero(np.any(
+        np.asarray(image)!=np.asarray(referenceImage), axis=-1)))
+    if numOfDifferentPixels>0:
+        saveImages(image, referenceImage, name, outputDir)
+        pytest.fail("Frame {}: {} pixels differ (images saved in {}).".format(
+            name, numOfDifferentPixels, outputDir))
+
+@pytest.mark.parametrize('goldenCase', GOLDEN_CASES,
+    ids=[goldenCase.name for goldenCase in GOLDEN_CASES])
+def test_goldenImage(goldenCase, datasets, renderDataset, flagUpdateGolden,
+    tmp_path):
+    renderDataset(datasets[goldenCase.datasetName], dpi=GOLDEN_DPI)
+    image = renderFrameJobToBuffer(getFrameJob(goldenCase))
+
+    pathToGolden = os.path.join(goldenDir, goldenCase.name+'.png')
+    if flagUpdateGolden:
+        os.makedirs(goldenDir, exist_ok=True)
+        saveImage(pathToGolden, image)
+        return
+    if not os.path.exists(pathToGolden):
+        pytest.fail("Golden image {} not found (render it via "
+            "--update-golden).".format(pathToGolden))
+    assertSimilarImages(image, loadImage(pathToGolden), goldenCase.name,
+        tmp_path)
+
+@pytest.mark.parametrize('goldenCase', GOLDEN_CASES,
+    ids=[goldenCase.name for goldenCase in GOLDEN_CASES])
+def test_reusedFigureMatchesNewFigure(goldenCase, datasets, renderDataset,
+    tmp_path):
+    table = datasets[goldenCase.datasetName]
+    renderDataset(table, dpi=GOLDEN_DPI)
+    image = renderFrameJobToBuffer(getFrameJob(goldenCase)).copy()
+
+    renderDataset(table, flagReuseFigures=True, dpi=GOLDEN_DPI)
+    numOfRowsToShow = goldenCase.kwargs['numOfRowsToShow']
+    if numOfRowsToShow>1:
+        # Update the persistent figure from the previous day.
+        renderFrameJobToBuffer(getFrameJob(goldenCase,
+            numOfRowsToShow=numOfRowsToShow-1))
+    assertIdenticalImages(renderFrameJobToBuffer(getFrameJob(goldenCase)),
+        image, goldenCase.name+'_reused', tmp_path)
+
+@pytest.mark.parametrize('datasetName', ['sample', 'year'])
+def test_layeredBarsMatchNewFigures(datasetName, datasets, renderDataset,
+    tmp_path):
+    """
+    The layered bar charts (blitting the bars of the latest day over a cached
+    background at the figure resolution) match the bar charts drawn with a
+    new figure.
+    """
+    table = datasets[datasetName]
+    kwargs = dict(FONT_KWARGS, numOfRowsToShow=table.numOfRows,
+        maxNumOfHistoryRows=30, **BAR_LAYOUT_KWARGS)
+    numsOfSets = range(1, min(table.numOfSets, 3)+1)
+
+    renderDataset(table, flagReuseFigures=True)
+    layeredImages = [renderFrameJobToBuffer(FrameJob('layeredBar',
+            'bar.png', dict(kwargs, numOfSetsToShowForLastRow=numOfSets)))
+        .copy() for numOfSets in numsOfSets]
+    renderDataset(table, flagReuseFigures=False)
+    for (numOfSets, layeredImage) in zip(numsOfSets, layeredImages):
+        image = renderFrameJobToBuffer(FrameJob('bar', 'bar.png',
+            dict(kwargs, numOfSetsToShowForLastRow=numOfSets)))
+        assertIdenticalImages(layeredImage, image,
+            '{}_layered_bar_set_{}'.format(datasetName, numOfSets), tmp_path)
+
+@pytest.mark.parametrize('flagReuseFigures', [False, True],
+    ids=['newFigure', 'reusedFigure'])
+def test_streamWindowBarsMatchHistoryBars(flagReuseFigures, datasets,
+    pathsToCsvFiles, renderDataset, tmp_path):
+    """
+    A bar chart of a sliding window of the latest days (as with
+    --stream-window) matches the bar chart of the whole table with as many
+    history rows (as with --max-history-rows), including the bar colors.
+    """
+    (numOfRowsToShow, maxNumOfHistoryRows) = (20, 7)
+    kwargs = dict(FONT_KWARGS, numOfSetsToShowForLastRow=5,
+        **BAR_LAYOUT_KWARGS)
+    for windowTable in iterWorkoutWindows(pathsToCsvFiles['sample'],
+        maxNumOfHistoryRows):
+        if windowTable.idxFirstRow+windowTable.numOfRows==numOfRowsToShow:
+            break
+    assert windowTable.idxFirstRow>0
+
+    renderDataset(windowTable, flagReuseFigures, GOLDEN_DPI)
+    windowImage = renderFrameJobToBuffer(FrameJob('bar', 'bar.png',
+        dict(kwargs, numOfRowsToShow=windowTable.numOfRows))).copy()
+    renderDataset(datasets['sample'], flagReuseFigures, GOLDEN_DPI)
+    image = renderFrameJobToBuffer(FrameJob('bar', 'bar.png',
+        dict(kwargs, numOfRowsToShow=numOfRowsToShow,
+            maxNumOfHistoryRows=maxNumOfHistoryRows)))
+    assertIdenticalImages(windowImage, image, 'stream_window_bar', tmp_path)
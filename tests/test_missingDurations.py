@@ -0,0 +1,118 @@
+"""
+Tests for the daily time spent plots with missing WorkoutTime cells.
+
+The WorkoutTime of rows 2 to 5 of 20200401_PullUps.csv is blanked, so that
+it is stored as MISSING_DURATION; these days are left out of the plots (both
+with a new figure and with the persistent figure) and of the average
+WorkoutTime, also when streaming.
+
+Developed and tested with Python 3.8.
+"""
+import csv
+
+import numpy as np
+import pytest
+
+from conftest import pathToSampleCsvFile
+from libs import exerciseStatistics as es
+from libs.frameRenderers import DailyTimeSpentRenderer
+from libs.statisticsIndex import getStatisticsIndex
+from libs.workoutStream import iterWorkoutWindows
+from libs.workoutTable import MISSING_DURATION, WorkoutTable, \
+    loadWorkoutTable
+
+# Indices of the rows with the WorkoutTime blanked.
+IDXS_MISSING_ROWS = [1, 2, 3, 4]
+
+FONT_KWARGS = dict(fontInPlot='DejaVu Sans', figureSize=(9,8))
+
+@pytest.fixture(scope='module')
+def missingDurationCsvFile(tmp_path_factory):
+    with open(pathToSampleCsvFile, mode='r') as csvFile:
+        rows = list(csv.reader(csvFile))
+    idxWorkoutTime = rows[0].index('WorkoutTime')
+    for idxRow in IDXS_MISSING_ROWS:
+        # The first row is the header.
+        rows[idxRow+1][idxWorkoutTime] = ''
+    pathToCsvFile = str(tmp_path_factory.mktemp('missing')/'missing.csv')
+    with open(pathToCsvFile, mode='w', newline='') as csvFile:
+        csv.writer(csvFile, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+    return pathToCsvFile
+
+@pytest.fixture(scope='module')
+def missingDurationTable(missingDurationCsvFile):
+    table = loadWorkoutTable(missingDurationCsvFile)
+    assert np.all(table.workoutTimesInS[IDXS_MISSING_ROWS]==MISSING_DURATION)
+    return table
+
+def plotWithNewFigure(table, **kwargs):
+    return es.plotDailyTimeSpent(table.header, table, flagUsePyplot=False,
+        **dict(FONT_KWARGS, **kwargs))
+
+def plotWithPersistentFigure(table, **kwargs):
+    frameKwargs = {name: value for (name, value) in kwargs.items()
+        if name in DailyTimeSpentRenderer.frameKwargNames}
+    renderer = DailyTimeSpentRenderer(table, **dict(FONT_KWARGS,
+        **{name: value for (name, value) in kwargs.items()
+            if name not in frameKwargs}))
+    try:
+        # Update the figure from an earlier day first.
+        renderer.render(numOfRowsToShow=2)
+        return renderer.render(**frameKwargs)
+    finally:
+        renderer.close()
+
+@pytest.mark.parametrize('plotFunction',
+    [plotWithNewFigure, plotWithPersistentFigure],
+    ids=['newFigure', 'persistentFigure'])
+def test_missingDurationsLeftOut(plotFunction, missingDurationTable):
+    table = missingDurationTable
+    (_, ax) = plotFunction(table, numOfRowsToShow=table.numOfRows)
+    workoutTimesInM = np.asarray(ax.get_lines()[0].get_ydata(), dtype=float)
+    assert np.all(np.isnan(workoutTimesInM[IDXS_MISSING_ROWS]))
+    flagsValid = ~np.isnan(workoutTimesInM)
+    np.testing.assert_allclose(workoutTimesInM[flagsValid],
+        table.workoutTimesInS[flagsValid]/60.0)
+
+@pytest.mark.parametrize('plotFunction',
+    [plotWithNewFigure, plotWithPersistentFigure],
+    ids=['newFigure', 'persistentFigure'])
+def test_missingDurationTitle(plotFunction, missingDurationTable):
+    (_, ax) = plotFunction(missingDurationTable, numOfRowsToShow=3,
+        flagEndDateDataInTitle=True)
+    assert ax.get_title().endswith("耗时无记录")
+
+def getValidMeansInS(table):
+    """
+    Get the average of the valid WorkoutTime values up to each row.
+    """
+    return [np.mean([timeInS for timeInS in table.workoutTimesInS[:numOfRows]
+            if timeInS!=MISSING_DURATION])
+        for numOfRows in range(1, table.numOfRows+1)]
+
+def test_meanSkipsMissingDurations(missingDurationTable):
+    table = missingDurationTable
+    statisticsIndex = getStatisticsIndex(table)
+    np.testing.assert_allclose([statisticsIndex.getMeanWorkoutTimeInS(
+            numOfRows) for numOfRows in range(1, table.numOfRows+1)],
+        getValidMeansInS(table))
+
+def test_meanSkipsMissingDurationsWhenStreaming(missingDurationCsvFile,
+    missingDurationTable):
+    validMeansInS = getValidMeansInS(missingDurationTable)
+    for table in iterWorkoutWindows(missingDurationCsvFile, 3):
+        numOfRows = table.idxFirstRow+table.numOfRows
+        assert getStatisticsIndex(table).getMeanWorkoutTimeInS(
+            table.numOfRows)==pytest.approx(validMeansInS[numOfRows-1])
+
+def test_meanWithoutValidDurations(missingDurationTable):
+    rowSlice = slice(IDXS_MISSING_ROWS[0], IDXS_MISSING_ROWS[-1]+1)
+    table = WorkoutTable(missingDurationTable.header,
+        missingDurationTable.setFieldNames,
+        missingDurationTable.setValues[rowSlice],
+        missingDurationTable.dates[rowSlice],
+        workoutTimesInS=missingDurationTable.workoutTimesInS[rowSlice])
+    assert np.isnan(getStatisticsIndex(table).getMeanWorkoutTimeInS(
+        table.numOfRows))
+    (_, ax) = plotWithNewFigure(table, numOfRowsToShow=table.numOfRows)
+    assert "日均 无记录" in [text.get_text() for text in ax.texts]
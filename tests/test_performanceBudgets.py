@@ -0,0 +1,127 @@
+"""
+Time and memory budgets for loading and rendering the synthetic datasets.
+
+Each frame is rendered at the final resolution into the temporary folder of
+the test, NUM_OF_MEASURED_FRAMES times (consecutive days) after a warm-up
+frame, and the median time and the largest peak of the memory allocated
+(the Python and numpy allocations traced by tracemalloc, as in
+benchmarks/benchmarkExerciseStatistics.py; not the canvas buffers of Agg) are
+compared with the budgets. The budgets are a few times the numbers measured
+on the development machine, so that they only catch regressions such as
+redrawing the whole history or copying the table per frame; the time budgets
+can be scaled via the environment variable PERF_BUDGET_SCALE. Skip these
+tests via -m "not performance".
+
+Developed and tested with Python 3.8.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+from benchmarkExerciseStatistics import measure
+from libs.renderScheduler import FrameJob, renderFrameJob
+from libs.seriesReduction import SeriesReduction
+from libs.workoutTable import loadWorkoutTable
+
+pytestmark = pytest.mark.performance
+
+NUM_OF_MEASURED_FRAMES = 3
+
+BUDGET_SCALE = float(os.environ.get('PERF_BUDGET_SCALE', 1))
+
+FONT_KWARGS = dict(fontInPlot='DejaVu Sans', labelSize=30, titleSize=40,
+    tickSize=30)
+BAR_LAYOUT_KWARGS = dict(figureSize=(9,16), labelPad3D=30, extraLabelPadZ=10,
+    titleY=0.9, titleLoc='right', titleEndPad=5, zTickPad=3,
+    camView=(10, -60))
+
+# A frame to measure: the time budget is in seconds per frame, the memory
+# budget in MB allocated at the peak of a frame.
+PerfCase = namedtuple('PerfCase', ['name', 'datasetName', 'plotType',
+    'flagReuseFigures', 'kwargs', 'maxTimeInS', 'maxPeakMemoryInMb'])
+
+PERF_CASES = [
+    PerfCase('year_bar_history', 'year', 'bar', False,
+        dict(maxNumOfHistoryRows=30, **BAR_LAYOUT_KWARGS), 2.5, 5),
+    PerfCase('year_bar_history_reused', 'year', 'bar', True,
+        dict(maxNumOfHistoryRows=30, **BAR_LAYOUT_KWARGS), 1.2, 2),
+    PerfCase('year_layered_bar_history', 'year', 'layeredBar', True,
+        dict(maxNumOfHistoryRows=30, **BAR_LAYOUT_KWARGS), 1.2, 2),
+    PerfCase('year_trend', 'year', 'trend', False,
+        dict(figureSize=(9,16), lineWidth=5), 2.5, 6),
+    PerfCase('decade_trend', 'decade', 'trend', False,
+        dict(figureSize=(9,16), lineWidth=5), 3.5, 8),
+    PerfCase('decade_trend_reused', 'decade', 'trend', True,
+        dict(figureSize=(9,16), lineWidth=5), 2, 3),
+    PerfCase('decade_trend_reduced_reused', 'decade', 'trend', True,
+        dict(figureSize=(9,16), lineWidth=5,
+            seriesReduction=SeriesReduction(maxNumOfPoints=500)),
+        2.5, 3),
+    PerfCase('decade_time_rolling', 'decade', 'time', False,
+        dict(figureSize=(9,8), lineWidth=5, rollingWindowSize=7), 3, 8),
+    PerfCase('decade_time_rolling_reused', 'decade', 'time', True,
+        dict(figureSize=(9,8), lineWidth=5, rollingWindowSize=7), 1.5, 3),
+]
+
+# Budgets for loading the decade csv file.
+(MAX_LOAD_TIME_IN_S, MAX_LOAD_PEAK_MEMORY_IN_MB) = (1.5, 16)
+
+def getFrameJobs(perfCase, table):
+    """
+    Get the warm-up frame and the frames to measure: the last days (with all
+    the sets for the bar charts).
+    """
+    frameJobs = []
+    for numOfRowsToShow in range(table.numOfRows-NUM_OF_MEASURED_FRAMES,
+        table.numOfRows+1):
+        frameKwargs = dict(FONT_KWARGS, numOfRowsToShow=numOfRowsToShow,
+            **perfCase.kwargs)
+        if perfCase.plotType in ('bar', 'layeredBar'):
+            frameKwargs['numOfSetsToShowForLastRow'] = table.numOfSets
+        frameJobs.append(FrameJob(perfCase.plotType,
+            '{}_{}.png'.format(perfCase.name, numOfRowsToShow), frameKwargs))
+    return frameJobs
+
+def assertWithinBudgets(name, times, peakMemories, maxTimeInS,
+    maxPeakMemoryInMb):
+    (timeInS, peakMemoryInMb) = (float(np.median(times)),
+        max(peakMemories)/2**20)
+    print("{}: {:.3f} s, {:.1f} MB".format(name, timeInS, peakMemoryInMb))
+    assert timeInS<=maxTimeInS*BUDGET_SCALE, \
+        "{}: {:.3f} s over the budget of {} s!".format(name, timeInS,
+            maxTimeInS*BUDGET_SCALE)
+    assert peakMemoryInMb<=maxPeakMemoryInMb, \
+        "{}: {:.1f} MB over the budget of {} MB!".format(name, peakMemoryInMb,
+            maxPeakMemoryInMb)
+
+@pytest.mark.parametrize('perfCase', PERF_CASES,
+    ids=[perfCase.name for perfCase in PERF_CASES])
+def test_frameBudget(perfCase, datasets, renderDataset):
+    table = datasets[perfCase.datasetName]
+    renderDataset(table, perfCase.flagReuseFigures)
+    (warmUpFrameJob, *frameJobs) = getFrameJobs(perfCase, table)
+    renderFrameJob(warmUpFrameJob)
+    times = []
+    peakMemories = []
+    for frameJob in frameJobs:
+        (pathToOutput, elapsedTime, peakMemory) = measure(renderFrameJob,
+            frameJob)
+        assert os.path.getsize(pathToOutput)>0
+        times.append(elapsedTime)
+        peakMemories.append(peakMemory)
+    assertWithinBudgets(perfCase.name, times, peakMemories,
+        perfCase.maxTimeInS, perfCase.maxPeakMemoryInMb)
+
+def test_loadBudget(pathsToCsvFiles, datasets):
+    times = []
+    peakMemories = []
+    for _ in range(NUM_OF_MEASURED_FRAMES):
+        (table, elapsedTime, peakMemory) = measure(loadWorkoutTable,
+            pathsToCsvFiles['decade'])
+        assert table.numOfRows==datasets['decade'].numOfRows
+        times.append(elapsedTime)
+        peakMemories.append(peakMemory)
+    assertWithinBudgets('decade_load', times, peakMemories,
+        MAX_LOAD_TIME_IN_S, MAX_LOAD_PEAK_MEMORY_IN_MB)
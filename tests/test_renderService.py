@@ -0,0 +1,94 @@
+"""
+Tests for the error handling of the HTTP render service.
+
+A RenderService is served on a free local port for each test; the csv file of
+its dataset is a copy of 20200401_PullUps.csv, which the tests overwrite with
+malformed content.
+
+Developed and tested with Python 3.8.
+"""
+import json
+import shutil
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from conftest import pathToSampleCsvFile
+from libs.renderScheduler import FrameJob
+from libs.renderService import RenderService, createRenderServer
+
+FRAME_KWARGS = dict(fontInPlot='DejaVu Sans', figureSize=(4,3))
+
+def constructFrameJobs(table):
+    return [FrameJob('trend', 'trend.png',
+            dict(FRAME_KWARGS, numOfRowsToShow=table.numOfRows)),
+        # Fails when rendered.
+        FrameJob('bar', 'bar_day_0_set_1.png',
+            dict(FRAME_KWARGS, numOfRowsToShow=0,
+                numOfSetsToShowForLastRow=1))]
+
+@pytest.fixture
+def pathToCsvFile(tmp_path):
+    pathToCsvFile = str(tmp_path/'PullUps.csv')
+    shutil.copyfile(pathToSampleCsvFile, pathToCsvFile)
+    return pathToCsvFile
+
+@pytest.fixture
+def getResponse(pathToCsvFile):
+    """
+    Serve a RenderService of the dataset 'PullUps'; getResponse(path) gets
+    (statusCode, body) for a request.
+    """
+    service = RenderService({'PullUps': pathToCsvFile}, constructFrameJobs,
+        flagUseSnapshot=False)
+    server = createRenderServer(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def getResponse(path):
+        url = 'http://127.0.0.1:{}{}'.format(server.server_address[1], path)
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                return (response.status, response.read())
+        except urllib.error.HTTPError as error:
+            return (error.code, error.read())
+
+    yield getResponse
+    server.shutdown()
+    server.server_close()
+
+def writeMalformedCsvFile(pathToCsvFile):
+    # A set value which can not be parsed.
+    with open(pathToCsvFile, mode='a') as csvFile:
+        csvFile.write('\n"5/1/2020",1x')
+
+def test_renderErrorResponse(getResponse):
+    (statusCode, body) = getResponse('/frames/PullUps/bar_day_0_set_1.png')
+    assert statusCode==500
+    assert 'error' in json.loads(body)
+    # The server is still serving.
+    (statusCode, _) = getResponse('/frames/PullUps/trend.png')
+    assert statusCode==200
+
+def test_failedReloadKeepsLastDataset(getResponse, pathToCsvFile):
+    (statusCode, image) = getResponse('/frames/PullUps/trend.png')
+    assert statusCode==200
+    writeMalformedCsvFile(pathToCsvFile)
+    assert getResponse('/frames/PullUps/trend.png')==(200, image)
+    (statusCode, body) = getResponse('/stats')
+    assert statusCode==200
+    assert 'PullUps' in json.loads(body)['loadErrors']
+
+    # The dataset is loaded again once the csv file is fixed.
+    shutil.copyfile(pathToSampleCsvFile, pathToCsvFile)
+    getResponse('/frames/PullUps/trend.png')
+    assert json.loads(getResponse('/stats')[1])['loadErrors']=={}
+
+def test_failedFirstLoad(getResponse, pathToCsvFile):
+    writeMalformedCsvFile(pathToCsvFile)
+    (statusCode, body) = getResponse('/frames/PullUps/trend.png')
+    assert statusCode==500
+    assert 'error' in json.loads(body)
+    assert getResponse('/datasets')==(200, b'[]')
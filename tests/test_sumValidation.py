@@ -0,0 +1,74 @@
+"""
+Tests for the validation of the daily totals against the Sum field.
+
+Copies of 20200401_PullUps.csv with one Sum cell changed are loaded: a Sum
+which is not an integer is skipped and reported as a malformed cell (also
+through the table snapshot), and a Sum which differs from the total of the
+sets is reported as a SumMismatch.
+
+Developed and tested with Python 3.8.
+"""
+import csv
+
+import pytest
+
+from conftest import pathToSampleCsvFile
+from libs import exerciseStatistics as es
+from libs.dailyAggregates import MISSING_SUM, SumMismatch, \
+    formatSumMismatches
+from libs.workoutTable import SUM_FIELD, MalformedCell, formatMalformedCells
+
+# Index of the row with the Sum changed.
+IDX_CHANGED_ROW = 3
+
+@pytest.fixture
+def writeCsvFileWithSum(tmp_path):
+    """
+    writeCsvFileWithSum(sumStr) gets the path to a copy of the sample csv
+    file with the Sum of the row IDX_CHANGED_ROW set to sumStr.
+    """
+    def writeCsvFileWithSum(sumStr):
+        with open(pathToSampleCsvFile, mode='r') as csvFile:
+            rows = list(csv.reader(csvFile))
+        # The first row is the header.
+        rows[IDX_CHANGED_ROW+1][rows[0].index(SUM_FIELD)] = sumStr
+        pathToCsvFile = str(tmp_path/'PullUps.csv')
+        with open(pathToCsvFile, mode='w', newline='') as csvFile:
+            csv.writer(csvFile, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+        return pathToCsvFile
+    return writeCsvFileWithSum
+
+def test_sampleSumsMatch():
+    (_, table) = es.loadStatisticsFromCsv(pathToSampleCsvFile)
+    assert table.dailyAggregates.sumMismatches==[]
+    assert all(cell.field!=SUM_FIELD for cell in table.malformedCells)
+
+@pytest.mark.parametrize('flagUseSnapshot', [False, True],
+    ids=['csv', 'snapshot'])
+def test_nonIntegerSum(flagUseSnapshot, writeCsvFileWithSum):
+    pathToCsvFile = writeCsvFileWithSum('n/a')
+    if flagUseSnapshot:
+        # Load once to write the snapshot.
+        es.loadStatisticsFromCsv(pathToCsvFile, flagUseSnapshot=True)
+    (_, table) = es.loadStatisticsFromCsv(pathToCsvFile,
+        flagUseSnapshot=flagUseSnapshot)
+    assert table.recordedSums[IDX_CHANGED_ROW]==MISSING_SUM
+    assert table.dailyAggregates.sumMismatches==[]
+    malformedSumCells = [cell for cell in table.malformedCells
+        if cell.field==SUM_FIELD]
+    assert malformedSumCells==[MalformedCell(SUM_FIELD, IDX_CHANGED_ROW,
+        'n/a')]
+    assert formatMalformedCells(malformedSumCells)==[
+        "Row {} (Sum): 'n/a'".format(IDX_CHANGED_ROW+1)]
+
+def test_mismatchedSum(writeCsvFileWithSum):
+    (_, sampleTable) = es.loadStatisticsFromCsv(pathToSampleCsvFile)
+    dailyTotal = int(sampleTable.dailyAggregates.dailyTotals[IDX_CHANGED_ROW])
+    (_, table) = es.loadStatisticsFromCsv(writeCsvFileWithSum(
+        str(dailyTotal+1)))
+    assert table.malformedCells==sampleTable.malformedCells
+    assert table.dailyAggregates.sumMismatches==[SumMismatch(IDX_CHANGED_ROW,
+        dailyTotal+1, dailyTotal)]
+    assert formatSumMismatches(table.dailyAggregates.sumMismatches)==[
+        "Row {}: Sum {} != {} (total of the sets)".format(IDX_CHANGED_ROW+1,
+            dailyTotal+1, dailyTotal)]